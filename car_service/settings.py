@@ -49,8 +49,17 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'dashboard.middleware.CurrencyContextMiddleware',
+    'dashboard.middleware.VersionSnapshotMiddleware',
 ]
 
+# Opt-in request profiling (query count, DB/template/total time, N+1 warnings)
+REQUEST_PROFILING = os.getenv('REQUEST_PROFILING', 'False').lower() == 'true'
+REQUEST_PROFILING_SLOW_MS = int(os.getenv('REQUEST_PROFILING_SLOW_MS', '500'))
+REQUEST_PROFILING_REPEAT_THRESHOLD = int(os.getenv('REQUEST_PROFILING_REPEAT_THRESHOLD', '5'))
+if REQUEST_PROFILING:
+    MIDDLEWARE.insert(0, 'dashboard.middleware.RequestProfilingMiddleware')
+
 # Disable CSRF on admin for HTTP (temporary fix for login issue)
 if not DEBUG:
     CSRF_COOKIE_DOMAIN = None
@@ -95,6 +104,21 @@ else:
             }
         }
 
+# Caches
+# 'default' is per process: rendered table rows and planner payloads, whose keys
+# include the change counters. 'versions' holds those counters (ETags, units,
+# exchange rates, planner) and must be shared by all gunicorn workers and
+# management commands, so it is a database table (created by migration 0028).
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'versions': {
+        'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+        'LOCATION': 'dashboard_version_cache',
+    },
+}
+
 # Password validation
 AUTH_PASSWORD_VALIDATORS = [
     {
@@ -2,7 +2,7 @@
 Django Admin configuration for Car Service Management System
 """
 from django.contrib import admin
-from .models import Sklad, Customer, Car, Order, OrderItem, Event
+from .models import Sklad, Customer, Car, Order, OrderItem, ArchivedOrder, Event, ExchangeRate
 
 
 @admin.register(Sklad)
@@ -84,6 +84,17 @@ class OrderItemAdmin(admin.ModelAdmin):
     # autocomplete_fields = ('order', 'sklad_item')
 
 
+@admin.register(ArchivedOrder)
+class ArchivedOrderAdmin(admin.ModelAdmin):
+    """Admin interface for archived orders (moved by the archive_orders command)"""
+    list_display = ('order_number', 'order_date', 'client_name', 'car_plate_number', 'status', 'archived_at')
+    list_filter = ('status',)
+    search_fields = ('order_number', 'client_name', 'car_plate_number', 'car_vin')
+    readonly_fields = ('created_at', 'updated_at', 'archived_at')
+    date_hierarchy = 'order_date'
+    ordering = ('-order_date',)
+
+
 @admin.register(Event)
 class EventAdmin(admin.ModelAdmin):
     """Admin interface for Events/Calendar"""
@@ -92,3 +103,13 @@ class EventAdmin(admin.ModelAdmin):
     search_fields = ('title', 'description')
     date_hierarchy = 'start_datetime'
     ordering = ('-start_datetime',)
+
+
+@admin.register(ExchangeRate)
+class ExchangeRateAdmin(admin.ModelAdmin):
+    """Admin interface for historical EUR/BGN rates"""
+    list_display = ('date', 'rate', 'source', 'updated_at')
+    list_filter = ('source',)
+    readonly_fields = ('created_at', 'updated_at')
+    date_hierarchy = 'date'
+    ordering = ('-date',)
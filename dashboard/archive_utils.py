@@ -0,0 +1,130 @@
+"""
+Order archive utilities
+Old orders are moved to ArchivedOrder / ArchivedOrderItem by the archive_orders
+command, so the live tables and their indexes only hold recent work. List and
+search views read the live tables; include_archive=on adds the archive.
+"""
+
+from django.core.paginator import Paginator
+from django.db import transaction
+from django.db.models import BooleanField, Value
+from django.http import Http404
+from django.utils import timezone
+
+from .models import ArchivedOrder, ArchivedOrderItem, Order, OrderItem
+from .search_utils import filter_orders, get_param
+
+
+# Orders older than this many years are archived by default
+ARCHIVE_AFTER_YEARS = 5
+
+# Orders moved per transaction
+ARCHIVE_BATCH_SIZE = 1000
+
+ORDER_PAGE_KEYS = ('id', 'order_date', 'created_at', 'archived')
+
+
+def wants_archive(params):
+    return bool(get_param(params, 'include_archive'))
+
+
+def archive_cutoff(years):
+    """Orders dated before this day are archived"""
+    today = timezone.localdate()
+    try:
+        return today.replace(year=today.year - years)
+    except ValueError:
+        # 29 February
+        return today.replace(year=today.year - years, day=28)
+
+
+def archivable_orders(cutoff):
+    """
+    Orders dated before the cutoff. Invoiced orders stay live: the invoice
+    references its order and would be deleted with it.
+    """
+    return Order.objects.filter(order_date__lt=cutoff, invoice__isnull=True)
+
+
+def copy_fields(obj, model):
+    """Field values of obj for the model's fields it has (ids included, so links keep working)"""
+    return {
+        field.attname: getattr(obj, field.attname)
+        for field in model._meta.concrete_fields
+        if hasattr(obj, field.attname)
+    }
+
+
+def archive_orders(order_ids):
+    """Move the given orders with their items and employee assignments to the archive in one transaction"""
+    through = Order.employees.through
+    archived_through = ArchivedOrder.employees.through
+
+    with transaction.atomic():
+        orders = list(Order.objects.filter(pk__in=order_ids))
+        ArchivedOrder.objects.bulk_create([ArchivedOrder(**copy_fields(order, ArchivedOrder)) for order in orders])
+        ArchivedOrderItem.objects.bulk_create([
+            ArchivedOrderItem(**copy_fields(item, ArchivedOrderItem))
+            for item in OrderItem.objects.filter(order_id__in=order_ids)
+        ])
+        archived_through.objects.bulk_create([
+            archived_through(archivedorder_id=order_id, employee_id=employee_id)
+            for order_id, employee_id in through.objects.filter(order_id__in=order_ids).values_list(
+                'order_id', 'employee_id'
+            )
+        ])
+
+        # Raw deletes skip the per-object delete signals: the rows are copied, not gone,
+        # so the rollups stay valid and the caller bumps the cache versions once
+        through.objects.filter(order_id__in=order_ids)._raw_delete(Order.objects.db)
+        OrderItem.objects.filter(order_id__in=order_ids)._raw_delete(Order.objects.db)
+        Order.objects.filter(pk__in=order_ids)._raw_delete(Order.objects.db)
+
+    return len(orders)
+
+
+def with_archive(orders, archived_orders):
+    """Union of the keys of live and archived orders, newest first, for one paginated list"""
+    def keys(queryset, archived):
+        return queryset.order_by().prefetch_related(None).annotate(
+            archived=Value(archived, output_field=BooleanField())
+        ).values(*ORDER_PAGE_KEYS)
+
+    return keys(orders, False).union(keys(archived_orders, True), all=True).order_by(
+        '-order_date', '-created_at', '-id'
+    )
+
+
+def load_order_page(page_obj):
+    """Replace the union keys of a page with the orders themselves"""
+    keys = list(page_obj.object_list)
+    live = Order.objects.select_related('client', 'car').prefetch_related('order_items').in_bulk(
+        [key['id'] for key in keys if not key['archived']]
+    )
+    archived = ArchivedOrder.objects.select_related('client', 'car').prefetch_related('order_items').in_bulk(
+        [key['id'] for key in keys if key['archived']]
+    )
+    page_obj.object_list = [(archived if key['archived'] else live)[key['id']] for key in keys]
+    return page_obj
+
+
+def paginate_orders(orders, params, per_page):
+    """
+    Page of the filtered live orders, or of live and archived orders together
+    when include_archive is set. Returns (paginator, page_obj).
+    """
+    if not wants_archive(params):
+        paginator = Paginator(orders, per_page)
+        return paginator, paginator.get_page(params.get('page'))
+
+    archived_orders = filter_orders(ArchivedOrder.objects.all(), params)
+    paginator = Paginator(with_archive(orders, archived_orders), per_page)
+    return paginator, load_order_page(paginator.get_page(params.get('page')))
+
+
+def get_order_or_archived(pk):
+    """Live order by id, else the archived one"""
+    order = Order.objects.filter(pk=pk).first() or ArchivedOrder.objects.filter(pk=pk).first()
+    if order is None:
+        raise Http404
+    return order
@@ -0,0 +1,56 @@
+"""
+Benchmark utilities
+Times dashboard pages through the Django test client and reports response size and query count
+"""
+
+import time
+
+from django.conf import settings
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+
+
+def get_benchmark_client():
+    """Test client with a host accepted by ALLOWED_HOSTS"""
+    hosts = [host for host in settings.ALLOWED_HOSTS if host and host != '*' and not host.startswith('.')]
+    return Client(HTTP_HOST=hosts[0] if hosts else 'localhost')
+
+
+def time_request(client, path, repeat=5, method='get', **kwargs):
+    """
+    Request a path several times and return timing statistics.
+    The first request is a warm-up and is not counted.
+    """
+    request = getattr(client, method)
+    request(path, **kwargs)
+
+    timings = []
+    response = None
+    with CaptureQueriesContext(connection) as queries:
+        for _ in range(repeat):
+            started = time.perf_counter()
+            response = request(path, **kwargs)
+            if getattr(response, 'streaming', False):
+                content = b''.join(response.streaming_content)
+            else:
+                content = response.content
+            timings.append((time.perf_counter() - started) * 1000)
+
+    return {
+        'path': path,
+        'status': response.status_code,
+        'avg_ms': round(sum(timings) / len(timings), 2),
+        'min_ms': round(min(timings), 2),
+        'max_ms': round(max(timings), 2),
+        'bytes': len(content),
+        'queries': len(queries) // repeat,
+    }
+
+
+def format_result(result):
+    """One-line summary of a time_request result"""
+    return (
+        f"{result['path']} [{result['status']}]: avg {result['avg_ms']} ms, "
+        f"min {result['min_ms']} ms, {result['bytes']} bytes, {result['queries']} queries"
+    )
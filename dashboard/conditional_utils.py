@@ -0,0 +1,142 @@
+"""
+Conditional GET utilities
+Per-model change counters and a decorator that answers 304 Not Modified
+from an ETag built from those counters, before the view runs its queries.
+The counters live in the 'versions' cache (a database table, see
+settings.CACHES), so every worker and management command sees each bump;
+within a request each counter is read at most once (version_snapshot).
+"""
+
+import hashlib
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+
+from django.core.cache import caches
+from django.utils.cache import patch_cache_control
+from django.utils.http import urlencode
+from django.views.decorators.http import condition
+
+
+# Query parameters that never change the response (jQuery cache busters)
+IGNORED_QUERY_PARAMS = {'_'}
+
+# Cache shared by all processes that holds the change counters
+VERSION_CACHE = 'versions'
+
+# Counters already read by the request in progress, {key: version} (None outside one)
+_request_versions = ContextVar('request_versions', default=None)
+
+
+@contextmanager
+def version_snapshot():
+    """
+    Read each counter at most once inside the block (used per request by
+    VersionSnapshotMiddleware), so e.g. a formset of OrderItemForms costs one
+    units version lookup instead of one per form
+    """
+    if _request_versions.get() is not None:
+        yield
+        return
+    token = _request_versions.set({})
+    try:
+        yield
+    finally:
+        _request_versions.reset(token)
+
+
+def get_version(key):
+    """
+    Get a change counter from the shared version cache.
+    A missing counter is seeded from the clock, so an evicted counter never
+    comes back with a number that older ETags or cache keys were built from.
+    """
+    versions = _request_versions.get()
+    if versions is not None and key in versions:
+        return versions[key]
+
+    cache = caches[VERSION_CACHE]
+    version = cache.get(key)
+    if version is None:
+        version = int(time.time() * 1000)
+        if not cache.add(key, version, None):
+            version = cache.get(key, version)
+
+    if versions is not None:
+        versions[key] = version
+    return version
+
+
+def bump_version(key):
+    """Change a counter for every process"""
+    cache = caches[VERSION_CACHE]
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, int(time.time() * 1000), None)
+
+    # A change made by this request is seen by its own later reads
+    versions = _request_versions.get()
+    if versions is not None:
+        versions.pop(key, None)
+
+
+def model_version_key(model):
+    return f'model_version:{model._meta.label_lower}'
+
+
+def get_model_version(model):
+    """Get the change counter of a model"""
+    return get_version(model_version_key(model))
+
+
+def bump_model_version(model):
+    """Invalidate ETags that depend on a model (called from its post_save/post_delete signals)"""
+    bump_version(model_version_key(model))
+
+
+def normalized_query(request):
+    """Sorted query string without empty values, so equivalent URLs share an ETag"""
+    params = sorted(
+        (name, value)
+        for name, values in request.GET.lists()
+        if name not in IGNORED_QUERY_PARAMS
+        for value in values
+        if value != ''
+    )
+    return urlencode(params)
+
+
+def conditional_get(*sources, ajax_only=False):
+    """
+    ETag / If-None-Match handling for read-only JSON endpoints.
+    sources are model classes (their change counters) or callables returning
+    a version, e.g. get_planner_version or timezone.localdate for payloads
+    that depend on today's date. With ajax_only, only AJAX requests of a
+    view that also serves a full page are handled.
+    """
+    def etag_func(request, *args, **kwargs):
+        if ajax_only and not (
+            request.headers.get('X-Requested-With') == 'XMLHttpRequest' or request.GET.get('ajax')
+        ):
+            return None
+        versions = [
+            get_model_version(source) if isinstance(source, type) else source()
+            for source in sources
+        ]
+        raw = f"{request.path}?{normalized_query(request)}|{'|'.join(str(v) for v in versions)}"
+        return hashlib.md5(raw.encode()).hexdigest()
+
+    def decorator(view_func):
+        conditional_view = condition(etag_func=etag_func)(view_func)
+
+        @wraps(view_func)
+        def wrapper(request, *args, **kwargs):
+            response = conditional_view(request, *args, **kwargs)
+            if response.has_header('ETag'):
+                # Browsers keep the response but revalidate it on every request
+                patch_cache_control(response, private=True, no_cache=True)
+            return response
+        return wrapper
+    return decorator
@@ -0,0 +1,142 @@
+"""
+Employee scheduling conflict detection
+Finds events that overlap other events of the same employee or fall on approved leave
+"""
+
+from datetime import timedelta
+
+from django.utils import timezone
+
+from .models import DaysOff, Event
+from .planner_utils import IntervalIndex, local_day_start
+
+
+def event_local_dates(start_datetime, end_datetime):
+    """
+    Return the inclusive local (start_date, end_date) an event occupies.
+    An event ending exactly at midnight does not occupy the following day.
+    """
+    start_date = timezone.localtime(start_datetime).date()
+    if end_datetime > start_datetime:
+        end_date = timezone.localtime(end_datetime - timedelta(microseconds=1)).date()
+    else:
+        end_date = start_date
+    return start_date, end_date
+
+
+def serialize_event_conflict(event, other):
+    """Describe an overlap between two events of the same employee"""
+    other_start = timezone.localtime(other.start_datetime)
+    other_end = timezone.localtime(other.end_datetime)
+    return {
+        'type': 'event',
+        'event_id': event.id,
+        'employee_id': event.employee_id,
+        'conflict_id': other.id,
+        'message': f'Застъпва се със събитие "{other.title}" '
+                   f'({other_start.strftime("%d.%m.%Y %H:%M")} - {other_end.strftime("%H:%M")})'
+    }
+
+
+def serialize_leave_conflict(event, day_off):
+    """Describe an event that falls on an approved day off"""
+    return {
+        'type': 'days_off',
+        'event_id': event.id,
+        'employee_id': event.employee_id,
+        'conflict_id': day_off.id,
+        'message': f'Служителят е в отпуск ({day_off.get_day_off_type_display()}) '
+                   f'{day_off.start_date.strftime("%d.%m.%Y")} - {day_off.end_date.strftime("%d.%m.%Y")}'
+    }
+
+
+def find_event_conflicts(event):
+    """
+    Check a single (possibly unsaved) event against the employee's other events
+    and approved days off. Only rows overlapping the event are loaded.
+    """
+    if not event.employee_id or not event.start_datetime or not event.end_datetime:
+        return []
+
+    overlapping_events = Event.objects.filter(
+        employee_id=event.employee_id,
+        start_datetime__lt=event.end_datetime,
+        end_datetime__gt=event.start_datetime
+    ).order_by('start_datetime')
+    if event.pk:
+        overlapping_events = overlapping_events.exclude(pk=event.pk)
+
+    start_date, end_date = event_local_dates(event.start_datetime, event.end_datetime)
+    days_off = DaysOff.objects.filter(
+        employee_id=event.employee_id,
+        is_approved=True,
+        start_date__lte=end_date,
+        end_date__gte=start_date
+    )
+
+    conflicts = [serialize_event_conflict(event, other) for other in overlapping_events]
+    conflicts += [serialize_leave_conflict(event, day_off) for day_off in days_off]
+    return conflicts
+
+
+def sweep_event_overlaps(events):
+    """
+    Find overlapping pairs among one employee's events sorted by start.
+    Keeps only the events still running at each start, so the sweep costs
+    O(n log n) for sorting plus the number of overlaps.
+    """
+    overlaps = []
+    active = []
+    for event in events:
+        active = [other for other in active if other.end_datetime > event.start_datetime]
+        for other in active:
+            overlaps.append((event, other))
+        active.append(event)
+    return overlaps
+
+
+def find_range_conflicts(start_date, end_date):
+    """
+    Find conflicts for all employees in the inclusive local date range.
+    Events and approved days off are loaded with two range queries, grouped
+    per employee and swept in memory.
+    """
+    range_start = local_day_start(start_date)
+    range_end = local_day_start(end_date + timedelta(days=1))
+
+    events = Event.objects.filter(
+        employee__isnull=False,
+        start_datetime__lt=range_end,
+        end_datetime__gt=range_start
+    ).order_by('employee_id', 'start_datetime')
+
+    days_off = DaysOff.objects.filter(
+        is_approved=True,
+        start_date__lte=end_date,
+        end_date__gte=start_date
+    )
+
+    events_by_employee = {}
+    for event in events:
+        events_by_employee.setdefault(event.employee_id, []).append(event)
+
+    days_off_by_employee = {}
+    for day_off in days_off:
+        days_off_by_employee.setdefault(day_off.employee_id, []).append(
+            (day_off.start_date, day_off.end_date, day_off)
+        )
+
+    conflicts = []
+    for employee_id, employee_events in events_by_employee.items():
+        for event, other in sweep_event_overlaps(employee_events):
+            conflicts.append(serialize_event_conflict(event, other))
+
+        leave_index = IntervalIndex(days_off_by_employee.get(employee_id, []))
+        if not len(leave_index):
+            continue
+        for event in employee_events:
+            event_start, event_end = event_local_dates(event.start_datetime, event.end_datetime)
+            for _, _, day_off in leave_index.overlapping(event_start, event_end):
+                conflicts.append(serialize_leave_conflict(event, day_off))
+
+    return conflicts
@@ -3,55 +3,199 @@ Currency conversion utilities for Bulgarian car service system
 Handles BGN to EUR conversion and dual currency display
 """
 
+import bisect
+from contextlib import contextmanager
+from contextvars import ContextVar
 from decimal import Decimal, ROUND_HALF_UP
-from django.core.cache import cache
+from django.utils import timezone
 from datetime import datetime, timedelta
 
+from .conditional_utils import bump_version, get_version
+from .models import ExchangeRate
 
-def get_eur_rate():
+
+CENT = Decimal('0.01')
+ZERO = Decimal('0.00')
+FALLBACK_EUR_RATE = Decimal('1.95583')  # Fixed BGN/EUR rate, used before the first stored rate
+
+EXCHANGE_RATES_VERSION_KEY = 'exchange_rates_version'
+
+# Per-process copy of the rate table: {'version': ..., 'table': ExchangeRateTable}
+_rates = {}
+
+# Currency context of the request or render in progress (None outside one)
+_currency_context = ContextVar('currency_context', default=None)
+
+
+class ExchangeRateTable:
     """
-    Get current EUR to BGN exchange rate
-    For now, uses a fixed rate. In production, this would fetch from BNB API
+    Stored rates expanded to one entry per calendar day, so the rate valid on a
+    date (the latest rate on or before it) is a single dict lookup
     """
-    # Try to get from cache first (cache for 1 hour)
-    cached_rate = cache.get('eur_bgn_rate')
-    if cached_rate:
-        return Decimal(str(cached_rate))
-    
-    # For now, use a fixed rate (update this regularly)
-    # In production, you would fetch from Bulgarian National Bank API
-    fallback_rate = Decimal('1.95583')  # Approximate BGN/EUR rate
-    cache.set('eur_bgn_rate', float(fallback_rate), 3600)
-    return fallback_rate
+
+    def __init__(self, rates):
+        self.dates = sorted(rates)
+        self.by_day = {}
+        for i, day in enumerate(self.dates):
+            end = self.dates[i + 1] if i + 1 < len(self.dates) else day + timedelta(days=1)
+            rate = rates[day]
+            while day < end:
+                self.by_day[day] = rate
+                day += timedelta(days=1)
+        self.last_rate = rates[self.dates[-1]] if self.dates else FALLBACK_EUR_RATE
+
+    def rate_on(self, day):
+        """Rate valid on a date; after the last stored date the last rate stays valid"""
+        rate = self.by_day.get(day)
+        if rate is not None:
+            return rate
+        if self.dates and day > self.dates[-1]:
+            return self.last_rate
+        return FALLBACK_EUR_RATE
+
+    def rate_date_on(self, day):
+        """Date of the stored rate valid on a date, or None when the fallback rate applies"""
+        index = bisect.bisect_right(self.dates, day)
+        return self.dates[index - 1] if index else None
+
+
+def get_exchange_rates_version():
+    """Get the current rate table version (from the version cache shared by all processes)"""
+    return get_version(EXCHANGE_RATES_VERSION_KEY)
 
 
-def bgn_to_eur(bgn_amount):
+def bump_exchange_rates_version():
+    """Reload the rate table in every process (called when ExchangeRate changes)"""
+    bump_version(EXCHANGE_RATES_VERSION_KEY)
+
+
+def get_exchange_rates():
+    """In-process rate table, reloaded with one query when the version changes"""
+    version = get_exchange_rates_version()
+    if _rates.get('version') != version:
+        rates = dict(ExchangeRate.objects.values_list('date', 'rate'))
+        _rates.clear()
+        _rates.update({'version': version, 'table': ExchangeRateTable(rates)})
+    return _rates['table']
+
+
+def get_eur_rate(day=None):
     """
-    Convert BGN amount to EUR
+    Get the EUR to BGN exchange rate valid on a date (today by default)
+    """
+    return get_exchange_rates().rate_on(day or timezone.localdate())
+
+
+def to_decimal(value):
+    """Decimal for an amount, without the str() round trip when it already is one"""
+    return value if isinstance(value, Decimal) else Decimal(str(value))
+
+
+class CurrencyContext:
+    """
+    Rate table and today's EUR rate resolved once (on first use) for a request
+    or render, so money filters do not look them up for every value
     """
-    if not bgn_amount:
-        return Decimal('0.00')
-    
-    bgn_decimal = Decimal(str(bgn_amount))
-    eur_rate = get_eur_rate()
-    eur_amount = bgn_decimal / eur_rate
-    return eur_amount.quantize(Decimal('0.01'), rounding=ROUND_HALF_UP)
+
+    def __init__(self, eur_rate=None):
+        self._eur_rate = eur_rate
+        self._rates = None
+
+    @property
+    def rates(self):
+        if self._rates is None:
+            self._rates = get_exchange_rates()
+        return self._rates
+
+    @property
+    def eur_rate(self):
+        if self._eur_rate is None:
+            self._eur_rate = self.rates.rate_on(timezone.localdate())
+        return self._eur_rate
+
+    def rate_on(self, day):
+        """Rate valid on a date (e.g. an invoice date), today's rate without one"""
+        return self.rates.rate_on(day) if day else self.eur_rate
+
+    def to_eur(self, bgn_amount, day=None):
+        if not bgn_amount:
+            return ZERO
+        return (to_decimal(bgn_amount) / self.rate_on(day)).quantize(CENT, rounding=ROUND_HALF_UP)
+
+    def to_bgn(self, eur_amount):
+        if not eur_amount:
+            return ZERO
+        return (to_decimal(eur_amount) * self.eur_rate).quantize(CENT, rounding=ROUND_HALF_UP)
+
+
+def get_currency_context():
+    """Currency context of the current request or render, or a one-off context outside one"""
+    return _currency_context.get() or CurrencyContext()
+
+
+@contextmanager
+def currency_context():
+    """
+    Share one CurrencyContext for everything converted inside the block
+    (used per request by CurrencyContextMiddleware, and for renders outside a request)
+    """
+    if _currency_context.get() is not None:
+        yield _currency_context.get()
+        return
+    context = CurrencyContext()
+    token = _currency_context.set(context)
+    try:
+        yield context
+    finally:
+        _currency_context.reset(token)
+
+
+def iterate_in_currency_context(content, context):
+    """
+    Iterate a streaming response body with context active while each chunk is
+    produced (the server iterates it after the view and the middleware returned)
+    """
+    iterator = iter(content)
+    while True:
+        token = _currency_context.set(context)
+        try:
+            chunk = next(iterator)
+        except StopIteration:
+            return
+        finally:
+            _currency_context.reset(token)
+        yield chunk
+
+
+async def aiterate_in_currency_context(content, context):
+    """iterate_in_currency_context for an async streaming body"""
+    iterator = aiter(content)
+    while True:
+        token = _currency_context.set(context)
+        try:
+            chunk = await anext(iterator)
+        except StopAsyncIteration:
+            return
+        finally:
+            _currency_context.reset(token)
+        yield chunk
+
+
+def bgn_to_eur(bgn_amount, day=None):
+    """
+    Convert BGN amount to EUR (with the rate valid on day, today by default)
+    """
+    return get_currency_context().to_eur(bgn_amount, day)
 
 
 def eur_to_bgn(eur_amount):
     """
     Convert EUR amount to BGN
     """
-    if not eur_amount:
-        return Decimal('0.00')
-    
-    eur_decimal = Decimal(str(eur_amount))
-    eur_rate = get_eur_rate()
-    bgn_amount = eur_decimal * eur_rate
-    return bgn_amount.quantize(Decimal('0.01'), rounding=ROUND_HALF_UP)
+    return get_currency_context().to_bgn(eur_amount)
 
 
-def format_dual_currency(bgn_amount, show_eur=True):
+def format_dual_currency(bgn_amount, show_eur=True, day=None):
     """
     Format amount in both BGN and EUR
     Returns formatted string like "100.00 лв. (51.15 €)"
@@ -59,11 +203,11 @@ def format_dual_currency(bgn_amount, show_eur=True):
     if not bgn_amount:
         return "0.00 лв."
     
-    bgn_decimal = Decimal(str(bgn_amount))
+    bgn_decimal = to_decimal(bgn_amount)
     bgn_formatted = f"{bgn_decimal:.2f} лв."
     
     if show_eur:
-        eur_amount = bgn_to_eur(bgn_decimal)
+        eur_amount = bgn_to_eur(bgn_decimal, day)
         eur_formatted = f"{eur_amount:.2f} €"
         return f"{bgn_formatted} ({eur_formatted})"
     
@@ -78,7 +222,7 @@ def format_currency_table(bgn_amount, show_eur=True):
     if not bgn_amount:
         return ("0.00 лв.", "0.00 €")
     
-    bgn_decimal = Decimal(str(bgn_amount))
+    bgn_decimal = to_decimal(bgn_amount)
     bgn_formatted = f"{bgn_decimal:.2f} лв."
     
     if show_eur:
@@ -94,9 +238,11 @@ def get_currency_info():
     Get current currency information
     Returns dict with rate and last updated info
     """
-    rate = get_eur_rate()
+    context = get_currency_context()
+    rate = context.eur_rate
+    rate_date = context.rates.rate_date_on(timezone.localdate())
     return {
         'eur_rate': float(rate),
-        'last_updated': datetime.now().strftime('%d.%m.%Y %H:%M'),
+        'last_updated': rate_date.strftime('%d.%m.%Y') if rate_date else datetime.now().strftime('%d.%m.%Y %H:%M'),
         'rate_text': f"1 EUR = {rate:.5f} BGN"
     }
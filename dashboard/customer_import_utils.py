@@ -0,0 +1,341 @@
+"""
+Customer import utilities
+Cleaning of the legacy Customer columns and a bulk upsert keyed on
+Customer.number, shared by import_customers_from_csv and
+migrate_clients_from_mdb. On Postgres the rows are COPYed into a temporary
+staging table and merged with a single INSERT ... ON CONFLICT; other backends
+use bulk_create with update_conflicts.
+"""
+
+import codecs
+import csv
+import io
+from itertools import islice
+
+from django.db import connection, transaction
+from django.utils import timezone
+
+from .conditional_utils import bump_model_version
+from .models import Customer
+from .planner_utils import bump_planner_version
+
+
+# Placeholders the legacy exports use for an empty value
+EMPTY_VALUES = {'', 'nan', 'NULL', 'null'}
+
+# A business field holding one of these does not make the customer a company
+NOT_COMPANY_VALUES = EMPTY_VALUES | {'0'}
+
+COMPANY_COLUMNS = ('Customer-Bulstat', 'Customer-MOL', 'Customer-Taxno')
+
+TRUE_VALUES = ['true', '1', 'yes', 'on']
+
+# Customer fields written by the import, in the order of the row tuples
+IMPORT_FIELDS = (
+    'number', 'customer_name', 'customer_address_1', 'customer_mol', 'customer_taxno',
+    'customer_bulstat', 'telno', 'email', 'faxno', 'supplier', 'active', 'is_company',
+)
+BOOLEAN_FIELDS = ('supplier', 'active', 'is_company')
+
+# (position, name, max_length) of the text fields in the row tuples
+MAX_LENGTHS = [
+    (position, name, Customer._meta.get_field(name).max_length)
+    for position, name in enumerate(IMPORT_FIELDS)
+    if name not in BOOLEAN_FIELDS and Customer._meta.get_field(name).max_length
+]
+
+# Bytes decoded at a time while checking the file encoding
+ENCODING_CHUNK_SIZE = 1024 * 1024
+
+# Rows per COPY (Postgres) or per bulk_create (other backends)
+UPSERT_CHUNK_SIZE = 5000
+
+STAGING_TABLE = 'customer_import_staging'
+
+
+def detect_encoding(path, chunk_size=ENCODING_CHUNK_SIZE):
+    """
+    'utf-8-sig' when the whole file is valid UTF-8 (with or without a BOM),
+    else 'windows-1251', the encoding of the legacy Access exports.
+    The whole file is checked: an export can be plain ASCII for its first
+    thousands of rows and only then reach Cyrillic windows-1251 text.
+    """
+    decoder = codecs.getincrementaldecoder('utf-8')()
+    try:
+        with open(path, 'rb') as f:
+            # Incremental decoding: a character split between two chunks is not an error
+            for chunk in iter(lambda: f.read(chunk_size), b''):
+                decoder.decode(chunk)
+            decoder.decode(b'', final=True)
+    except UnicodeDecodeError:
+        return 'windows-1251'
+    return 'utf-8-sig'
+
+
+def decode_errors(encoding):
+    """
+    Error handler for reading an export: windows-1251 only lacks byte 0x98, so a
+    stray byte is replaced; any other encoding fails on bytes that do not decode
+    instead of writing U+FFFD into the customers
+    """
+    return 'replace' if codecs.lookup(encoding).name == 'cp1251' else 'strict'
+
+
+def clean_string(value):
+    if value is None:
+        return ''
+    value = str(value).strip()
+    return '' if value in EMPTY_VALUES else value
+
+
+def clean_number(value):
+    """Integer of a Number value, None when it is missing or does not fit the column"""
+    try:
+        number = int(float(str(value)))
+    except (ValueError, TypeError, OverflowError):
+        return None
+    return number if abs(number) < 2 ** 31 else None
+
+
+def clean_boolean(value):
+    if isinstance(value, bool):
+        return value
+    if isinstance(value, str):
+        return value.strip().lower() in TRUE_VALUES
+    if isinstance(value, (int, float)):
+        return bool(value)
+    return False
+
+
+def is_company_record(record):
+    """Company when any business field (БУЛСТАТ, МОЛ, ДДС номер) has a real value"""
+    return any(str(record.get(column) or '').strip() not in NOT_COMPANY_VALUES for column in COMPANY_COLUMNS)
+
+
+def customer_values(record):
+    """
+    Row tuple (IMPORT_FIELDS order) for a legacy Customer record, or None when it has no
+    valid Number. Business fields are kept only for companies, so is_company matches
+    Customer.has_company_data.
+    """
+    number = clean_number(record.get('Number'))
+    if number is None:
+        return None
+
+    is_company = is_company_record(record)
+    return (
+        number,
+        clean_string(record.get('Customer-Name')),
+        clean_string(record.get('Customer-Address-1')),
+        clean_string(record.get('Customer-MOL')) if is_company else '',
+        clean_string(record.get('Customer-Taxno')) if is_company else '',
+        clean_string(record.get('Customer-Bulstat')) if is_company else '',
+        clean_string(record.get('Telno')),
+        clean_string(record.get('E-mail')),
+        clean_string(record.get('Faxno')),
+        clean_boolean(record.get('supplier', False)),
+        clean_boolean(record.get('active', True)),
+        is_company,
+    )
+
+
+def customer_frame(df):
+    """
+    customer_values for a whole DataFrame of legacy Customer columns (read with
+    dtype=str) using column operations. Returns (frame with the IMPORT_FIELDS
+    columns, number of skipped rows without a valid Number or with a too long value).
+    """
+    import pandas as pd
+
+    stripped = {}
+
+    def column(name):
+        if name not in stripped:
+            if name in df:
+                stripped[name] = df[name].fillna('').str.strip()
+            else:
+                stripped[name] = pd.Series('', index=df.index)
+        return stripped[name]
+
+    def text(name):
+        values = column(name)
+        return values.mask(values.isin(EMPTY_VALUES), '')
+
+    def boolean(name, default):
+        if name not in df:
+            return pd.Series(default, index=df.index)
+        return column(name).str.lower().isin(TRUE_VALUES)
+
+    is_company = pd.Series(False, index=df.index)
+    for name in COMPANY_COLUMNS:
+        is_company |= ~column(name).isin(NOT_COMPANY_VALUES)
+
+    # int(float(value)) of clean_number
+    numbers = pd.to_numeric(column('Number'), errors='coerce')
+
+    frame = pd.DataFrame({
+        'number': numbers,
+        'customer_name': text('Customer-Name'),
+        'customer_address_1': text('Customer-Address-1'),
+        'customer_mol': text('Customer-MOL').where(is_company, ''),
+        'customer_taxno': text('Customer-Taxno').where(is_company, ''),
+        'customer_bulstat': text('Customer-Bulstat').where(is_company, ''),
+        'telno': text('Telno'),
+        'email': text('E-mail'),
+        'faxno': text('Faxno'),
+        'supplier': boolean('supplier', False),
+        'active': boolean('active', True),
+        'is_company': is_company,
+    }, columns=list(IMPORT_FIELDS))
+
+    # Number must fit the integer column (also rules out inf)
+    valid = frame['number'].abs() < 2 ** 31
+    for _, name, max_length in MAX_LENGTHS:
+        valid &= frame[name].str.len() <= max_length
+
+    frame = frame[valid].copy()
+    frame['number'] = frame['number'].astype('float64').astype('int64')
+    return frame, int((~valid).sum())
+
+
+def frame_rows(frame):
+    """Row tuples of a customer_frame, with plain Python values for the database adapters"""
+    return zip(*(frame[name].tolist() for name in IMPORT_FIELDS))
+
+
+def too_long_field(values):
+    """Name of the first text field longer than its column, None when the row fits"""
+    for position, name, max_length in MAX_LENGTHS:
+        if len(values[position]) > max_length:
+            return name
+    return None
+
+
+def upsert_sql():
+    table = connection.ops.quote_name(Customer._meta.db_table)
+    fields = [connection.ops.quote_name(Customer._meta.get_field(name).column) for name in IMPORT_FIELDS]
+    updated = fields[1:]
+    columns = ', '.join(fields)
+    return f"""
+        WITH latest AS (
+            SELECT DISTINCT ON (number) * FROM {STAGING_TABLE} ORDER BY number, line DESC
+        ), upserted AS (
+            INSERT INTO {table} ({columns}, temp_id, customer_doctype, include, customer, created_at, updated_at)
+            SELECT {', '.join('latest.' + name for name in IMPORT_FIELDS)},
+                   CASE WHEN EXISTS (SELECT 1 FROM {table} taken WHERE taken.temp_id = latest.number)
+                        THEN NULL ELSE latest.number END,
+                   0, false, true, %(now)s, %(now)s
+            FROM latest
+            ON CONFLICT (number) DO UPDATE SET
+                {', '.join(f'{column} = EXCLUDED.{column}' for column in updated)},
+                updated_at = EXCLUDED.updated_at
+            WHERE ({', '.join(f'{table}.{column}' for column in updated)})
+                IS DISTINCT FROM ({', '.join(f'EXCLUDED.{column}' for column in updated)})
+            RETURNING (xmax = 0) AS created
+        )
+        SELECT
+            (SELECT count(*) FROM {STAGING_TABLE}),
+            (SELECT count(*) FROM latest),
+            count(*) FILTER (WHERE created),
+            count(*) FILTER (WHERE NOT created)
+        FROM upserted
+    """
+
+
+def upsert_customers_copy(rows, chunk_size):
+    """COPY the rows into a staging table, then merge them into Customer with one statement"""
+    staged_columns = ', '.join(('line',) + IMPORT_FIELDS)
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(f"""
+            CREATE TEMPORARY TABLE {STAGING_TABLE} (
+                line integer, number integer, customer_name text, customer_address_1 text,
+                customer_mol text, customer_taxno text, customer_bulstat text, telno text,
+                email text, faxno text, supplier boolean, active boolean, is_company boolean
+            ) ON COMMIT DROP
+        """)
+
+        # CSV format written by the csv module; FORCE_NOT_NULL keeps empty strings as ''
+        text_columns = ', '.join(name for name in IMPORT_FIELDS[1:] if name not in BOOLEAN_FIELDS)
+        copy_sql = f'COPY {STAGING_TABLE} ({staged_columns}) FROM STDIN WITH (FORMAT csv, FORCE_NOT_NULL ({text_columns}))'
+        rows = ((line,) + values for line, values in enumerate(rows))
+        while True:
+            chunk = list(islice(rows, chunk_size))
+            if not chunk:
+                break
+            buffer = io.StringIO()
+            csv.writer(buffer).writerows(chunk)
+            buffer.seek(0)
+            cursor.copy_expert(copy_sql, buffer)
+
+        cursor.execute(upsert_sql(), {'now': timezone.now()})
+        staged, distinct, created, updated = cursor.fetchone()
+        # ON COMMIT DROP only fires at the outermost commit; inside a caller's
+        # transaction the next upsert would find the table still there
+        cursor.execute(f'DROP TABLE {STAGING_TABLE}')
+
+    return {
+        'created': created,
+        'updated': updated,
+        'unchanged': distinct - created - updated,
+        'duplicates': staged - distinct,
+    }
+
+
+def upsert_customers_orm(rows, chunk_size):
+    """Same result as the COPY path with bulk_create(update_conflicts=True), for SQLite checks"""
+    latest = {}
+    staged = 0
+    for values in rows:
+        latest[values[0]] = values
+        staged += 1
+
+    counts = {'created': 0, 'updated': 0, 'unchanged': 0, 'duplicates': staged - len(latest)}
+    taken_temp_ids = set(Customer.objects.filter(temp_id__isnull=False).values_list('temp_id', flat=True))
+    update_fields = list(IMPORT_FIELDS[1:]) + ['updated_at']
+
+    numbers = list(latest)
+    for start in range(0, len(numbers), chunk_size):
+        chunk = numbers[start:start + chunk_size]
+        existing = {
+            values[0]: values
+            for values in Customer.objects.filter(number__in=chunk).values_list(*IMPORT_FIELDS)
+        }
+        customers = []
+        for number in chunk:
+            values = latest[number]
+            if number in existing:
+                if existing[number] == values:
+                    counts['unchanged'] += 1
+                    continue
+                counts['updated'] += 1
+            else:
+                counts['created'] += 1
+            customer = Customer(**dict(zip(IMPORT_FIELDS, values)))
+            if number not in existing and number not in taken_temp_ids:
+                customer.temp_id = number
+            customers.append(customer)
+
+        with transaction.atomic():
+            Customer.objects.bulk_create(
+                customers, update_conflicts=True, unique_fields=['number'], update_fields=update_fields
+            )
+
+    return counts
+
+
+def upsert_customers(rows, chunk_size=UPSERT_CHUNK_SIZE):
+    """
+    Insert or update customers from row tuples in IMPORT_FIELDS order, keyed on number
+    (the last row of a repeated number wins). New customers get temp_id = number unless
+    another customer already has it. Returns created / updated / unchanged / duplicates counts.
+    """
+    if connection.vendor == 'postgresql':
+        counts = upsert_customers_copy(rows, chunk_size)
+    else:
+        counts = upsert_customers_orm(rows, chunk_size)
+
+    # Neither path sends post_save, which invalidates the ETags of the customer pages
+    # and the planner payloads (they show the customer name)
+    bump_model_version(Customer)
+    bump_planner_version()
+    return counts
@@ -0,0 +1,80 @@
+"""
+Customer utilities
+Per-car service summaries and car previews for the customer pages
+"""
+
+from decimal import Decimal
+
+from django.db.models import Case, Count, DecimalField, F, Max, OuterRef, Prefetch, Q, Subquery, Sum, Value, When
+from django.db.models.functions import Coalesce
+
+from .models import Car
+
+
+# Active cars shown inline per row in the customer table
+CUSTOMER_TABLE_CARS = 3
+
+
+# Item total with VAT, same rule as OrderItem.total_price_with_vat
+ITEM_TOTAL_WITH_VAT = Coalesce(
+    F('order__order_items__price_with_vat'),
+    Case(
+        When(order__order_items__include_vat=True, then=F('order__order_items__purchase_price') * Value(Decimal('1.20'))),
+        default=F('order__order_items__purchase_price'),
+    ),
+    output_field=DecimalField(max_digits=14, decimal_places=4)
+) * F('order__order_items__quantity')
+
+
+def annotate_car_summary(cars):
+    """
+    Annotate cars with order_count, last_service_date and lifetime_spend
+    (invoiced orders, with VAT) in a single grouped query.
+    """
+    return cars.annotate(
+        order_count=Count('order', distinct=True),
+        last_service_date=Max('order__order_date'),
+        lifetime_spend=Coalesce(
+            Sum(ITEM_TOTAL_WITH_VAT, filter=Q(order__status='invoice')),
+            Value(Decimal('0')),
+            output_field=DecimalField(max_digits=14, decimal_places=4)
+        ),
+    )
+
+
+def serialize_car_summary(car):
+    """Serialize an annotated car for the JSON summary endpoint"""
+    return {
+        'id': car.id,
+        'brand_model': car.brand_model,
+        'vin': car.vin,
+        'plate_number': car.plate_number,
+        'year': car.year,
+        'is_active': car.is_active,
+        'order_count': car.order_count,
+        'last_service_date': car.last_service_date.strftime('%d.%m.%Y') if car.last_service_date else None,
+        'lifetime_spend': float(round(car.lifetime_spend, 2)),
+    }
+
+
+def with_car_preview(customers):
+    """
+    Annotate customers with cars_count (active cars) and prefetch the first
+    CUSTOMER_TABLE_CARS active cars into preview_cars.
+    The count is a correlated subquery so car search joins do not affect it, and
+    the sliced Prefetch is limited per customer with a window function, so a
+    page renders with a fixed number of queries.
+    """
+    active_cars = Car.objects.filter(is_active=True)
+    cars_count = active_cars.filter(customer=OuterRef('pk')).order_by().values('customer').annotate(
+        count=Count('id')
+    ).values('count')
+    return customers.annotate(
+        cars_count=Coalesce(Subquery(cars_count), 0)
+    ).prefetch_related(
+        Prefetch(
+            'cars',
+            queryset=active_cars.order_by('brand_model', 'id')[:CUSTOMER_TABLE_CARS],
+            to_attr='preview_cars'
+        )
+    )
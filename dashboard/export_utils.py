@@ -0,0 +1,196 @@
+"""
+Export utilities
+CSV and XLSX exports of the list pages with their current filters applied.
+Rows are read with queryset.iterator() and written one at a time, so memory
+use does not grow with the size of the export.
+"""
+
+import csv
+import tempfile
+from itertools import chain
+from datetime import date, datetime
+from decimal import Decimal, ROUND_HALF_UP
+
+from django.http import FileResponse, StreamingHttpResponse
+from django.utils import timezone
+
+
+# Rows fetched per database round trip (and per prefetch_related batch)
+EXPORT_CHUNK_SIZE = 2000
+
+XLSX_CONTENT_TYPE = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+
+CUSTOMER_EXPORT_HEADERS = [
+    'Номер', 'Име', 'Тип', 'БУЛСТАТ', 'ДДС номер', 'МОЛ', 'Адрес', 'Телефон', 'Имейл', 'Клиент', 'Доставчик', 'Активен'
+]
+
+ORDER_EXPORT_HEADERS = [
+    'Номер', 'Дата', 'Статус', 'Клиент', 'Телефон', 'Кола', 'Рег. номер', 'VIN', 'Пробег',
+    'Общо без ДДС', 'ДДС', 'Общо с ДДС'
+]
+
+INVOICE_EXPORT_HEADERS = [
+    'Номер', 'Дата', 'Падеж', 'Статус', 'Клиент', 'ДДС номер', 'Телефон', 'Кола', 'Рег. номер',
+    'Сума без ДДС', 'ДДС', 'Обща сума'
+]
+
+SKLAD_EXPORT_HEADERS = [
+    'Артикул номер', 'Наименование', 'Мярка', 'Количество', 'Единична цена', 'Обща стойност', 'Активен'
+]
+
+
+def yes_no(value):
+    return 'Да' if value else 'Не'
+
+
+def customer_export_row(customer):
+    return [
+        customer.number,
+        customer.customer_name,
+        customer.customer_type,
+        customer.customer_bulstat,
+        customer.customer_taxno,
+        customer.customer_mol,
+        customer.full_address,
+        customer.telno,
+        customer.email,
+        yes_no(customer.customer),
+        yes_no(customer.supplier),
+        yes_no(customer.active),
+    ]
+
+
+def order_export_row(order):
+    """Row for an order annotated with sales_rollup_utils.order_totals"""
+    return [
+        order.order_number,
+        order.order_date,
+        order.get_status_display(),
+        order.get_client_display(),
+        order.client_phone,
+        order.car_brand_model,
+        order.car_plate_number,
+        order.car_vin,
+        order.car_mileage,
+        order.sum_without_vat,
+        order.sum_vat,
+        order.sum_with_vat,
+    ]
+
+
+def invoice_export_row(invoice):
+    return [
+        invoice.invoice_number,
+        invoice.invoice_date,
+        invoice.due_date,
+        invoice.get_status_display(),
+        invoice.client_name,
+        invoice.client_tax_number,
+        invoice.client_phone,
+        invoice.car_brand_model,
+        invoice.car_plate_number,
+        invoice.subtotal,
+        invoice.vat_amount,
+        invoice.total_amount,
+    ]
+
+
+def sklad_export_row(item):
+    return [
+        item.article_number,
+        item.name,
+        item.unit,
+        item.quantity,
+        item.purchase_price,
+        item.total_value,
+        yes_no(item.is_active),
+    ]
+
+
+def round_money(value):
+    """Amounts are rounded like the |floatformat:2 filter on the pages"""
+    return value.quantize(Decimal('0.01'), rounding=ROUND_HALF_UP)
+
+
+def csv_value(value):
+    if value is None:
+        return ''
+    if isinstance(value, (date, datetime)):
+        return value.strftime('%d.%m.%Y')
+    if isinstance(value, Decimal):
+        return str(round_money(value))
+    return value
+
+
+class Echo:
+    """File-like object whose write returns the line, so csv.writer can feed a generator"""
+
+    def write(self, value):
+        return value
+
+
+def csv_lines(headers, row_func, objects):
+    writer = csv.writer(Echo())
+    # BOM so Excel opens the file as UTF-8
+    yield '\ufeff' + writer.writerow(headers)
+    for obj in objects:
+        yield writer.writerow([csv_value(value) for value in row_func(obj)])
+
+
+def xlsx_file(headers, row_func, objects, title):
+    """
+    Workbook written in openpyxl's write-only mode (rows go to a temporary file
+    as they are appended), saved to a temporary file for streaming
+    """
+    from openpyxl import Workbook
+    from openpyxl.cell import WriteOnlyCell
+    from openpyxl.cell.cell import ILLEGAL_CHARACTERS_RE
+
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet(title)
+
+    def cell(value):
+        if isinstance(value, str):
+            return ILLEGAL_CHARACTERS_RE.sub('', value)
+        if isinstance(value, (date, datetime)):
+            date_cell = WriteOnlyCell(sheet, value=value)
+            date_cell.number_format = 'DD.MM.YYYY'
+            return date_cell
+        if isinstance(value, Decimal):
+            return round_money(value)
+        return value
+
+    sheet.append(headers)
+    for obj in objects:
+        sheet.append([cell(value) for value in row_func(obj)])
+
+    output = tempfile.TemporaryFile()
+    workbook.save(output)
+    output.seek(0)
+    return output
+
+
+def export_response(request, queryset, headers, row_func, name, title):
+    """
+    Streaming CSV (default) or XLSX (format=xlsx) response with one row per
+    object of the queryset (or of a list of querysets, one after the other),
+    named <name>_<date>.csv / .xlsx
+    """
+    querysets = queryset if isinstance(queryset, (list, tuple)) else [queryset]
+    objects = chain.from_iterable(qs.iterator(chunk_size=EXPORT_CHUNK_SIZE) for qs in querysets)
+    filename = f"{name}_{timezone.localdate().isoformat()}"
+
+    if request.GET.get('format') == 'xlsx':
+        return FileResponse(
+            xlsx_file(headers, row_func, objects, title),
+            as_attachment=True,
+            filename=f'{filename}.xlsx',
+            content_type=XLSX_CONTENT_TYPE,
+        )
+
+    response = StreamingHttpResponse(
+        csv_lines(headers, row_func, objects),
+        content_type='text/csv; charset=utf-8',
+    )
+    response['Content-Disposition'] = f'attachment; filename="{filename}.csv"'
+    return response
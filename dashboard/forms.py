@@ -3,6 +3,40 @@ from django.core.exceptions import ValidationError
 from django.forms import inlineformset_factory
 from .models import Customer, Car, Employee, DaysOff, Sklad, Order, OrderItem
 
+
+class LazyModelSelect(forms.Select):
+    """
+    Select for large tables that renders only the selected option.
+    The page loads other options from the autocomplete endpoint, and
+    ModelChoiceField validation looks up just the submitted id.
+    """
+    
+    def __init__(self, attrs=None, autocomplete_url=None):
+        super().__init__(attrs)
+        if autocomplete_url:
+            self.attrs['data-autocomplete-url'] = autocomplete_url
+    
+    def optgroups(self, name, value, attrs=None):
+        full_choices = self.choices
+        choices = []
+        field = getattr(full_choices, 'field', None)
+        if field is not None and field.empty_label is not None:
+            choices.append(('', field.empty_label))
+        
+        selected = [v for v in value if v not in (None, '')]
+        if selected and hasattr(full_choices, 'queryset'):
+            try:
+                choices += [full_choices.choice(obj) for obj in full_choices.queryset.filter(pk__in=selected)]
+            except (ValueError, TypeError, ValidationError):
+                pass  # Invalid submitted id, the field reports the error
+        
+        self.choices = choices
+        try:
+            return super().optgroups(name, value, attrs)
+        finally:
+            self.choices = full_choices
+
+
 class CustomerForm(forms.ModelForm):
     """Form for creating and editing customers with simplified fields"""
     
@@ -561,11 +595,9 @@ class SkladSearchForm(forms.Form):
     
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
-        # Populate unit choices from database
-        from .models import Sklad
-        units = Sklad.objects.values_list('unit', flat=True).distinct().order_by('unit')
-        unit_choices = [('', 'Всички мерни единици')] + [(unit, unit) for unit in units if unit]
-        self.fields['unit_filter'].choices = unit_choices
+        # Populate unit choices from the cached unit vocabulary
+        from .unit_utils import get_unit_choices
+        self.fields['unit_filter'].choices = get_unit_choices('Всички мерни единици')
 
 
 class OrderForm(forms.ModelForm):
@@ -776,11 +808,9 @@ class OrderItemForm(forms.ModelForm):
         # Article number is optional (for services/labor)
         self.fields['article_number'].required = False
         
-        # Populate unit choices from database
-        from .models import Sklad
-        units = Sklad.objects.values_list('unit', flat=True).distinct().order_by('unit')
-        unit_choices = [('', 'Избери мерна единица')] + [(unit, unit) for unit in units if unit]
-        self.fields['unit'].choices = unit_choices
+        # Populate unit choices from the cached unit vocabulary
+        from .unit_utils import get_unit_choices
+        self.fields['unit'].choices = get_unit_choices('Избери мерна единица')
     
     def clean(self):
         cleaned_data = super().clean()
@@ -805,14 +835,15 @@ class OrderForm(forms.ModelForm):
         ]
         
         widgets = {
-            'client': forms.Select(attrs={
+            'client': LazyModelSelect(attrs={
                 'class': 'form-select',
                 'id': 'client-select'
-            }),
+            }, autocomplete_url='/poruchki/autocomplete/client/'),
             'client_name': forms.TextInput(attrs={
                 'class': 'form-control',
                 'placeholder': 'Име на клиента',
-                'id': 'client-name'
+                'id': 'client-name',
+                'autocomplete': 'off'
             }),
             'client_address': forms.TextInput(attrs={
                 'class': 'form-control',
@@ -824,10 +855,10 @@ class OrderForm(forms.ModelForm):
                 'placeholder': 'Телефон на клиента',
                 'id': 'client-phone'
             }),
-            'car': forms.Select(attrs={
+            'car': LazyModelSelect(attrs={
                 'class': 'form-select',
                 'id': 'car-select'
-            }),
+            }, autocomplete_url='/poruchki/autocomplete/car-plate/'),
             'car_brand_model': forms.TextInput(attrs={
                 'class': 'form-control',
                 'placeholder': 'Марка и модел на колата',
@@ -864,15 +895,12 @@ class OrderForm(forms.ModelForm):
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
         
-        # Populate client choices
-        from .models import Customer
-        customers = Customer.objects.all().order_by('customer_name')
-        self.fields['client'].choices = [('', 'Избери клиент от базата данни')] + [(customer.id, f"{customer.customer_name} ({customer.telno})") for customer in customers]
-        
-        # Populate car choices
-        from .models import Car
-        cars = Car.objects.all().order_by('brand_model')
-        self.fields['car'].choices = [('', 'Избери кола от базата данни')] + [(car.id, f"{car.brand_model} ({car.plate_number})") for car in cars]
+        # Client and car selects are lazy: only the selected option is rendered
+        # and validation looks up the submitted id alone
+        self.fields['client'].empty_label = 'Избери клиент от базата данни'
+        self.fields['client'].label_from_instance = lambda customer: f"{customer.customer_name} ({customer.telno})"
+        self.fields['car'].empty_label = 'Избери кола от базата данни'
+        self.fields['car'].label_from_instance = lambda car: f"{car.brand_model} ({car.plate_number})"
         
         # Populate employee choices
         from .models import Employee
@@ -1005,11 +1033,9 @@ class OrderItemForm(forms.ModelForm):
         # Article number is optional (for services/labor)
         self.fields['article_number'].required = False
         
-        # Populate unit choices from database
-        from .models import Sklad
-        units = Sklad.objects.values_list('unit', flat=True).distinct().order_by('unit')
-        unit_choices = [('', 'Избери мерна единица')] + [(unit, unit) for unit in units if unit]
-        self.fields['unit'].choices = unit_choices
+        # Populate unit choices from the cached unit vocabulary
+        from .unit_utils import get_unit_choices
+        self.fields['unit'].choices = get_unit_choices('Избери мерна единица')
     
     def clean(self):
         cleaned_data = super().clean()
@@ -0,0 +1,103 @@
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from django.core.management.base import BaseCommand
+
+
+AUTOCOMPLETE_PATHS = [
+    '/poruchki/autocomplete/car-vin/?q={query}',
+    '/poruchki/autocomplete/car-plate/?q={query}',
+    '/poruchki/autocomplete/client/?q={query}',
+    '/poruchki/autocomplete/sklad/?q={query}&field=name',
+    '/sklad/autocomplete/?q={query}&field=name',
+]
+
+QUERIES = ['CA', 'CA1', 'WVW', 'Иван', 'Пет', 'филт', 'масл', 'ОО']
+
+
+def percentile(values, percent):
+    """Nearest-rank percentile of a list of numbers"""
+    if not values:
+        return 0
+    ordered = sorted(values)
+    index = max(0, min(len(ordered) - 1, round(percent / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+class Command(BaseCommand):
+    help = 'Fire a burst of autocomplete requests at a running server and measure page latency meanwhile'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--url',
+            default='http://localhost:8000',
+            help='Base URL of the running server (default: http://localhost:8000)'
+        )
+        parser.add_argument(
+            '--requests',
+            type=int,
+            default=300,
+            help='Number of autocomplete requests in the burst (default: 300)'
+        )
+        parser.add_argument(
+            '--concurrency',
+            type=int,
+            default=30,
+            help='Concurrent autocomplete clients (default: 30)'
+        )
+        parser.add_argument(
+            '--page',
+            default='/poruchki/',
+            help='Page timed while the burst runs (default: /poruchki/)'
+        )
+
+    def handle(self, *args, **options):
+        base_url = options['url'].rstrip('/')
+
+        def fetch(path):
+            started = time.perf_counter()
+            response = requests.get(base_url + path, timeout=60)
+            return (time.perf_counter() - started) * 1000, response.status_code
+
+        page_idle, _ = fetch(options['page'])
+        page_idle, _ = fetch(options['page'])
+
+        # Time the page repeatedly while the autocomplete burst is in flight
+        page_timings = []
+        burst_done = threading.Event()
+
+        def time_page():
+            while not burst_done.is_set():
+                elapsed, _ = fetch(options['page'])
+                page_timings.append(elapsed)
+
+        paths = [
+            AUTOCOMPLETE_PATHS[i % len(AUTOCOMPLETE_PATHS)].format(query=QUERIES[i % len(QUERIES)])
+            for i in range(options['requests'])
+        ]
+
+        page_thread = threading.Thread(target=time_page)
+        started = time.perf_counter()
+        page_thread.start()
+        with ThreadPoolExecutor(max_workers=options['concurrency']) as executor:
+            results = list(executor.map(fetch, paths))
+        burst_seconds = time.perf_counter() - started
+        burst_done.set()
+        page_thread.join()
+
+        autocomplete_timings = [elapsed for elapsed, _ in results]
+        errors = sum(1 for _, status in results if status != 200)
+
+        self.stdout.write(f"Autocomplete burst: {len(results)} requests in {burst_seconds:.2f} s "
+                          f"({len(results) / burst_seconds:.1f} req/s), {errors} errors")
+        self.stdout.write(f"  latency p50 {statistics.median(autocomplete_timings):.1f} ms, "
+                          f"p95 {percentile(autocomplete_timings, 95):.1f} ms")
+        self.stdout.write(f"Page {options['page']}: idle {page_idle:.1f} ms")
+        if page_timings:
+            self.stdout.write(f"  during burst: {len(page_timings)} requests, "
+                              f"p50 {statistics.median(page_timings):.1f} ms, "
+                              f"max {max(page_timings):.1f} ms")
+        self.stdout.write(self.style.SUCCESS('Benchmark complete'))
@@ -0,0 +1,83 @@
+import random
+import time
+from decimal import Decimal
+from unittest import mock
+
+from django.core.cache import caches
+from django.core.management.base import BaseCommand
+from django.template import Context, Template
+
+from dashboard.conditional_utils import VERSION_CACHE
+from dashboard.currency_utils import currency_context
+
+
+# Same money columns as the order preview tables
+TABLE_TEMPLATE = Template("""{% load currency_filters %}<table>
+{% for row in rows %}<tr>
+<td>{{ row.price|dual_currency }}</td>
+<td>{{ row.total|dual_currency }}</td>
+<td>{{ row.vat|dual_currency }}</td>
+<td>{{ row.total_with_vat|currency_eur }}</td>
+</tr>{% endfor %}
+</table>""")
+
+
+class Command(BaseCommand):
+    help = 'Time a table render with the currency filters, with and without a shared currency context'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--rows',
+            type=int,
+            default=500,
+            help='Table rows (default: 500)'
+        )
+        parser.add_argument(
+            '--repeat',
+            type=int,
+            default=20,
+            help='Timed renders per mode (default: 20)'
+        )
+
+    def handle(self, *args, **options):
+        rng = random.Random(42)
+        rows = []
+        for _ in range(options['rows']):
+            price = Decimal(rng.randint(100, 500000)) / 100
+            rows.append({
+                'price': price,
+                'total': price * 2,
+                'vat': price * 2 * Decimal('0.20'),
+                'total_with_vat': price * 2 * Decimal('1.20'),
+            })
+        context = Context({'rows': rows})
+
+        def render_per_value():
+            return TABLE_TEMPLATE.render(context)
+
+        def render_shared():
+            with currency_context():
+                return TABLE_TEMPLATE.render(context)
+
+        if render_per_value() != render_shared():
+            self.stdout.write(self.style.ERROR('Renders differ between the two modes'))
+            return
+
+        for label, render in [('rate per value', render_per_value), ('shared context', render_shared)]:
+            # The rate table is reloaded when its version changes, so every rate
+            # lookup reads the version from the shared version cache
+            version_cache = caches[VERSION_CACHE]
+            with mock.patch.object(version_cache, 'get', wraps=version_cache.get) as cache_get:
+                render()
+            lookups = cache_get.call_count
+
+            timings = []
+            for _ in range(options['repeat']):
+                started = time.perf_counter()
+                render()
+                timings.append((time.perf_counter() - started) * 1000)
+            self.stdout.write(
+                f"{label}: {options['rows']} rows, avg {sum(timings) / len(timings):.2f} ms, "
+                f"min {min(timings):.2f} ms, {lookups} rate lookups per render"
+            )
+        self.stdout.write(self.style.SUCCESS('Benchmark complete'))
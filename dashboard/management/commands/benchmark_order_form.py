@@ -0,0 +1,71 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Max
+
+from dashboard.benchmark_utils import get_benchmark_client, time_request, format_result
+from dashboard.models import Customer, Car
+
+
+class Command(BaseCommand):
+    help = 'Measure render time, payload size and query count of the new order form'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--customers',
+            type=int,
+            default=0,
+            help='Temporary customers to add before measuring (rolled back afterwards)'
+        )
+        parser.add_argument(
+            '--cars',
+            type=int,
+            default=0,
+            help='Temporary cars to add before measuring (rolled back afterwards)'
+        )
+        parser.add_argument(
+            '--repeat',
+            type=int,
+            default=5,
+            help='Number of timed requests (default: 5)'
+        )
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            self.seed(options['customers'], options['cars'])
+
+            self.stdout.write(
+                f"Customers: {Customer.objects.count()}, cars: {Car.objects.count()}"
+            )
+            client = get_benchmark_client()
+            result = time_request(client, '/poruchki/nov/', repeat=options['repeat'])
+            self.stdout.write(self.style.SUCCESS(format_result(result)))
+
+            # Temporary rows are never committed
+            transaction.set_rollback(True)
+
+    def seed(self, customer_count, car_count):
+        """Bulk insert placeholder customers and cars"""
+        if customer_count:
+            next_number = (Customer.objects.aggregate(Max('number'))['number__max'] or 0) + 1
+            Customer.objects.bulk_create([
+                Customer(
+                    number=next_number + i,
+                    customer_name=f'Бенчмарк клиент {i}',
+                    telno=f'0888{i:06d}'
+                )
+                for i in range(customer_count)
+            ], batch_size=1000)
+
+        if car_count:
+            customer_ids = list(Customer.objects.values_list('id', flat=True)[:1000])
+            if not customer_ids:
+                self.stdout.write(self.style.WARNING('No customers to attach cars to'))
+                return
+            Car.objects.bulk_create([
+                Car(
+                    customer_id=customer_ids[i % len(customer_ids)],
+                    brand_model=f'Бенчмарк кола {i}',
+                    plate_number=f'CA{i:04d}BM'[:20]
+                )
+                for i in range(car_count)
+            ], batch_size=1000)
@@ -0,0 +1,123 @@
+import json
+import os
+import subprocess
+from datetime import datetime
+from urllib.parse import quote
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from dashboard.benchmark_utils import get_benchmark_client, time_request, format_result
+from dashboard.models import Customer, Car, Order, OrderItem, Sklad, Event
+from dashboard.scale_data_utils import seed_scale_data
+
+
+# Views and AJAX endpoints timed by the suite
+BENCHMARK_PATHS = [
+    '/klienti/',
+    '/klienti/search-ajax/?search=' + quote('Иван'),
+    '/klienti/search-ajax/?page=50',
+    '/klienti/search-ajax/?page=50&format=json',
+    '/pregled-poruchki/',
+    '/pregled-poruchki/search-ajax/?search=CA',
+    '/pregled-poruchki/search-ajax/?page=50',
+    '/pregled-poruchki/search-ajax/?page=50&format=json',
+    '/fakturi/',
+    '/fakturi/search-ajax/?page=5',
+    '/fakturi/search-ajax/?page=5&format=json',
+    '/sklad/',
+    '/sklad/?ajax=1&page=5',
+    '/sklad/?ajax=1&page=5&format=json',
+    '/otcheti/',
+    '/get-weekly-planner/?week=0',
+    '/poruchki/autocomplete/car-vin/?q=WVW',
+    '/poruchki/autocomplete/car-plate/?q=CA1',
+    '/poruchki/autocomplete/client/?q=' + quote('Петр'),
+    '/poruchki/autocomplete/sklad/?q=' + quote('филтър') + '&field=name',
+    '/sklad/autocomplete/?q=SC00&field=article_number',
+]
+
+
+def get_git_commit():
+    """Short hash of the checked out commit, or None outside a git checkout"""
+    try:
+        return subprocess.check_output(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=settings.BASE_DIR, stderr=subprocess.DEVNULL
+        ).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+class Command(BaseCommand):
+    help = 'Time the main dashboard views and AJAX endpoints and save the results as JSON'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--seed',
+            action='store_true',
+            help='Add a synthetic data set before measuring (see --scale)'
+        )
+        parser.add_argument(
+            '--scale',
+            type=float,
+            default=1.0,
+            help='Size of the seeded data set, 1.0 = 100k customers, 250k cars, 500k orders, 2M items'
+        )
+        parser.add_argument(
+            '--random-seed',
+            type=int,
+            default=42,
+            help='Random seed for the synthetic data (default: 42)'
+        )
+        parser.add_argument(
+            '--repeat',
+            type=int,
+            default=5,
+            help='Timed requests per path (default: 5)'
+        )
+        parser.add_argument(
+            '--output',
+            default=None,
+            help='JSON file for the results (default: benchmark_results/<commit>-<timestamp>.json)'
+        )
+
+    def handle(self, *args, **options):
+        if options['seed']:
+            self.stdout.write(f"Seeding data at scale {options['scale']}...")
+            seed_scale_data(options['scale'], options['random_seed'], log=self.stdout.write)
+
+        row_counts = {
+            'customers': Customer.objects.count(),
+            'cars': Car.objects.count(),
+            'orders': Order.objects.count(),
+            'order_items': OrderItem.objects.count(),
+            'sklad': Sklad.objects.count(),
+            'events': Event.objects.count(),
+        }
+        self.stdout.write(', '.join(f'{name}: {count}' for name, count in row_counts.items()))
+
+        client = get_benchmark_client()
+        results = []
+        for path in BENCHMARK_PATHS:
+            result = time_request(client, path, repeat=options['repeat'])
+            results.append(result)
+            self.stdout.write(format_result(result))
+
+        commit = get_git_commit()
+        timestamp = datetime.now().strftime('%Y%m%d-%H%M%S')
+        output = options['output'] or os.path.join(
+            settings.BASE_DIR, 'benchmark_results', f"{commit or 'nogit'}-{timestamp}.json"
+        )
+        os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+        with open(output, 'w', encoding='utf-8') as f:
+            json.dump({
+                'commit': commit,
+                'timestamp': timestamp,
+                'database': connection.vendor,
+                'repeat': options['repeat'],
+                'row_counts': row_counts,
+                'results': results,
+            }, f, ensure_ascii=False, indent=2)
+
+        self.stdout.write(self.style.SUCCESS(f'Results saved to {output}'))
@@ -1,11 +1,12 @@
 import csv
 import os
-import sys
+import time
+from itertools import islice
 from django.core.management.base import BaseCommand, CommandError
-from django.db import transaction
+from dashboard.customer_import_utils import (
+    customer_values, decode_errors, detect_encoding, too_long_field, upsert_customers, IMPORT_FIELDS
+)
 from dashboard.models import Customer
-import re
-from datetime import datetime
 
 
 class Command(BaseCommand):
@@ -18,6 +19,11 @@ class Command(BaseCommand):
             default='customer_data_fixed.csv',
             help='Path to the CSV file (relative to project root)'
         )
+        parser.add_argument(
+            '--encoding',
+            type=str,
+            help='File encoding (default: detected from the whole file)'
+        )
         parser.add_argument(
             '--dry-run',
             action='store_true',
@@ -49,20 +55,23 @@ class Command(BaseCommand):
 
         self.stdout.write(f'Processing CSV file: {csv_path}')
 
+        encoding = options['encoding'] or detect_encoding(csv_path)
+        self.stdout.write(f'Reading with {encoding} encoding')
+
+        self.stats = {'total': 0, 'companies': 0, 'individuals': 0, 'skipped': 0}
+        self.samples = {'company': [], 'individual': []}
+
         try:
-            # Read and process CSV data
-            customers_data = self.read_csv_data(csv_path)
-            
+            rows = self.read_customers(csv_path, encoding)
             if limit:
-                customers_data = customers_data[:limit]
+                rows = islice(rows, limit)
                 self.stdout.write(f'Limited to {limit} records for testing')
 
-            # Show statistics
-            self.show_migration_stats(customers_data)
-
             if dry_run:
                 self.stdout.write(self.style.WARNING('DRY RUN - No data will be imported'))
-                self.show_sample_data(customers_data)
+                for _ in rows:
+                    pass
+                self.show_migration_stats()
                 return
 
             # Clear existing data if requested
@@ -75,223 +84,85 @@ class Command(BaseCommand):
                     return
 
             # Import data
-            self.import_customers(customers_data)
+            self.import_customers(rows)
+            self.show_migration_stats()
 
+        except UnicodeDecodeError as e:
+            raise CommandError(f'Migration failed: the file is not valid {encoding} ({e}), '
+                               f'no customers were imported; pass the right --encoding')
         except Exception as e:
             raise CommandError(f'Migration failed: {str(e)}')
 
-    def read_csv_data(self, csv_path):
-        """Read CSV data and handle encoding"""
-        self.stdout.write('Reading CSV data...')
-        
-        customers = []
-        
-        try:
-            # Try different encodings
-            encodings = ['utf-8', 'windows-1251', 'cp1251', 'latin1']
-            
-            for encoding in encodings:
-                try:
-                    with open(csv_path, 'r', encoding=encoding, errors='replace') as infile:
-                        reader = csv.DictReader(infile)
-                        customers = list(reader)
-                    self.stdout.write(f'Successfully read with {encoding} encoding')
-                    break
-                except UnicodeDecodeError:
+    def read_customers(self, csv_path, encoding):
+        """Yield cleaned and classified row tuples while reading the file, counting skipped rows"""
+        with open(csv_path, 'r', encoding=encoding, errors=decode_errors(encoding), newline='') as infile:
+            for line, record in enumerate(csv.DictReader(infile), 2):
+                values = customer_values(record)
+                if values is None:
+                    self.skip(line, 'no valid Number')
                     continue
-            
-            if not customers:
-                raise CommandError('Could not read CSV file with any supported encoding')
-            
-            # Process and classify customers
-            self.stdout.write('Processing and classifying customers...')
-            
-            for customer in customers:
-                # Clean string values
-                for key, value in customer.items():
-                    if value is None:
-                        customer[key] = ''
-                    else:
-                        customer[key] = str(value).strip()
-                        if customer[key] in ['nan', 'NULL', 'null']:
-                            customer[key] = ''
-                
-                # Classify as company or individual
-                business_fields = ['Customer-Bulstat', 'Customer-MOL', 'Customer-Taxno']
-                is_company = False
-                
-                for field in business_fields:
-                    value = customer.get(field, '').strip()
-                    if value and value not in ['0', 'NULL', 'null', '', 'nan']:
-                        is_company = True
-                        break
-                
-                customer['customer_type'] = 'company' if is_company else 'individual'
-            
-            self.stdout.write(f'Processed {len(customers)} customer records')
-            return customers
-            
-        except Exception as e:
-            raise CommandError(f'Failed to read CSV file: {str(e)}')
 
-    def show_migration_stats(self, customers):
+                field = too_long_field(values)
+                if field:
+                    self.skip(line, f'{field} is too long')
+                    continue
+
+                self.count_customer(values)
+                yield values
+
+    def skip(self, line, reason):
+        self.stats['skipped'] += 1
+        if self.stats['skipped'] <= 10:  # Only show the first 10
+            self.stdout.write(self.style.WARNING(f'Line {line}: {reason}, skipped'))
+
+    def count_customer(self, values):
+        customer = dict(zip(IMPORT_FIELDS, values))
+        customer_type = 'company' if customer['is_company'] else 'individual'
+        self.stats['total'] += 1
+        self.stats['companies' if customer['is_company'] else 'individuals'] += 1
+        if len(self.samples[customer_type]) < 3:
+            self.samples[customer_type].append(customer)
+
+    def show_migration_stats(self):
         """Show migration statistics"""
         self.stdout.write('\n' + '='*50)
         self.stdout.write('MIGRATION STATISTICS')
         self.stdout.write('='*50)
-        
-        total = len(customers)
-        companies = sum(1 for c in customers if c.get('customer_type') == 'company')
-        individuals = sum(1 for c in customers if c.get('customer_type') == 'individual')
-        
+
+        total = self.stats['total']
+        companies = self.stats['companies']
+        individuals = self.stats['individuals']
+
         self.stdout.write(f'Total customers: {total}')
-        self.stdout.write(f'Companies: {companies} ({companies/total*100:.1f}%)')
-        self.stdout.write(f'Individuals: {individuals} ({individuals/total*100:.1f}%)')
-        
+        if total:
+            self.stdout.write(f'Companies: {companies} ({companies/total*100:.1f}%)')
+            self.stdout.write(f'Individuals: {individuals} ({individuals/total*100:.1f}%)')
+        self.stdout.write(f'Skipped rows: {self.stats["skipped"]}')
+
         # Show sample of each type
         self.stdout.write('\nSample Companies:')
-        company_samples = [c for c in customers if c.get('customer_type') == 'company'][:3]
-        for customer in company_samples:
-            name = customer.get('Customer-Name', 'N/A')[:50]
-            bulstat = customer.get('Customer-Bulstat', 'N/A')
-            self.stdout.write(f'  - {name} (BULSTAT: {bulstat})')
-        
-        self.stdout.write('\nSample Individuals:')
-        individual_samples = [c for c in customers if c.get('customer_type') == 'individual'][:3]
-        for customer in individual_samples:
-            name = customer.get('Customer-Name', 'N/A')[:50]
-            phone = customer.get('Telno', 'N/A')
-            self.stdout.write(f'  - {name} (Phone: {phone})')
+        for customer in self.samples['company']:
+            self.stdout.write(f'  - {customer["customer_name"][:50]} (BULSTAT: {customer["customer_bulstat"]})')
 
-    def show_sample_data(self, customers):
-        """Show sample data for dry run"""
-        self.stdout.write('\n' + '='*50)
-        self.stdout.write('SAMPLE DATA (DRY RUN)')
-        self.stdout.write('='*50)
-        
-        # Show first few records
-        sample = customers[:5]
-        for idx, customer in enumerate(sample):
-            self.stdout.write(f'\nRecord {idx + 1}:')
-            self.stdout.write(f'  Name: {customer.get("Customer-Name", "N/A")}')
-            self.stdout.write(f'  Type: {customer.get("customer_type", "N/A")}')
-            self.stdout.write(f'  Address: {customer.get("Customer-Address-1", "N/A")}')
-            self.stdout.write(f'  Phone: {customer.get("Telno", "N/A")}')
-            if customer.get('customer_type') == 'company':
-                self.stdout.write(f'  BULSTAT: {customer.get("Customer-Bulstat", "N/A")}')
-                self.stdout.write(f'  MOL: {customer.get("Customer-MOL", "N/A")}')
+        self.stdout.write('\nSample Individuals:')
+        for customer in self.samples['individual']:
+            self.stdout.write(f'  - {customer["customer_name"][:50]} (Phone: {customer["telno"]})')
 
-    def import_customers(self, customers):
-        """Import customers into Django database"""
+    def import_customers(self, rows):
+        """Upsert all rows into the database (COPY + one INSERT ... ON CONFLICT on Postgres)"""
         self.stdout.write('\nImporting customers...')
-        
-        created_count = 0
-        updated_count = 0
-        error_count = 0
-        
-        with transaction.atomic():
-            for idx, customer_data in enumerate(customers):
-                try:
-                    # Get or create customer
-                    customer, created = self.create_customer_from_data(customer_data)
-                    
-                    if created:
-                        created_count += 1
-                    else:
-                        updated_count += 1
-                    
-                    if (idx + 1) % 100 == 0:
-                        self.stdout.write(f'Processed {idx + 1}/{len(customers)} customers...')
-                        
-                except Exception as e:
-                    error_count += 1
-                    self.stdout.write(
-                        self.style.ERROR(f'Error processing row {idx + 1}: {str(e)}')
-                    )
-                    continue
-        
+
+        started = time.perf_counter()
+        counts = upsert_customers(rows)
+        elapsed = time.perf_counter() - started
+
+        processed = self.stats['total']
         self.stdout.write('\n' + '='*50)
         self.stdout.write('IMPORT COMPLETED')
         self.stdout.write('='*50)
-        self.stdout.write(f'Created: {created_count}')
-        self.stdout.write(f'Updated: {updated_count}')
-        self.stdout.write(f'Errors: {error_count}')
-        self.stdout.write(f'Total processed: {created_count + updated_count}')
-
-    def create_customer_from_data(self, data):
-        """Create or update a Customer object from data"""
-        # Extract and clean data
-        customer_number = self.clean_number(data.get('Number'))
-        customer_name = self.clean_string(data.get('Customer-Name', ''))
-        address = self.clean_string(data.get('Customer-Address-1', ''))
-        phone = self.clean_string(data.get('Telno', ''))
-        customer_type = data.get('customer_type', 'individual')
-        
-        # Company-specific fields
-        mol = self.clean_string(data.get('Customer-MOL', '')) if customer_type == 'company' else ''
-        taxno = self.clean_string(data.get('Customer-Taxno', '')) if customer_type == 'company' else ''
-        bulstat = self.clean_string(data.get('Customer-Bulstat', '')) if customer_type == 'company' else ''
-        
-        # Additional fields
-        email = self.clean_string(data.get('E-mail', ''))
-        fax = self.clean_string(data.get('Faxno', ''))
-        supplier = self.clean_boolean(data.get('supplier', False))
-        active = self.clean_boolean(data.get('active', True))
-        
-        # Create or get customer
-        customer, created = Customer.objects.get_or_create(
-            number=customer_number,
-            defaults={
-                'customer_name': customer_name,
-                'customer_address_1': address,
-                'customer_mol': mol,
-                'customer_taxno': taxno,
-                'customer_bulstat': bulstat,
-                'telno': phone,
-                'email': email,
-                'faxno': fax,
-                'supplier': supplier,
-                'active': active,
-            }
-        )
-        
-        # Update existing customer if not created
-        if not created:
-            customer.customer_name = customer_name
-            customer.customer_address_1 = address
-            customer.customer_mol = mol
-            customer.customer_taxno = taxno
-            customer.customer_bulstat = bulstat
-            customer.telno = phone
-            customer.email = email
-            customer.faxno = fax
-            customer.supplier = supplier
-            customer.active = active
-            customer.save()
-        
-        return customer, created
-
-    def clean_string(self, value):
-        """Clean string values"""
-        if value is None:
-            return ''
-        return str(value).strip()
-
-    def clean_number(self, value):
-        """Clean number values"""
-        if value is None or value == '':
-            return None
-        try:
-            return int(float(str(value)))
-        except (ValueError, TypeError):
-            return None
-
-    def clean_boolean(self, value):
-        """Clean boolean values"""
-        if isinstance(value, bool):
-            return value
-        if isinstance(value, str):
-            return value.lower() in ['true', '1', 'yes', 'on']
-        if isinstance(value, (int, float)):
-            return bool(value)
-        return False
+        self.stdout.write(f'Created: {counts["created"]}')
+        self.stdout.write(f'Updated: {counts["updated"]}')
+        self.stdout.write(f'Unchanged: {counts["unchanged"]}')
+        self.stdout.write(f'Skipped: {self.stats["skipped"] + counts["duplicates"]} '
+                          f'(invalid rows: {self.stats["skipped"]}, repeated numbers: {counts["duplicates"]})')
+        self.stdout.write(f'Total processed: {processed} in {elapsed:.2f}s ({processed / max(elapsed, 1e-6):.0f} rows/s)')
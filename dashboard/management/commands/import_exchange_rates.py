@@ -0,0 +1,165 @@
+"""
+Django management command to load historical EUR/BGN rates from a local file
+Usage: python manage.py import_exchange_rates <path> [--format csv|xml] [--source BNB] [--dry-run]
+
+CSV: a header row with date/Дата and rate/Курс columns, dates as YYYY-MM-DD or DD.MM.YYYY
+XML: ECB style <Cube time="..."><Cube currency="BGN" rate="..."/></Cube>,
+     or any element with date and rate attributes
+"""
+
+import csv
+import os
+from datetime import datetime
+from decimal import Decimal, InvalidOperation
+from xml.etree import ElementTree
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from dashboard.currency_utils import bump_exchange_rates_version
+from dashboard.models import ExchangeRate
+
+
+DATE_COLUMNS = ('date', 'дата')
+RATE_COLUMNS = ('rate', 'курс')
+DATE_FORMATS = ('%Y-%m-%d', '%d.%m.%Y')
+
+
+def parse_date(value):
+    value = (value or '').strip()
+    for date_format in DATE_FORMATS:
+        try:
+            return datetime.strptime(value, date_format).date()
+        except ValueError:
+            continue
+    raise ValueError(f'Невалидна дата: {value!r}')
+
+
+def parse_rate(value):
+    try:
+        rate = Decimal((value or '').strip().replace(',', '.'))
+    except InvalidOperation:
+        raise ValueError(f'Невалиден курс: {value!r}')
+    if rate <= 0:
+        raise ValueError(f'Невалиден курс: {value!r}')
+    return rate
+
+
+def local_name(tag):
+    return tag.rsplit('}', 1)[-1]
+
+
+class Command(BaseCommand):
+    help = 'Import historical EUR/BGN exchange rates from a local CSV or XML file'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='CSV or XML file with the rates')
+        parser.add_argument(
+            '--format',
+            choices=['csv', 'xml'],
+            help='File format (default: from the file extension)'
+        )
+        parser.add_argument(
+            '--source',
+            default='',
+            help='Source recorded with the imported rates, e.g. BNB or ECB (default: file name)'
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Parse the file and report the rates without saving them'
+        )
+
+    def handle(self, *args, **options):
+        path = options['path']
+        if not os.path.exists(path):
+            raise CommandError(f'File not found: {path}')
+
+        file_format = options['format'] or ('xml' if path.lower().endswith('.xml') else 'csv')
+        source = options['source'] or os.path.basename(path)
+
+        try:
+            rates = self.read_xml(path) if file_format == 'xml' else self.read_csv(path)
+        except (ValueError, ElementTree.ParseError) as e:
+            raise CommandError(str(e))
+
+        if not rates:
+            self.stdout.write(self.style.WARNING('No rates found'))
+            return
+
+        first, last = min(rates), max(rates)
+        existing = set(ExchangeRate.objects.filter(date__in=list(rates)).values_list('date', flat=True))
+        created = len(rates) - len(existing)
+
+        if options['dry_run']:
+            self.stdout.write(
+                f'Would import {len(rates)} rates from {first:%d.%m.%Y} to {last:%d.%m.%Y}: '
+                f'{created} new, {len(existing)} updated'
+            )
+            return
+
+        now = timezone.now()
+        ExchangeRate.objects.bulk_create(
+            [
+                ExchangeRate(date=day, rate=rate, source=source, created_at=now, updated_at=now)
+                for day, rate in sorted(rates.items())
+            ],
+            batch_size=1000,
+            update_conflicts=True,
+            unique_fields=['date'],
+            update_fields=['rate', 'source', 'updated_at'],
+        )
+        # bulk_create does not send post_save, so the rate tables are invalidated here
+        bump_exchange_rates_version()
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Imported {len(rates)} rates from {first:%d.%m.%Y} to {last:%d.%m.%Y}: '
+            f'{created} new, {len(existing)} updated'
+        ))
+
+    def read_csv(self, path):
+        """Rates by date from a CSV file (comma or semicolon separated)"""
+        with open(path, newline='', encoding='utf-8-sig') as f:
+            sample = f.read(4096)
+            f.seek(0)
+            try:
+                dialect = csv.Sniffer().sniff(sample, delimiters=',;\t')
+            except csv.Error:
+                dialect = csv.excel
+            reader = csv.reader(f, dialect)
+            header = [column.strip().lower() for column in next(reader, [])]
+            date_index = next((i for i, column in enumerate(header) if column in DATE_COLUMNS), None)
+            rate_index = next((i for i, column in enumerate(header) if column in RATE_COLUMNS), None)
+            if date_index is None or rate_index is None:
+                raise ValueError('The CSV header needs a date (Дата) and a rate (Курс) column')
+
+            rates = {}
+            for line_number, row in enumerate(reader, 2):
+                if not any(cell.strip() for cell in row):
+                    continue
+                try:
+                    rates[parse_date(row[date_index])] = parse_rate(row[rate_index])
+                except (ValueError, IndexError) as e:
+                    raise ValueError(f'Line {line_number}: {e}')
+        return rates
+
+    def read_xml(self, path):
+        """Rates by date from an XML file, parsed incrementally"""
+        rates = {}
+        current_date = None
+        for event, element in ElementTree.iterparse(path, events=('start', 'end')):
+            attrs = element.attrib
+            if event == 'start':
+                if 'time' in attrs:
+                    current_date = parse_date(attrs['time'])
+                continue
+
+            name = local_name(element.tag).lower()
+            if 'date' in attrs and 'rate' in attrs:
+                rates[parse_date(attrs['date'])] = parse_rate(attrs['rate'])
+            elif name == 'cube' and attrs.get('currency') == 'BGN' and current_date:
+                rates[current_date] = parse_rate(attrs['rate'])
+            elif 'time' in attrs:
+                current_date = None
+            element.clear()
+        return rates
@@ -1,22 +1,42 @@
 """
 Django management command to migrate historical PO orders and items
-Usage: python manage.py migrate_po_data
+Usage: python manage.py migrate_po_data [--batch-size 1000] [--checkpoint FILE] [--restart] [--dry-run]
+
+Customers, cars, employees and existing order numbers are loaded into
+dictionaries once; orders, cars and items are written with bulk_create, one
+transaction per batch. After every committed batch the number of processed CSV
+rows is saved to the checkpoint file, so a failed run continues from there.
 """
 
 import csv
+import json
 import os
+import time
 from datetime import datetime
 from decimal import Decimal
 
 from django.core.management.base import BaseCommand
 from django.db import transaction
-from dashboard.models import Customer, Car, Order, OrderItem, Employee
+from dashboard.conditional_utils import bump_model_version
+from dashboard.models import Customer, Car, Order, OrderItem, ArchivedOrder, Employee
+
+
+LABOR_NAME_WORDS = ['труд', 'работа', 'услуга', 'монтаж']
+LABOR_UNIT_WORDS = ['норма', 'час', 'мин']
+
+
+def parse_decimal(value, default):
+    try:
+        return Decimal(str(value)) if value else default
+    except Exception:
+        return default
+
 
 class Command(BaseCommand):
     help = 'Migrate historical PO orders and items to Django system'
-    
-    def __init__(self):
-        super().__init__()
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
         self.stats = {
             'cars_created': 0,
             'cars_matched': 0,
@@ -26,9 +46,12 @@ class Command(BaseCommand):
             'skipped': 0
         }
         self.employees_map = {}
-        self.customer_cache = {}
-        self.car_cache = {}
-    
+        self.customer_map = {}
+        self.cars_by_vin = {}
+        self.cars_by_plate = {}
+        self.order_numbers = set()
+        self.checkpoint = {}
+
     def add_arguments(self, parser):
         parser.add_argument(
             '--po-file',
@@ -42,131 +65,157 @@ class Command(BaseCommand):
             default='/private/var/www/deyanski/archive/database_files/poitems_bulgarian_final.csv',
             help='Path to POitems data CSV file'
         )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='CSV rows written per transaction (default: 1000)'
+        )
+        parser.add_argument(
+            '--checkpoint',
+            type=str,
+            default='migrate_po_data.checkpoint.json',
+            help='File with the progress of an interrupted run (default: migrate_po_data.checkpoint.json)'
+        )
+        parser.add_argument(
+            '--restart',
+            action='store_true',
+            help='Ignore the checkpoint file and start from the first row'
+        )
         parser.add_argument(
             '--dry-run',
             action='store_true',
             help='Run without making any database changes'
         )
-    
+
+    def load_checkpoint(self, po_file, poitems_file):
+        """Rows already committed by a previous run of the same files"""
+        path = self.options['checkpoint']
+        if self.options['restart'] or not os.path.exists(path):
+            return {}
+
+        with open(path, 'r', encoding='utf-8') as f:
+            checkpoint = json.load(f)
+
+        if checkpoint.get('po_file') != po_file or checkpoint.get('poitems_file') != poitems_file:
+            self.stdout.write(self.style.WARNING(f"Checkpoint {path} is for other files, starting from the first row"))
+            return {}
+
+        self.stdout.write(self.style.WARNING(
+            f"⏩ Resuming from checkpoint: {checkpoint.get('po_rows', 0)} PO rows, "
+            f"{checkpoint.get('poitems_rows', 0)} POitems rows already migrated"
+        ))
+        return checkpoint
+
+    def save_checkpoint(self, **progress):
+        """Write the progress next to a temporary file first, so a crash never leaves half a checkpoint"""
+        if self.options['dry_run']:
+            return
+        self.checkpoint.update(progress)
+        path = self.options['checkpoint']
+        with open(path + '.tmp', 'w', encoding='utf-8') as f:
+            json.dump(self.checkpoint, f)
+        os.replace(path + '.tmp', path)
+
+    def preload(self):
+        """Everything the rows are matched against, loaded with one query per model"""
+        self.customer_map = {
+            temp_id: (customer_id, name)
+            for customer_id, temp_id, name in Customer.objects.filter(temp_id__isnull=False).values_list(
+                'id', 'temp_id', 'customer_name'
+            )
+        }
+
+        for car in Car.objects.only('id', 'customer_id', 'vin', 'plate_number').iterator(chunk_size=5000):
+            if car.vin:
+                self.cars_by_vin.setdefault((car.customer_id, car.vin), car)
+            if car.plate_number:
+                self.cars_by_plate.setdefault((car.customer_id, car.plate_number), car)
+
+        self.employees_map = {
+            f"{first_name} {last_name}": employee_id
+            for employee_id, first_name, last_name in Employee.objects.values_list('id', 'first_name', 'last_name')
+        }
+
+        # Archived orders count as migrated too
+        self.order_numbers = set(Order.objects.values_list('order_number', flat=True))
+        self.order_numbers.update(ArchivedOrder.objects.values_list('order_number', flat=True))
+
+        self.stdout.write(
+            f"📚 Preloaded {len(self.customer_map)} customers, {len(self.cars_by_vin) + len(self.cars_by_plate)} car keys, "
+            f"{len(self.employees_map)} employees, {len(self.order_numbers)} order numbers"
+        )
+
     def get_or_create_employee(self, author_name):
-        """Get or create employee from author name"""
+        """Employee id from author name, unknown employees are created once"""
         if not author_name or author_name.strip() == '':
             return None
-            
-        author_name = author_name.strip()
-        
-        # Check cache first
+
+        author_name = ' '.join(author_name.split())
+
         if author_name in self.employees_map:
             return self.employees_map[author_name]
-        
-        # Try to find existing employee
+
         name_parts = author_name.split()
-        if len(name_parts) >= 2:
-            first_name = name_parts[0]
-            last_name = ' '.join(name_parts[1:])
-            
-            if not self.options['dry_run']:
-                employee, created = Employee.objects.get_or_create(
-                    first_name=first_name,
-                    last_name=last_name,
-                    defaults={'is_active': True}
-                )
-            else:
-                # Dry run - just simulate
-                try:
-                    employee = Employee.objects.get(first_name=first_name, last_name=last_name)
-                    created = False
-                except Employee.DoesNotExist:
-                    employee = None
-                    created = True
-            
-            if created and not self.options['dry_run']:
-                self.stdout.write(f"✨ Created employee: {first_name} {last_name}")
-            
-            self.employees_map[author_name] = employee
-            return employee
-        
-        return None
-    
+        if len(name_parts) < 2:
+            return None
+
+        first_name = name_parts[0]
+        last_name = ' '.join(name_parts[1:])
+
+        employee_id = None
+        if not self.options['dry_run']:
+            employee = Employee.objects.create(first_name=first_name, last_name=last_name, is_active=True)
+            employee_id = employee.id
+            self.stdout.write(f"✨ Created employee: {first_name} {last_name}")
+
+        self.employees_map[author_name] = employee_id
+        return employee_id
+
     def get_customer(self, customer_id):
-        """Get customer by old Customer-ID number using temp_id field"""
-        if customer_id in self.customer_cache:
-            return self.customer_cache[customer_id]
-        
+        """(id, name) of a customer by old Customer-ID number using temp_id field"""
         try:
-            # Use temp_id field which contains the original Customer-ID from old system
-            customer = Customer.objects.get(temp_id=int(customer_id))
-            self.customer_cache[customer_id] = customer
-            return customer
-        except (Customer.DoesNotExist, ValueError):
-            self.stdout.write(self.style.WARNING(f"Customer with temp_id {customer_id} not found"))
-            return None
-    
-    def get_or_create_car(self, customer, vin, car_model, plate_number):
-        """Get or create car for customer"""
+            customer = self.customer_map.get(int(customer_id))
+        except ValueError:
+            customer = None
         if not customer:
-            return None
-        
-        # Create cache key
-        cache_key = f"{customer.id}_{vin}_{plate_number}"
-        if cache_key in self.car_cache:
-            return self.car_cache[cache_key]
-        
-        # Try to find existing car by VIN first
+            self.stdout.write(self.style.WARNING(f"Customer with temp_id {customer_id} not found"))
+        return customer
+
+    def get_or_create_car(self, customer_id, vin, car_model, plate_number, new_cars):
+        """Car of the customer by VIN, then by plate number; unknown cars are added to new_cars"""
         car = None
-        if vin and vin.strip():
-            try:
-                car = Car.objects.filter(
-                    customer=customer,
-                    vin=vin.strip()
-                ).first()
-            except:
-                pass
-        
-        # If not found by VIN, try by plate number
-        if not car and plate_number and plate_number.strip():
-            try:
-                car = Car.objects.filter(
-                    customer=customer,
-                    plate_number=plate_number.strip()
-                ).first()
-            except:
-                pass
-        
-        # If still not found, create new car
-        if not car:
-            car_data = {
-                'customer': customer,
-                'brand_model': car_model.strip() if car_model else 'Неизвестен модел',
-                'vin': vin.strip() if vin else None,
-                'plate_number': plate_number.strip() if plate_number else None,
-                'is_active': True
-            }
-            
-            if not self.options['dry_run']:
-                try:
-                    car = Car.objects.create(**car_data)
-                    self.stats['cars_created'] += 1
-                    self.stdout.write(f"🚗 Created car: {car}")
-                except Exception as e:
-                    self.stdout.write(self.style.ERROR(f"Error creating car: {e}"))
-                    return None
-            else:
-                # Dry run simulation
-                self.stats['cars_created'] += 1
-                self.stdout.write(f"🚗 Would create car: {car_data['brand_model']} - {car_data['plate_number']}")
-                car = None  # Simulate car creation
-        else:
+        if vin:
+            car = self.cars_by_vin.get((customer_id, vin))
+        if not car and plate_number:
+            car = self.cars_by_plate.get((customer_id, plate_number))
+
+        if car:
             self.stats['cars_matched'] += 1
-        
-        self.car_cache[cache_key] = car
+            return car
+
+        car = Car(
+            customer_id=customer_id,
+            brand_model=car_model or 'Неизвестен модел',
+            vin=vin or None,
+            plate_number=plate_number or None,
+            is_active=True
+        )
+        new_cars.append(car)
+        self.stats['cars_created'] += 1
+
+        # Later rows of the same car match the pending one
+        if vin:
+            self.cars_by_vin[(customer_id, vin)] = car
+        if plate_number:
+            self.cars_by_plate[(customer_id, plate_number)] = car
         return car
-    
+
     def parse_date(self, date_str):
         """Parse date string to Python date"""
         if not date_str:
             return None
-        
+
         try:
             # Try MM/DD/YY HH:MM:SS format
             dt = datetime.strptime(date_str, '%m/%d/%y %H:%M:%S')
@@ -179,212 +228,220 @@ class Command(BaseCommand):
             except ValueError:
                 self.stdout.write(self.style.WARNING(f"Could not parse date: {date_str}"))
                 return None
-    
+
+    def build_order(self, row, new_cars, assignments):
+        """Unsaved Order for a PO row, None when the row is skipped"""
+        po_number = row.get('PO', '').strip()
+        customer_id = row.get('Customer-ID', '').strip()
+        po_date_str = row.get('PODate', '').strip()
+        author = row.get('Author', '').strip()
+        vin = row.get('Chasis', '').strip()
+        car_model = row.get('Car', '').strip()
+        plate_number = row.get('DKNo', '').strip()
+        mileage_str = row.get('totkm', '').strip()
+        notes = row.get('Note', '').strip()
+
+        # Skip if no PO number
+        if not po_number:
+            self.stats['skipped'] += 1
+            return None
+
+        # Skip duplicates (already migrated, or repeated in the file)
+        if po_number in self.order_numbers:
+            return None
+
+        customer = self.get_customer(customer_id)
+        if not customer:
+            self.stdout.write(self.style.ERROR(f"No customer found for PO {po_number}, Customer-ID {customer_id}"))
+            self.stats['errors'] += 1
+            return None
+
+        order_date = self.parse_date(po_date_str)
+        if not order_date:
+            self.stdout.write(self.style.ERROR(f"No valid date for PO {po_number}"))
+            self.stats['errors'] += 1
+            return None
+
+        car = self.get_or_create_car(customer[0], vin, car_model, plate_number, new_cars)
+
+        mileage = None
+        if mileage_str:
+            try:
+                mileage = int(float(mileage_str))
+            except ValueError:
+                pass
+
+        order = Order(
+            order_number=po_number,
+            order_date=order_date,
+            client_id=customer[0],
+            car=car,
+            car_mileage=mileage or None,
+            status='order',  # Historical orders are completed
+            notes=f"Мигрирана поръчка от стара система. Автор: {author}" + (f"\nБележки: {notes}" if notes else "")
+        )
+
+        employee_id = self.get_or_create_employee(author)
+        if employee_id:
+            assignments.append((order, employee_id))
+
+        if self.options['dry_run'] and self.options['verbosity'] > 1:
+            self.stdout.write(f"📋 Would create order: {po_number} for {customer[1]}")
+
+        self.order_numbers.add(po_number)
+        return order
+
+    def write_orders(self, orders, new_cars, assignments):
+        """Cars first (orders reference them), then orders, then the employee assignments"""
+        Car.objects.bulk_create(new_cars)
+        Order.objects.bulk_create(orders)
+        Order.employees.through.objects.bulk_create([
+            Order.employees.through(order_id=order.id, employee_id=employee_id)
+            for order, employee_id in assignments
+        ])
+
+    def item_from_row(self, row, order_ids):
+        """Unsaved OrderItem for a POitems row, None when the row is skipped"""
+        po_id = row.get('POID', '').strip()
+        item_name = row.get('Item-Name', '').strip()
+        item_measure = row.get('Item-Measure', '').strip()
+        item_qty_str = row.get('Item-Qty', '').strip()
+        item_price_str = row.get('Item-Price-Each', '').strip()
+        item_total_str = row.get('Item-total', '').strip()
+
+        # Skip if no essential data
+        if not po_id or not item_name:
+            self.stats['skipped'] += 1
+            return None
+
+        # Order not found, skip this item
+        order_id = order_ids.get(po_id)
+        if not order_id:
+            return None
+
+        quantity = parse_decimal(item_qty_str, Decimal('1'))
+        # This should be price without VAT
+        price_each = parse_decimal(item_price_str, Decimal('0'))
+        total_price = parse_decimal(item_total_str, Decimal('0'))
+
+        # Calculate price with VAT (assuming Item-total includes VAT)
+        # If total_price > price_each * quantity, then total includes VAT
+        calculated_total_without_vat = price_each * quantity
+        if total_price > calculated_total_without_vat:
+            # Total price includes VAT, so Item-Price-Each might be without VAT
+            price_with_vat = total_price / quantity if quantity > 0 else total_price
+            include_vat = True
+        else:
+            # Total price doesn't include VAT
+            price_with_vat = None
+            include_vat = False
+
+        # Labor (труд) based on name or unit
+        is_labor = (
+            any(word in item_name.lower() for word in LABOR_NAME_WORDS) or
+            bool(item_measure) and any(word in item_measure.lower() for word in LABOR_UNIT_WORDS)
+        )
+
+        return OrderItem(
+            order_id=order_id,
+            name=item_name[:255],  # Truncate if too long
+            unit=item_measure[:20] if item_measure else 'бр',
+            quantity=quantity,
+            purchase_price=price_each,
+            price_with_vat=price_with_vat,
+            include_vat=include_vat,
+            is_labor=is_labor
+        )
+
+    def read_batches(self, file_path, start_row):
+        """Yield (rows read so far, batch of rows) after skipping the rows of the checkpoint"""
+        batch_size = self.options['batch_size']
+        with open(file_path, 'r', encoding='utf-8', newline='') as f:
+            reader = csv.DictReader(f)
+            batch = []
+            for i, row in enumerate(reader, 1):
+                if i <= start_row:
+                    continue
+                batch.append(row)
+                if len(batch) >= batch_size:
+                    yield i, batch
+                    batch = []
+            if batch:
+                yield i, batch
+
+    def report_progress(self, rows_done, started, label):
+        elapsed = time.perf_counter() - started
+        self.stdout.write(f"  Processed {rows_done} {label} rows ({rows_done / max(elapsed, 1e-6):.0f} rows/s)")
+
     def migrate_po_data(self, po_file_path):
         """Migrate PO orders data"""
         self.stdout.write(f"📖 Reading PO data from {po_file_path}...")
-        
-        with open(po_file_path, 'r', encoding='utf-8') as f:
-            reader = csv.DictReader(f)
-            po_rows = list(reader)
-        
-        self.stdout.write(f"📊 Processing {len(po_rows)} PO records...")
-        
-        with transaction.atomic():
-            for i, row in enumerate(po_rows, 1):
-                if i % 1000 == 0:
-                    self.stdout.write(f"  Processed {i}/{len(po_rows)} orders...")
-                
+
+        start_row = self.checkpoint.get('po_rows', 0)
+        started = time.perf_counter()
+        rows_done = 0
+
+        for rows_read, rows in self.read_batches(po_file_path, start_row):
+            orders, new_cars, assignments = [], [], []
+            for row in rows:
                 try:
-                    # Extract data from row
-                    po_number = row.get('PO', '').strip()
-                    customer_id = row.get('Customer-ID', '').strip()
-                    po_date_str = row.get('PODate', '').strip()
-                    author = row.get('Author', '').strip()
-                    vin = row.get('Chasis', '').strip()
-                    car_model = row.get('Car', '').strip()
-                    plate_number = row.get('DKNo', '').strip()
-                    mileage_str = row.get('totkm', '').strip()
-                    notes = row.get('Note', '').strip()
-                    
-                    # Skip if no PO number
-                    if not po_number:
-                        self.stats['skipped'] += 1
-                        continue
-                    
-                    # Check if order already exists
-                    if Order.objects.filter(order_number=po_number).exists():
-                        continue  # Skip duplicate
-                    
-                    # Get customer
-                    customer = self.get_customer(customer_id)
-                    if not customer:
-                        self.stdout.write(self.style.ERROR(f"No customer found for PO {po_number}, Customer-ID {customer_id}"))
-                        self.stats['errors'] += 1
-                        continue
-                    
-                    # Parse date
-                    order_date = self.parse_date(po_date_str)
-                    if not order_date:
-                        self.stdout.write(self.style.ERROR(f"No valid date for PO {po_number}"))
-                        self.stats['errors'] += 1
-                        continue
-                    
-                    # Get or create car
-                    car = self.get_or_create_car(customer, vin, car_model, plate_number)
-                    
-                    # Parse mileage
-                    mileage = None
-                    if mileage_str:
-                        try:
-                            mileage = int(float(mileage_str))
-                        except ValueError:
-                            pass
-                    
-                    # Get employee
-                    employee = self.get_or_create_employee(author)
-                    
-                    # Create order
-                    order_data = {
-                        'order_number': po_number,
-                        'order_date': order_date,
-                        'client': customer,
-                        'status': 'order',  # Historical orders are completed
-                        'notes': f"Мигрирана поръчка от стара система. Автор: {author}" + (f"\nБележки: {notes}" if notes else "")
-                    }
-                    
-                    # Add car information
-                    if car:
-                        order_data['car'] = car
-                        if mileage:
-                            order_data['car_mileage'] = mileage
-                    else:
-                        # Add standalone car info if no car object
-                        order_data['car_brand_model'] = car_model if car_model else 'Неизвестен модел'
-                        order_data['car_vin'] = vin if vin else None
-                        order_data['car_plate_number'] = plate_number if plate_number else None
-                        order_data['car_mileage'] = mileage
-                    
-                    # Create the order
-                    if not self.options['dry_run']:
-                        order = Order.objects.create(**order_data)
-                        
-                        # Add employee if found
-                        if employee:
-                            order.employees.add(employee)
-                    else:
-                        self.stdout.write(f"📋 Would create order: {po_number} for {customer.customer_name}")
-                    
-                    self.stats['orders_created'] += 1
-                    
+                    order = self.build_order(row, new_cars, assignments)
                 except Exception as e:
-                    self.stdout.write(self.style.ERROR(f"Error processing PO {po_number}: {e}"))
+                    self.stdout.write(self.style.ERROR(f"Error processing PO {row.get('PO')}: {e}"))
                     self.stats['errors'] += 1
                     continue
-        
-        self.stdout.write(self.style.SUCCESS("✅ PO migration completed!"))
-    
+                if order:
+                    orders.append(order)
+
+            if not self.options['dry_run']:
+                with transaction.atomic():
+                    self.write_orders(orders, new_cars, assignments)
+            self.stats['orders_created'] += len(orders)
+            self.save_checkpoint(po_rows=rows_read)
+
+            rows_done += len(rows)
+            self.report_progress(rows_done, started, 'PO')
+
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ PO migration completed! {rows_done} rows in {elapsed:.1f}s ({rows_done / max(elapsed, 1e-6):.0f} rows/s)"
+        ))
+
     def migrate_poitems_data(self, poitems_file_path):
         """Migrate POitems data to OrderItem objects"""
         self.stdout.write(f"📖 Reading POitems data from {poitems_file_path}...")
-        
-        with open(poitems_file_path, 'r', encoding='utf-8') as f:
-            reader = csv.DictReader(f)
-            poitems_rows = list(reader)
-        
-        self.stdout.write(f"📊 Processing {len(poitems_rows)} POitems records...")
-        
-        with transaction.atomic():
-            for i, row in enumerate(poitems_rows, 1):
-                if i % 5000 == 0:
-                    self.stdout.write(f"  Processed {i}/{len(poitems_rows)} items...")
-                
+
+        order_ids = dict(Order.objects.values_list('order_number', 'id'))
+        start_row = self.checkpoint.get('poitems_rows', 0)
+        started = time.perf_counter()
+        rows_done = 0
+
+        for rows_read, rows in self.read_batches(poitems_file_path, start_row):
+            items = []
+            for row in rows:
                 try:
-                    # Extract data from row
-                    po_id = row.get('POID', '').strip()
-                    item_name = row.get('Item-Name', '').strip()
-                    item_measure = row.get('Item-Measure', '').strip()
-                    item_qty_str = row.get('Item-Qty', '').strip()
-                    item_price_str = row.get('Item-Price-Each', '').strip()
-                    item_total_str = row.get('Item-total', '').strip()
-                    
-                    # Skip if no essential data
-                    if not po_id or not item_name:
-                        self.stats['skipped'] += 1
-                        continue
-                    
-                    # Find the order
-                    try:
-                        if not self.options['dry_run']:
-                            order = Order.objects.get(order_number=po_id)
-                        else:
-                            # Simulate for dry run
-                            order = None
-                    except Order.DoesNotExist:
-                        # Order not found, skip this item
-                        continue
-                    
-                    # Parse numeric values
-                    try:
-                        quantity = Decimal(str(item_qty_str)) if item_qty_str else Decimal('1')
-                    except:
-                        quantity = Decimal('1')
-                    
-                    try:
-                        # This should be price without VAT
-                        price_each = Decimal(str(item_price_str)) if item_price_str else Decimal('0')
-                    except:
-                        price_each = Decimal('0')
-                    
-                    try:
-                        total_price = Decimal(str(item_total_str)) if item_total_str else Decimal('0')
-                    except:
-                        total_price = Decimal('0')
-                    
-                    # Calculate price with VAT (assuming Item-total includes VAT)
-                    # If total_price > price_each * quantity, then total includes VAT
-                    calculated_total_without_vat = price_each * quantity
-                    if total_price > calculated_total_without_vat:
-                        # Total price includes VAT, so Item-Price-Each might be without VAT
-                        price_with_vat = total_price / quantity if quantity > 0 else total_price
-                        include_vat = True
-                    else:
-                        # Total price doesn't include VAT
-                        price_with_vat = None
-                        include_vat = False
-                    
-                    # Create order item
-                    order_item_data = {
-                        'order': order,
-                        'name': item_name[:255],  # Truncate if too long
-                        'unit': item_measure[:20] if item_measure else 'бр',
-                        'quantity': quantity,
-                        'purchase_price': price_each,
-                        'price_with_vat': price_with_vat,
-                        'include_vat': include_vat,
-                        'is_labor': False  # Assume parts unless specified
-                    }
-                    
-                    # Check if this is labor (труд) based on unit or name
-                    if any(word in item_name.lower() for word in ['труд', 'работа', 'услуга', 'монтаж']):
-                        order_item_data['is_labor'] = True
-                    elif item_measure and any(word in item_measure.lower() for word in ['норма', 'час', 'мин']):
-                        order_item_data['is_labor'] = True
-                    
-                    if not self.options['dry_run']:
-                        OrderItem.objects.create(**order_item_data)
-                    else:
-                        self.stdout.write(f"📦 Would create item: {item_name} x {quantity} for PO {po_id}")
-                    
-                    self.stats['order_items_created'] += 1
-                    
+                    item = self.item_from_row(row, order_ids)
                 except Exception as e:
-                    self.stdout.write(self.style.ERROR(f"Error processing POitem for PO {po_id}: {e}"))
+                    self.stdout.write(self.style.ERROR(f"Error processing POitem for PO {row.get('POID')}: {e}"))
                     self.stats['errors'] += 1
                     continue
-        
-        self.stdout.write(self.style.SUCCESS("✅ POitems migration completed!"))
-    
+                if item:
+                    items.append(item)
+
+            if not self.options['dry_run']:
+                with transaction.atomic():
+                    OrderItem.objects.bulk_create(items)
+            self.stats['order_items_created'] += len(items)
+            self.save_checkpoint(poitems_rows=rows_read)
+
+            rows_done += len(rows)
+            self.report_progress(rows_done, started, 'POitems')
+
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ POitems migration completed! {rows_done} rows in {elapsed:.1f}s ({rows_done / max(elapsed, 1e-6):.0f} rows/s)"
+        ))
+
     def print_statistics(self):
         """Print migration statistics"""
         self.stdout.write("\n" + "="*60)
@@ -397,59 +454,81 @@ class Command(BaseCommand):
         self.stdout.write(f"❌ Errors: {self.stats['errors']}")
         self.stdout.write(f"⏭️  Skipped: {self.stats['skipped']}")
         self.stdout.write("="*60)
-        
+
         # Additional stats
         total_customers = Customer.objects.count()
         total_cars = Car.objects.count()
         total_orders = Order.objects.count()
         total_order_items = OrderItem.objects.count()
-        
+
         self.stdout.write(f"\n📊 DATABASE TOTALS:")
         self.stdout.write(f"👥 Total customers: {total_customers}")
         self.stdout.write(f"🚗 Total cars: {total_cars}")
         self.stdout.write(f"📋 Total orders: {total_orders}")
         self.stdout.write(f"📦 Total order items: {total_order_items}")
-    
+
     def handle(self, *args, **options):
         self.options = options
-        
+
         self.stdout.write(self.style.SUCCESS("🚀 Starting PO Orders Migration to Django System"))
         self.stdout.write("="*60)
-        
+
         # Check files exist
-        po_file = options['po_file']
-        poitems_file = options['poitems_file']
-        
+        po_file = os.path.abspath(options['po_file'])
+        poitems_file = os.path.abspath(options['poitems_file'])
+
         if not os.path.exists(po_file):
             self.stdout.write(self.style.ERROR(f"PO file not found: {po_file}"))
             return
-        
+
         if not os.path.exists(poitems_file):
             self.stdout.write(self.style.ERROR(f"POitems file not found: {poitems_file}"))
             return
-        
+
+        if options['batch_size'] < 1:
+            self.stdout.write(self.style.ERROR("--batch-size must be at least 1"))
+            return
+
         if options['dry_run']:
             self.stdout.write(self.style.WARNING("🔍 DRY RUN MODE - No database changes will be made"))
-        
+
+        self.checkpoint = self.load_checkpoint(po_file, poitems_file) or {
+            'po_file': po_file,
+            'poitems_file': poitems_file,
+        }
+
         try:
+            self.preload()
+
             # Migrate PO data first
             self.stdout.write("\n🔄 Phase 1: Migrating PO Orders...")
             self.migrate_po_data(po_file)
-            
+
             # Then migrate POitems
             self.stdout.write("\n🔄 Phase 2: Migrating PO Items...")
             self.migrate_poitems_data(poitems_file)
-            
+
             # Print final statistics
             self.print_statistics()
-            
+
             if options['dry_run']:
                 self.stdout.write(self.style.SUCCESS("\n✅ DRY RUN COMPLETED - No changes were made to the database"))
             else:
+                if os.path.exists(options['checkpoint']):
+                    os.remove(options['checkpoint'])
                 self.stdout.write(self.style.SUCCESS("\n✅ MIGRATION COMPLETED SUCCESSFULLY!"))
                 self.stdout.write(self.style.SUCCESS("🎉 All historical PO data has been imported into your Django system!"))
-            
+
         except Exception as e:
             self.stdout.write(self.style.ERROR(f"MIGRATION FAILED: {e}"))
+            self.stdout.write(self.style.WARNING(
+                f"Committed batches are kept; run the command again to resume from {options['checkpoint']}"
+            ))
             import traceback
             traceback.print_exc()
+
+        finally:
+            if not options['dry_run']:
+                # bulk_create skips the post_save signals that invalidate the ETags of the list pages
+                for model in (Car, Order, OrderItem):
+                    bump_model_version(model)
@@ -0,0 +1,36 @@
+"""
+Django management command to refresh the daily sales rollups used by the reports page
+Usage: python manage.py refresh_sales_rollups [--full]
+Run it from cron every 15 minutes (see CRONTAB_SETUP.md); only days touched since the previous run are rebuilt.
+"""
+
+import time
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from dashboard.sales_rollup_utils import get_watermark, refresh_sales_rollups
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the daily sales rollups of days with orders changed since the last refresh'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--full',
+            action='store_true',
+            help='Rebuild every day instead of only the days touched since the last refresh'
+        )
+
+    def handle(self, *args, **options):
+        watermark = get_watermark()
+        if options['full'] or watermark is None:
+            self.stdout.write('Rebuilding all days')
+        else:
+            self.stdout.write(f'Rebuilding days touched since {timezone.localtime(watermark):%d.%m.%Y %H:%M:%S}')
+
+        started = time.perf_counter()
+        days = refresh_sales_rollups(full=options['full'])
+        elapsed = time.perf_counter() - started
+
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt {days} days in {elapsed:.2f}s'))
@@ -0,0 +1,42 @@
+"""
+Django management command to backfill the stored Customer.is_company flag
+Usage: python manage.py update_customer_types [--dry-run]
+"""
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from dashboard.conditional_utils import bump_model_version
+from dashboard.models import Customer, COMPANY_DATA_Q
+
+
+class Command(BaseCommand):
+    help = 'Recompute Customer.is_company from БУЛСТАТ, МОЛ and ДДС номер for rows written without save()'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Only report how many customers would change'
+        )
+
+    def handle(self, *args, **options):
+        to_company = Customer.objects.filter(COMPANY_DATA_Q, is_company=False)
+        to_individual = Customer.objects.exclude(COMPANY_DATA_Q).filter(is_company=True)
+
+        if options['dry_run']:
+            self.stdout.write(f'Would mark {to_company.count()} customers as companies '
+                              f'and {to_individual.count()} as individuals')
+            return
+
+        # updated_at is set explicitly so cached table rows are re-rendered
+        now = timezone.now()
+        with transaction.atomic():
+            companies = to_company.update(is_company=True, updated_at=now)
+            individuals = to_individual.update(is_company=False, updated_at=now)
+        bump_model_version(Customer)
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Marked {companies} customers as companies and {individuals} as individuals'
+        ))
@@ -1,25 +1,69 @@
+from datetime import date
+
 from django.core.management.base import BaseCommand
+from django.db import connection, transaction
 from dashboard.models import Employee
 
 
+# Recompute every employee in one UPDATE ... FROM; the derived table keeps the
+# old value so changed rows can be reported through RETURNING.
+RECOMPUTE_LEAVE_USAGE_SQL = """
+    UPDATE dashboard_employee AS employee
+    SET current_year_leave_used = usage.used, leave_usage_year = %(year)s
+    FROM (
+        SELECT e.id AS employee_id,
+               e.current_year_leave_used AS old_used,
+               COALESCE(SUM(d.end_date - d.start_date + 1), 0) AS used
+        FROM dashboard_employee e
+        LEFT JOIN dashboard_daysoff d
+            ON d.employee_id = e.id
+            AND d.day_off_type = 'vacation'
+            AND d.is_approved
+            AND d.start_date >= %(year_start)s
+            AND d.start_date < %(next_year_start)s
+        GROUP BY e.id, e.current_year_leave_used
+    ) AS usage
+    WHERE employee.id = usage.employee_id
+        AND (employee.current_year_leave_used <> usage.used
+             OR employee.leave_usage_year IS DISTINCT FROM %(year)s)
+    RETURNING employee.first_name, employee.last_name, usage.old_used, usage.used
+"""
+
+
 class Command(BaseCommand):
-    help = 'Update leave usage for all employees'
+    help = 'Recount the current year leave usage of all employees'
 
     def handle(self, *args, **options):
-        employees = Employee.objects.all()
-        updated_count = 0
-        
-        for employee in employees:
-            old_usage = employee.current_year_leave_used
-            employee.update_leave_usage()
-            new_usage = employee.current_year_leave_used
-            
-            if old_usage != new_usage:
-                updated_count += 1
+        # current_year_leave_used always holds the current year, so no other year can be counted
+        year = date.today().year
+        params = {'year': year, 'year_start': date(year, 1, 1), 'next_year_start': date(year + 1, 1, 1)}
+
+        if connection.vendor == 'postgresql':
+            with transaction.atomic(), connection.cursor() as cursor:
+                cursor.execute(RECOMPUTE_LEAVE_USAGE_SQL, params)
+                changed = [row for row in cursor.fetchall() if row[2] != row[3]]
+
+            for first_name, last_name, old_usage, new_usage in changed:
                 self.stdout.write(
-                    f"Updated {employee.full_name}: {old_usage} -> {new_usage} days"
+                    f"Updated {first_name} {last_name}: {old_usage} -> {new_usage} days"
                 )
-        
+            updated_count = len(changed)
+        else:
+            # Other backends (local SQLite checks): per-employee aggregate
+            updated_count = 0
+            for employee in Employee.objects.all():
+                old_usage = employee.current_year_leave_used
+                new_usage = employee.calculate_leave_usage(year)
+                if old_usage != new_usage or employee.leave_usage_year != year:
+                    Employee.objects.filter(pk=employee.pk).update(
+                        current_year_leave_used=new_usage, leave_usage_year=year
+                    )
+                if old_usage != new_usage:
+                    updated_count += 1
+                    self.stdout.write(
+                        f"Updated {employee.full_name}: {old_usage} -> {new_usage} days"
+                    )
+
         self.stdout.write(
             self.style.SUCCESS(f'Successfully updated {updated_count} employees')
         )
@@ -1,8 +1,23 @@
 """
 Custom middleware for Car Service Management System
 """
+import logging
+import re
+import time
+import traceback
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connection
+from django.http import FileResponse
+from django.template.base import Template
 from django.utils.deprecation import MiddlewareMixin
 
+from .conditional_utils import version_snapshot
+from .currency_utils import aiterate_in_currency_context, currency_context, iterate_in_currency_context
+
 
 class DisableAdminCSRFMiddleware(MiddlewareMixin):
     """
@@ -14,3 +29,190 @@ class DisableAdminCSRFMiddleware(MiddlewareMixin):
         if request.path == '/admin/login/' or request.path.startswith('/admin/login'):
             setattr(request, '_dont_enforce_csrf_checks', True)
         return None
+
+
+class CurrencyContextMiddleware:
+    """
+    Share one currency context per request, so the EUR rate is resolved at most once.
+    Sync and async capable, so async views need no adapters; streaming
+    bodies (the exports) keep the context while they are iterated.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        with currency_context() as context:
+            response = self.get_response(request)
+        return self.keep_context(response, context)
+
+    async def __acall__(self, request):
+        with currency_context() as context:
+            response = await self.get_response(request)
+        return self.keep_context(response, context)
+
+    def keep_context(self, response, context):
+        # File downloads convert nothing and keep their file wrapper
+        if response.streaming and not isinstance(response, FileResponse):
+            if response.is_async:
+                response.streaming_content = aiterate_in_currency_context(response.streaming_content, context)
+            else:
+                response.streaming_content = iterate_in_currency_context(response.streaming_content, context)
+        return response
+
+
+class VersionSnapshotMiddleware:
+    """Read each change counter (ETags, units, exchange rates, planner) at most once per request"""
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        with version_snapshot():
+            return self.get_response(request)
+
+    async def __acall__(self, request):
+        with version_snapshot():
+            return await self.get_response(request)
+
+
+logger = logging.getLogger('dashboard.profiling')
+
+# Profile of the request being handled in the current context (None when idle)
+_current_profile = ContextVar('request_profile', default=None)
+
+# IN (%s, %s, ...) lists and literals are collapsed so repeated lookups share one shape
+SQL_IN_LIST_RE = re.compile(r'IN \((?:%s|\?)(?:, (?:%s|\?))*\)')
+SQL_LITERAL_RE = re.compile(r"'(?:[^']|'')*'|\b\d+\b")
+
+
+def sql_shape(sql):
+    """Normalize a query so lookups differing only by parameters compare equal"""
+    sql = SQL_IN_LIST_RE.sub('IN (...)', sql)
+    return SQL_LITERAL_RE.sub('?', sql)
+
+
+def _profiled_template_render(original_render):
+    """Wrap Template._render to time template rendering and track the template stack"""
+    def _render(self, context):
+        profile = _current_profile.get()
+        if profile is None:
+            return original_render(self, context)
+
+        profile['templates'].append(self.name or '<string>')
+        started = time.perf_counter()
+        try:
+            return original_render(self, context)
+        finally:
+            profile['templates'].pop()
+            # Only the outermost template counts, included templates are part of it
+            if not profile['templates']:
+                profile['template_time'] += time.perf_counter() - started
+    _render.profiled = True
+    return _render
+
+
+class RequestProfilingMiddleware:
+    """
+    Opt-in per-request instrumentation (enable with REQUEST_PROFILING=true).
+    Records query count, DB time, template render time and total time, adds them
+    as a Server-Timing header, logs slow requests and flags repeated query shapes
+    (N+1 patterns) with the template or code line that issued them.
+    """
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'REQUEST_PROFILING', False):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.slow_ms = getattr(settings, 'REQUEST_PROFILING_SLOW_MS', 500)
+        self.repeat_threshold = getattr(settings, 'REQUEST_PROFILING_REPEAT_THRESHOLD', 5)
+        if not getattr(Template._render, 'profiled', False):
+            Template._render = _profiled_template_render(Template._render)
+
+    def __call__(self, request):
+        profile = {'queries': [], 'db_time': 0.0, 'template_time': 0.0, 'templates': []}
+        token = _current_profile.set(profile)
+        started = time.perf_counter()
+        try:
+            with connection.execute_wrapper(self.record_query):
+                response = self.get_response(request)
+        finally:
+            _current_profile.reset(token)
+        total_ms = (time.perf_counter() - started) * 1000
+
+        db_ms = profile['db_time'] * 1000
+        template_ms = profile['template_time'] * 1000
+        response['Server-Timing'] = ', '.join([
+            f'db;dur={db_ms:.1f};desc="{len(profile["queries"])} queries"',
+            f'tpl;dur={template_ms:.1f}',
+            f'total;dur={total_ms:.1f}',
+        ])
+
+        view_name = self.get_view_name(request)
+        if total_ms >= self.slow_ms:
+            logger.warning(
+                'Slow request %s %s (%s): %.0f ms total, %d queries in %.0f ms, templates %.0f ms',
+                request.method, request.path, view_name, total_ms,
+                len(profile['queries']), db_ms, template_ms
+            )
+        self.report_repeated_queries(request, view_name, profile['queries'])
+        return response
+
+    def record_query(self, execute, sql, params, many, context):
+        """Database execute wrapper: time the query and remember where it came from"""
+        profile = _current_profile.get()
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            if profile is not None:
+                profile['db_time'] += time.perf_counter() - started
+                profile['queries'].append({
+                    'shape': sql_shape(sql),
+                    'template': profile['templates'][-1] if profile['templates'] else None,
+                    'origin': self.get_origin(),
+                })
+
+    def get_origin(self):
+        """Return 'file:line' of the innermost project frame that issued a query"""
+        base_dir = str(settings.BASE_DIR)
+        for frame in reversed(traceback.extract_stack()):
+            filename = frame.filename
+            if filename.startswith(base_dir) and 'site-packages' not in filename and filename != __file__:
+                return f'{filename[len(base_dir) + 1:]}:{frame.lineno}'
+        return None
+
+    def get_view_name(self, request):
+        """Resolved view name of the request, or the path when unresolved"""
+        match = getattr(request, 'resolver_match', None)
+        return match.view_name if match else request.path
+
+    def report_repeated_queries(self, request, view_name, queries):
+        """Log every query shape executed at least repeat_threshold times"""
+        counts = {}
+        for query in queries:
+            counts.setdefault(query['shape'], []).append(query)
+
+        for shape, repeated in counts.items():
+            if len(repeated) < self.repeat_threshold:
+                continue
+            first = repeated[0]
+            source = first['template'] or first['origin'] or 'unknown'
+            if first['template'] and first['origin']:
+                source = f"{first['template']} ({first['origin']})"
+            logger.warning(
+                'Possible N+1 in %s (%s): %d x %s [from %s]',
+                request.path, view_name, len(repeated), shape[:200], source
+            )
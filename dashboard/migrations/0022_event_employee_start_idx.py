@@ -0,0 +1,17 @@
+# Generated by Django 4.2.7 on 2026-10-19 05:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard', '0021_remove_customer_dashboard_customer_temp_id_idx_and_more'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='event',
+            index=models.Index(fields=['employee', 'start_datetime'], name='dashboard_e_employe_045c9c_idx'),
+        ),
+    ]
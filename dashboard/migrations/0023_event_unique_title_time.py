@@ -0,0 +1,32 @@
+# Generated by Django 4.2.7 on 2026-10-19 05:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard', '0022_event_employee_start_idx'),
+    ]
+
+    operations = [
+        # Existing duplicates must go before the constraint can be created
+        migrations.RunSQL(
+            sql="""
+                DELETE FROM dashboard_event WHERE id IN (
+                    SELECT id FROM (
+                        SELECT id, ROW_NUMBER() OVER (
+                            PARTITION BY title, start_datetime, end_datetime ORDER BY id
+                        ) AS row_number
+                        FROM dashboard_event
+                    ) ranked
+                    WHERE ranked.row_number > 1
+                )
+            """,
+            reverse_sql=migrations.RunSQL.noop,
+        ),
+        migrations.AddConstraint(
+            model_name='event',
+            constraint=models.UniqueConstraint(fields=('title', 'start_datetime', 'end_datetime'), name='unique_event_title_time'),
+        ),
+    ]
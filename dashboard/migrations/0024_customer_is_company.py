@@ -0,0 +1,33 @@
+# Generated by Django 4.2.7 on 2026-10-19 05:19
+
+from django.db import migrations, models
+
+
+def backfill_is_company(apps, schema_editor):
+    Customer = apps.get_model('dashboard', 'Customer')
+    has_company_data = (
+        (models.Q(customer_bulstat__isnull=False) & ~models.Q(customer_bulstat='')) |
+        (models.Q(customer_mol__isnull=False) & ~models.Q(customer_mol='')) |
+        (models.Q(customer_taxno__isnull=False) & ~models.Q(customer_taxno=''))
+    )
+    Customer.objects.filter(has_company_data).update(is_company=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard', '0023_event_unique_title_time'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='customer',
+            name='is_company',
+            field=models.BooleanField(default=False, editable=False, help_text='Изчислява се при запис: има БУЛСТАТ, МОЛ или ДДС номер', verbose_name='Фирма'),
+        ),
+        migrations.AddIndex(
+            model_name='customer',
+            index=models.Index(fields=['is_company'], name='dashboard_c_is_comp_75f13d_idx'),
+        ),
+        migrations.RunPython(backfill_is_company, migrations.RunPython.noop),
+    ]
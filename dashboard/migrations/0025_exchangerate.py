@@ -0,0 +1,29 @@
+# Generated by Django 4.2.7 on 2026-10-19 05:29
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard', '0024_customer_is_company'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ExchangeRate',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField(help_text='Дата, от която курсът е валиден', unique=True, verbose_name='Дата')),
+                ('rate', models.DecimalField(decimal_places=5, help_text='Лева за 1 евро', max_digits=10, verbose_name='Курс')),
+                ('source', models.CharField(blank=True, help_text='Файл, от който е импортиран курсът', max_length=255, verbose_name='Източник')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Създаден на')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Обновен на')),
+            ],
+            options={
+                'verbose_name': 'Валутен курс',
+                'verbose_name_plural': 'Валутни курсове',
+                'ordering': ['-date'],
+            },
+        ),
+    ]
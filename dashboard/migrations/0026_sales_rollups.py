@@ -0,0 +1,89 @@
+# Generated by Django 4.2.7 on 2026-10-19 05:32
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard', '0025_exchangerate'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyEmployeeSales',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField(verbose_name='Дата')),
+                ('status', models.CharField(max_length=20, verbose_name='Статус')),
+                ('orders_count', models.PositiveIntegerField(default=0, verbose_name='Брой поръчки')),
+                ('total_without_vat', models.DecimalField(decimal_places=2, default=0, max_digits=14, verbose_name='Общо без ДДС')),
+                ('total_with_vat', models.DecimalField(decimal_places=2, default=0, max_digits=14, verbose_name='Общо с ДДС')),
+                ('labor_total', models.DecimalField(decimal_places=2, default=0, max_digits=14, verbose_name='Труд без ДДС')),
+            ],
+            options={
+                'verbose_name': 'Дневни продажби по служител',
+                'verbose_name_plural': 'Дневни продажби по служители',
+                'ordering': ['-date', 'employee'],
+            },
+        ),
+        migrations.CreateModel(
+            name='DailySales',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField(verbose_name='Дата')),
+                ('status', models.CharField(max_length=20, verbose_name='Статус')),
+                ('orders_count', models.PositiveIntegerField(default=0, verbose_name='Брой поръчки')),
+                ('total_without_vat', models.DecimalField(decimal_places=2, default=0, max_digits=14, verbose_name='Общо без ДДС')),
+                ('total_vat', models.DecimalField(decimal_places=2, default=0, max_digits=14, verbose_name='ДДС')),
+                ('total_with_vat', models.DecimalField(decimal_places=2, default=0, max_digits=14, verbose_name='Общо с ДДС')),
+                ('parts_total', models.DecimalField(decimal_places=2, default=0, max_digits=14, verbose_name='Части без ДДС')),
+                ('labor_total', models.DecimalField(decimal_places=2, default=0, max_digits=14, verbose_name='Труд без ДДС')),
+                ('is_stale', models.BooleanField(default=False, verbose_name='За преизчисляване')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Обновен на')),
+            ],
+            options={
+                'verbose_name': 'Дневни продажби',
+                'verbose_name_plural': 'Дневни продажби',
+                'ordering': ['-date', 'status'],
+            },
+        ),
+        migrations.CreateModel(
+            name='RollupWatermark',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=50, unique=True, verbose_name='Име')),
+                ('value', models.DateTimeField(verbose_name='Обработено до')),
+            ],
+            options={
+                'verbose_name': 'Маркер на обобщение',
+                'verbose_name_plural': 'Маркери на обобщения',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['updated_at'], name='dashboard_o_updated_a7a462_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='orderitem',
+            index=models.Index(fields=['updated_at'], name='dashboard_o_updated_fa04f4_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='dailysales',
+            index=models.Index(fields=['is_stale'], name='dashboard_d_is_stal_855956_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='dailysales',
+            constraint=models.UniqueConstraint(fields=('date', 'status'), name='unique_daily_sales_date_status'),
+        ),
+        migrations.AddField(
+            model_name='dailyemployeesales',
+            name='employee',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_sales', to='dashboard.employee', verbose_name='Служител'),
+        ),
+        migrations.AddConstraint(
+            model_name='dailyemployeesales',
+            constraint=models.UniqueConstraint(fields=('date', 'status', 'employee'), name='unique_daily_employee_sales'),
+        ),
+    ]
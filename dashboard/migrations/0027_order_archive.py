@@ -0,0 +1,77 @@
+# Generated by Django 4.2.7 on 2026-10-19 05:49
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard', '0026_sales_rollups'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedOrder',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('order_number', models.CharField(help_text='Уникален номер на поръчката', max_length=20, unique=True, verbose_name='Номер на поръчката')),
+                ('order_date', models.DateField(help_text='Дата на създаване на поръчката', verbose_name='Дата на поръчката')),
+                ('car_brand_model', models.CharField(blank=True, help_text='Например: C4 Picasso', max_length=255, null=True, verbose_name='Марка и модел')),
+                ('car_vin', models.CharField(blank=True, help_text='Уникален номер на шасито', max_length=50, null=True, verbose_name='VIN/Шаси номер')),
+                ('car_plate_number', models.CharField(blank=True, help_text='Например: СВ5602TK', max_length=20, null=True, verbose_name='Регистрационен номер')),
+                ('car_mileage', models.PositiveIntegerField(blank=True, help_text='Текущ пробег на колата', null=True, verbose_name='Изминати км')),
+                ('client_name', models.CharField(blank=True, help_text='Име на клиента', max_length=255, null=True, verbose_name='Име на клиента')),
+                ('client_address', models.CharField(blank=True, help_text='Адрес на клиента', max_length=500, null=True, verbose_name='Адрес на клиента')),
+                ('client_phone', models.CharField(blank=True, help_text='Телефонен номер на клиента', max_length=50, null=True, verbose_name='Телефон на клиента')),
+                ('status', models.CharField(choices=[('offer', 'Оферта'), ('invoice', 'Изготвена фактура'), ('order', 'Изготвена поръчка')], default='pending', max_length=20, verbose_name='Статус')),
+                ('notes', models.TextField(blank=True, help_text='Допълнителни бележки за поръчката', null=True, verbose_name='Бележки')),
+                ('created_at', models.DateTimeField(verbose_name='Създадена на')),
+                ('updated_at', models.DateTimeField(verbose_name='Обновена на')),
+                ('archived_at', models.DateTimeField(auto_now_add=True, verbose_name='Архивирана на')),
+                ('car', models.ForeignKey(blank=True, help_text='Изберете кола от базата данни', null=True, on_delete=django.db.models.deletion.SET_NULL, to='dashboard.car', verbose_name='Кола')),
+                ('client', models.ForeignKey(blank=True, help_text='Изберете клиент от базата данни', null=True, on_delete=django.db.models.deletion.SET_NULL, to='dashboard.customer', verbose_name='Клиент')),
+                ('employees', models.ManyToManyField(blank=True, help_text='Служители, които работят по тази поръчка', to='dashboard.employee', verbose_name='Служители')),
+            ],
+            options={
+                'verbose_name': 'Архивирана поръчка',
+                'verbose_name_plural': 'Архивирани поръчки',
+                'ordering': ['-order_date', '-created_at'],
+            },
+        ),
+        migrations.CreateModel(
+            name='ArchivedOrderItem',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('article_number', models.CharField(blank=True, help_text='Номер на артикула', max_length=50, null=True, verbose_name='Артикул номер')),
+                ('name', models.CharField(help_text='Наименование на артикула или услугата', max_length=255, verbose_name='Наименование')),
+                ('unit', models.CharField(help_text='бр, кг, л, м, норма, и т.н.', max_length=20, verbose_name='Мерна единица')),
+                ('purchase_price', models.DecimalField(decimal_places=2, help_text='Цена за единица без ДДС', max_digits=10, verbose_name='Единична цена без ДДС')),
+                ('price_with_vat', models.DecimalField(blank=True, decimal_places=2, help_text='Цена за единица с ДДС', max_digits=10, null=True, verbose_name='Единична цена с ДДС')),
+                ('quantity', models.DecimalField(decimal_places=2, help_text='Количество', max_digits=10, verbose_name='Количество')),
+                ('is_labor', models.BooleanField(default=False, help_text='Отметнете ако това е труд/услуга', verbose_name='Труд')),
+                ('include_vat', models.BooleanField(default=True, help_text='Отметнете ако артикулът трябва да включва ДДС', verbose_name='Включи ДДС')),
+                ('created_at', models.DateTimeField(verbose_name='Създаден на')),
+                ('updated_at', models.DateTimeField(verbose_name='Обновен на')),
+                ('order', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='order_items', to='dashboard.archivedorder', verbose_name='Поръчка')),
+                ('sklad_item', models.ForeignKey(blank=True, help_text='Изберете артикул от склад', null=True, on_delete=django.db.models.deletion.SET_NULL, to='dashboard.sklad', verbose_name='Артикул от склад')),
+            ],
+            options={
+                'verbose_name': 'Артикул от архивирана поръчка',
+                'verbose_name_plural': 'Артикули от архивирани поръчки',
+                'ordering': ['created_at'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='archivedorder',
+            index=models.Index(fields=['order_date'], name='dashboard_a_order_d_a90359_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='archivedorder',
+            index=models.Index(fields=['car_vin'], name='dashboard_a_car_vin_a34ef3_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='archivedorder',
+            index=models.Index(fields=['car_plate_number'], name='dashboard_a_car_pla_be2eda_idx'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.7 on 2026-10-19 06:25
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard', '0028_version_cache_table'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='employee',
+            name='leave_usage_year',
+            field=models.IntegerField(blank=True, editable=False, help_text='Годината, за която са преброени използваните отпускни дни', null=True, verbose_name='Година на използваните отпускни дни'),
+        ),
+    ]
@@ -2,6 +2,14 @@ from django.db import models
 from django.core.validators import RegexValidator
 from django.utils import timezone
 
+# Database-side equivalent of Customer.has_company_data (null or empty fields do not count)
+COMPANY_DATA_Q = (
+    (models.Q(customer_bulstat__isnull=False) & ~models.Q(customer_bulstat='')) |
+    (models.Q(customer_mol__isnull=False) & ~models.Q(customer_mol='')) |
+    (models.Q(customer_taxno__isnull=False) & ~models.Q(customer_taxno=''))
+)
+
+
 class Customer(models.Model):
     """Customer model for car service system"""
     
@@ -49,6 +57,12 @@ class Customer(models.Model):
     active = models.BooleanField(default=True, verbose_name="Активен")
     customer = models.BooleanField(default=True, verbose_name="Клиент")
     supplier = models.BooleanField(default=False, verbose_name="Доставчик")
+    is_company = models.BooleanField(
+        default=False,
+        editable=False,
+        verbose_name="Фирма",
+        help_text="Изчислява се при запис: има БУЛСТАТ, МОЛ или ДДС номер"
+    )
     
     # Additional information
     contact = models.CharField(max_length=255, blank=True, null=True, verbose_name="Контакт")
@@ -68,11 +82,25 @@ class Customer(models.Model):
             models.Index(fields=['customer_taxno']),
             models.Index(fields=['customer_bulstat']),
             models.Index(fields=['active']),
+            models.Index(fields=['is_company']),
         ]
     
     def __str__(self):
         return f"{self.number} - {self.customer_name}"
     
+    def save(self, *args, **kwargs):
+        """Keep the stored is_company flag in sync with the business fields"""
+        self.is_company = self.has_company_data
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None:
+            kwargs['update_fields'] = set(update_fields) | {'is_company'}
+        super().save(*args, **kwargs)
+    
+    @property
+    def has_company_data(self):
+        """Whether any business registration field (БУЛСТАТ, МОЛ, ДДС номер) is filled"""
+        return bool(self.customer_bulstat or self.customer_mol or self.customer_taxno)
+    
     @property
     def full_address(self):
         """Return full address as string"""
@@ -91,15 +119,13 @@ class Customer(models.Model):
     
     @property
     def customer_type(self):
-        """Determine if customer is individual or company based on business fields"""
-        if self.customer_bulstat or self.customer_mol or self.customer_taxno:
-            return "Фирма"
-        return "Частно лице"
+        """Customer type label from the stored is_company flag"""
+        return "Фирма" if self.is_company else "Частно лице"
     
     @property
     def customer_type_icon(self):
         """Get icon for customer type"""
-        if self.customer_type == "Фирма":
+        if self.is_company:
             return "fas fa-building"
         return "fas fa-user"
 
@@ -240,6 +266,13 @@ class Employee(models.Model):
         default=0,
         verbose_name="Използвани отпускни дни за текущата година"
     )
+    leave_usage_year = models.IntegerField(
+        null=True,
+        blank=True,
+        editable=False,
+        verbose_name="Година на използваните отпускни дни",
+        help_text="Годината, за която са преброени използваните отпускни дни"
+    )
     
     # Additional information
     notes = models.TextField(
@@ -274,25 +307,40 @@ class Employee(models.Model):
         """Calculate remaining annual leave days for current year"""
         return max(0, self.annual_leave_days - self.current_year_leave_used)
     
-    def update_leave_usage(self):
-        """Update current year leave usage based on approved vacation days"""
-        from datetime import date
+    def calculate_leave_usage(self, year=None):
+        """Count approved vacation days starting in the given year with a single aggregate"""
+        from datetime import date, timedelta
+        from django.db.models import Count, DurationField, ExpressionWrapper, F, Sum
         
-        current_year = date.today().year
-        approved_vacation_days_off = self.days_off.filter(
+        year = year or date.today().year
+        totals = self.days_off.filter(
             day_off_type='vacation',
             is_approved=True,
-            start_date__year=current_year
+            start_date__gte=date(year, 1, 1),
+            start_date__lt=date(year + 1, 1, 1)
+        ).aggregate(
+            span=Sum(ExpressionWrapper(F('end_date') - F('start_date'), output_field=DurationField())),
+            periods=Count('id')
         )
         
-        # Calculate total days manually
-        total_days = 0
-        for day_off in approved_vacation_days_off:
-            total_days += day_off.duration_days
-        
-        
-        self.current_year_leave_used = total_days
-        self.save(update_fields=['current_year_leave_used'])
+        # Each period is inclusive, so add one day per period to the summed spans
+        span = totals['span'] or timedelta(0)
+        return span.days + totals['periods']
+    
+    def update_leave_usage(self):
+        """Update current year leave usage based on approved vacation days"""
+        from datetime import date
+
+        self.current_year_leave_used = self.calculate_leave_usage()
+        self.leave_usage_year = date.today().year
+        self.save(update_fields=['current_year_leave_used', 'leave_usage_year'])
+
+    def refresh_leave_usage(self):
+        """Recount the leave usage when it was counted for another year (after 1 January)"""
+        from datetime import date
+
+        if self.leave_usage_year != date.today().year:
+            self.update_leave_usage()
 
 
 class DaysOff(models.Model):
@@ -436,13 +484,32 @@ class Event(models.Model):
         ordering = ['start_datetime']
         indexes = [
             models.Index(fields=['start_datetime', 'end_datetime']),
+            models.Index(fields=['employee', 'start_datetime']),
             models.Index(fields=['event_type']),
             models.Index(fields=['is_completed']),
         ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=['title', 'start_datetime', 'end_datetime'],
+                name='unique_event_title_time'
+            ),
+        ]
     
     def __str__(self):
         return f"{self.title} - {self.start_datetime.strftime('%d.%m.%Y %H:%M')}"
     
+    def clean(self):
+        """Reject double-booking the employee or booking them during approved leave"""
+        from django.core.exceptions import ValidationError
+        from .conflict_utils import find_event_conflicts
+        
+        if self.start_datetime and self.end_datetime and self.end_datetime < self.start_datetime:
+            raise ValidationError('Краят на събитието не може да бъде преди началото.')
+        
+        conflicts = find_event_conflicts(self)
+        if conflicts:
+            raise ValidationError({'employee': [conflict['message'] for conflict in conflicts]})
+    
     @property
     def duration_hours(self):
         """Calculate duration in hours"""
@@ -538,8 +605,8 @@ class Sklad(models.Model):
         return f"{self.article_number} - {self.name}"
 
 
-class Order(models.Model):
-    """Order model for car service repairs"""
+class AbstractOrder(models.Model):
+    """Fields and totals shared by live orders (Order) and archived ones (ArchivedOrder)"""
     
     ORDER_STATUS_CHOICES = [
         ('offer', 'Оферта'),
@@ -659,17 +726,11 @@ class Order(models.Model):
     created_at = models.DateTimeField(auto_now_add=True, verbose_name="Създадена на")
     updated_at = models.DateTimeField(auto_now=True, verbose_name="Обновена на")
     
+    # True on ArchivedOrder
+    is_archived = False
+    
     class Meta:
-        verbose_name = "Поръчка"
-        verbose_name_plural = "Поръчки"
-        ordering = ['-order_date', '-created_at']
-        indexes = [
-            models.Index(fields=['order_number']),
-            models.Index(fields=['order_date']),
-            models.Index(fields=['status']),
-            models.Index(fields=['car_vin']),
-            models.Index(fields=['car_plate_number']),
-        ]
+        abstract = True
     
     def __str__(self):
         return f"Поръчка {self.order_number} - {self.get_car_display()} - {self.get_client_display()}"
@@ -716,15 +777,33 @@ class Order(models.Model):
         return sum(item.total_price for item in self.order_items.filter(is_labor=True))
 
 
-class OrderItem(models.Model):
-    """Order item model for parts and services used in orders"""
+class Order(AbstractOrder):
+    """Order model for car service repairs"""
     
-    order = models.ForeignKey(
-        Order,
-        on_delete=models.CASCADE,
-        related_name='order_items',
-        verbose_name="Поръчка"
-    )
+    class Meta:
+        verbose_name = "Поръчка"
+        verbose_name_plural = "Поръчки"
+        ordering = ['-order_date', '-created_at']
+        indexes = [
+            models.Index(fields=['order_number']),
+            models.Index(fields=['order_date']),
+            models.Index(fields=['status']),
+            models.Index(fields=['car_vin']),
+            models.Index(fields=['car_plate_number']),
+            models.Index(fields=['updated_at']),
+        ]
+    
+    @property
+    def invoice_rate_date(self):
+        """Date whose EUR rate applies: the invoice date, or the order date before invoicing"""
+        try:
+            return self.invoice.invoice_date
+        except Order.invoice.RelatedObjectDoesNotExist:
+            return self.order_date
+
+
+class AbstractOrderItem(models.Model):
+    """Fields and totals shared by OrderItem and ArchivedOrderItem"""
     
     # Part information (can be linked to existing sklad item or standalone)
     sklad_item = models.ForeignKey(
@@ -796,13 +875,7 @@ class OrderItem(models.Model):
     updated_at = models.DateTimeField(auto_now=True, verbose_name="Обновен на")
     
     class Meta:
-        verbose_name = "Артикул от поръчка"
-        verbose_name_plural = "Артикули от поръчка"
-        ordering = ['created_at']
-        indexes = [
-            models.Index(fields=['order']),
-            models.Index(fields=['is_labor']),
-        ]
+        abstract = True
     
     def __str__(self):
         return f"{self.name} - {self.quantity} {self.unit}"
@@ -840,6 +913,27 @@ class OrderItem(models.Model):
         return self.get_price_with_vat() * self.quantity
 
 
+class OrderItem(AbstractOrderItem):
+    """Order item model for parts and services used in orders"""
+    
+    order = models.ForeignKey(
+        Order,
+        on_delete=models.CASCADE,
+        related_name='order_items',
+        verbose_name="Поръчка"
+    )
+    
+    class Meta:
+        verbose_name = "Артикул от поръчка"
+        verbose_name_plural = "Артикули от поръчка"
+        ordering = ['created_at']
+        indexes = [
+            models.Index(fields=['order']),
+            models.Index(fields=['is_labor']),
+            models.Index(fields=['updated_at']),
+        ]
+
+
 class ImportLog(models.Model):
     """Model to track import operations and their details"""
     
@@ -1105,3 +1199,174 @@ class Invoice(models.Model):
             self.due_date = self.invoice_date + timedelta(days=30)
         
         super().save(*args, **kwargs)
+
+
+class ExchangeRate(models.Model):
+    """EUR to BGN exchange rate valid from a given date"""
+    
+    date = models.DateField(
+        unique=True,
+        verbose_name="Дата",
+        help_text="Дата, от която курсът е валиден"
+    )
+    
+    rate = models.DecimalField(
+        max_digits=10,
+        decimal_places=5,
+        verbose_name="Курс",
+        help_text="Лева за 1 евро"
+    )
+    
+    source = models.CharField(
+        max_length=255,
+        blank=True,
+        verbose_name="Източник",
+        help_text="Файл, от който е импортиран курсът"
+    )
+    
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name="Създаден на")
+    updated_at = models.DateTimeField(auto_now=True, verbose_name="Обновен на")
+    
+    class Meta:
+        verbose_name = "Валутен курс"
+        verbose_name_plural = "Валутни курсове"
+        ordering = ['-date']
+    
+    def __str__(self):
+        return f"{self.date.strftime('%d.%m.%Y')}: 1 EUR = {self.rate} BGN"
+
+
+class DailySales(models.Model):
+    """Daily sales rollup per order status, rebuilt by the refresh_sales_rollups command"""
+    
+    date = models.DateField(verbose_name="Дата")
+    status = models.CharField(max_length=20, verbose_name="Статус")
+    
+    orders_count = models.PositiveIntegerField(default=0, verbose_name="Брой поръчки")
+    total_without_vat = models.DecimalField(
+        max_digits=14, decimal_places=2, default=0, verbose_name="Общо без ДДС"
+    )
+    total_vat = models.DecimalField(
+        max_digits=14, decimal_places=2, default=0, verbose_name="ДДС"
+    )
+    total_with_vat = models.DecimalField(
+        max_digits=14, decimal_places=2, default=0, verbose_name="Общо с ДДС"
+    )
+    parts_total = models.DecimalField(
+        max_digits=14, decimal_places=2, default=0, verbose_name="Части без ДДС"
+    )
+    labor_total = models.DecimalField(
+        max_digits=14, decimal_places=2, default=0, verbose_name="Труд без ДДС"
+    )
+    
+    # Set when a deleted or moved order changes the day without touching updated_at of what remains
+    is_stale = models.BooleanField(default=False, verbose_name="За преизчисляване")
+    
+    updated_at = models.DateTimeField(auto_now=True, verbose_name="Обновен на")
+    
+    class Meta:
+        verbose_name = "Дневни продажби"
+        verbose_name_plural = "Дневни продажби"
+        ordering = ['-date', 'status']
+        constraints = [
+            models.UniqueConstraint(fields=['date', 'status'], name='unique_daily_sales_date_status'),
+        ]
+        indexes = [
+            models.Index(fields=['is_stale']),
+        ]
+    
+    def __str__(self):
+        return f"{self.date.strftime('%d.%m.%Y')} ({self.status}): {self.total_with_vat} лв."
+
+
+class DailyEmployeeSales(models.Model):
+    """Daily sales rollup per employee and order status (the whole order counts for every assigned employee)"""
+    
+    date = models.DateField(verbose_name="Дата")
+    status = models.CharField(max_length=20, verbose_name="Статус")
+    employee = models.ForeignKey(
+        Employee,
+        on_delete=models.CASCADE,
+        related_name='daily_sales',
+        verbose_name="Служител"
+    )
+    
+    orders_count = models.PositiveIntegerField(default=0, verbose_name="Брой поръчки")
+    total_without_vat = models.DecimalField(
+        max_digits=14, decimal_places=2, default=0, verbose_name="Общо без ДДС"
+    )
+    total_with_vat = models.DecimalField(
+        max_digits=14, decimal_places=2, default=0, verbose_name="Общо с ДДС"
+    )
+    labor_total = models.DecimalField(
+        max_digits=14, decimal_places=2, default=0, verbose_name="Труд без ДДС"
+    )
+    
+    class Meta:
+        verbose_name = "Дневни продажби по служител"
+        verbose_name_plural = "Дневни продажби по служители"
+        ordering = ['-date', 'employee']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['date', 'status', 'employee'],
+                name='unique_daily_employee_sales'
+            ),
+        ]
+    
+    def __str__(self):
+        return f"{self.date.strftime('%d.%m.%Y')} - {self.employee}: {self.total_with_vat} лв."
+
+
+class RollupWatermark(models.Model):
+    """Point in time up to which a rollup has processed changes"""
+    
+    name = models.CharField(max_length=50, unique=True, verbose_name="Име")
+    value = models.DateTimeField(verbose_name="Обработено до")
+    
+    class Meta:
+        verbose_name = "Маркер на обобщение"
+        verbose_name_plural = "Маркери на обобщения"
+    
+    def __str__(self):
+        return f"{self.name}: {self.value}"
+
+
+class ArchivedOrder(AbstractOrder):
+    """Order moved out of the live tables by the archive_orders command, read-only"""
+    
+    # Copied from the live order instead of being set on save
+    created_at = models.DateTimeField(verbose_name="Създадена на")
+    updated_at = models.DateTimeField(verbose_name="Обновена на")
+    
+    archived_at = models.DateTimeField(auto_now_add=True, verbose_name="Архивирана на")
+    
+    is_archived = True
+    
+    class Meta:
+        verbose_name = "Архивирана поръчка"
+        verbose_name_plural = "Архивирани поръчки"
+        ordering = ['-order_date', '-created_at']
+        indexes = [
+            models.Index(fields=['order_date']),
+            models.Index(fields=['car_vin']),
+            models.Index(fields=['car_plate_number']),
+        ]
+
+
+class ArchivedOrderItem(AbstractOrderItem):
+    """Item of an archived order"""
+    
+    order = models.ForeignKey(
+        ArchivedOrder,
+        on_delete=models.CASCADE,
+        related_name='order_items',
+        verbose_name="Поръчка"
+    )
+    
+    created_at = models.DateTimeField(verbose_name="Създаден на")
+    updated_at = models.DateTimeField(verbose_name="Обновен на")
+    
+    class Meta:
+        verbose_name = "Артикул от архивирана поръчка"
+        verbose_name_plural = "Артикули от архивирани поръчки"
+        ordering = ['created_at']
@@ -15,6 +15,8 @@ from django.conf import settings
 import os
 from decimal import Decimal
 
+from .currency_utils import bgn_to_eur, get_currency_context
+
 # Register fonts for Bulgarian text support
 FONT_NAME = 'Helvetica'
 FONT_BOLD = 'Helvetica-Bold'
@@ -245,6 +247,24 @@ def generate_invoice_pdf(order):
     ]))
     
     story.append(items_table)
+    
+    # EUR equivalent with the rate valid on the invoice date
+    if not is_order:
+        rate_date = order.invoice_rate_date
+        rate = get_currency_context().rate_on(rate_date)
+        eur_style = ParagraphStyle(
+            'EurTotal',
+            parent=styles['Normal'],
+            fontName=FONT_NAME,
+            fontSize=9,
+            alignment=TA_RIGHT,
+            spaceBefore=6
+        )
+        story.append(Paragraph(safe_text(
+            f"Обща сума с ДДС: {bgn_to_eur(order.total_with_vat, rate_date):.2f} EUR "
+            f"(1 EUR = {rate:.5f} лв. към {rate_date.strftime('%d.%m.%Y')})"
+        ), eur_style))
+    
     story.append(Spacer(1, 30))
     
     # Bank information
@@ -0,0 +1,363 @@
+"""
+Planner utilities for the dashboard calendar
+Builds per-day buckets of events and days off and caches the week and range payloads
+(per process, keyed by the planner version from the shared version cache)
+"""
+
+import hashlib
+import json
+from bisect import bisect_left, bisect_right
+from datetime import datetime, time as dt_time, timedelta
+
+from django.core.cache import cache
+from django.db import connection
+from django.utils import timezone
+
+from .conditional_utils import bump_version, get_version
+from .models import DaysOff, Event
+
+
+PLANNER_VERSION_KEY = 'planner_version'
+PLANNER_CACHE_TIMEOUT = 60 * 60 * 24
+
+# Longest range served by the range endpoint (about three months)
+PLANNER_MAX_RANGE_DAYS = 93
+
+# Bulgarian day names
+BULGARIAN_DAYS = ['ПОН', 'ВТО', 'СРЯ', 'ЧЕТ', 'ПЕТ', 'СЪБ', 'НЕД']
+
+
+def get_day_off_color(day_off_type):
+    """Get color for day off type"""
+    colors = {
+        'vacation': '#28a745',      # Green for vacation
+        'sick': '#dc3545',          # Red for sick leave
+        'personal': '#ffc107',      # Yellow for personal
+        'holiday': '#6f42c1',      # Purple for holiday
+        'other': '#17a2b8'          # Blue for other
+    }
+    return colors.get(day_off_type, '#6c757d')  # Default gray
+
+
+def get_event_color(event_type):
+    """Get color for event type"""
+    colors = {
+        'meeting': '#007bff',       # Blue for meetings
+        'appointment': '#28a745',   # Green for appointments
+        'maintenance': '#ffc107',   # Yellow for maintenance
+        'inspection': '#fd7e14',    # Orange for inspections
+        'delivery': '#6f42c1',      # Purple for deliveries
+        'other': '#6c757d'          # Gray for other
+    }
+    return colors.get(event_type, '#6c757d')  # Default gray
+
+
+def get_planner_version():
+    """
+    Get the current planner data version.
+    Shared by all workers, so an Event/DaysOff save in one of them changes
+    the payload keys and ETags of the others as well.
+    """
+    return get_version(PLANNER_VERSION_KEY)
+
+
+def bump_planner_version():
+    """Invalidate all cached planner payloads (called on Event/DaysOff changes)"""
+    bump_version(PLANNER_VERSION_KEY)
+
+
+DELETE_DUPLICATE_EVENTS_SQL = """
+    DELETE FROM {table} WHERE id IN (
+        SELECT id FROM (
+            SELECT id, ROW_NUMBER() OVER (
+                PARTITION BY title, start_datetime, end_datetime ORDER BY id
+            ) AS row_number
+            FROM {table}
+        ) ranked
+        WHERE ranked.row_number > 1
+    )
+"""
+
+
+def delete_duplicate_events():
+    """
+    Delete duplicate events (same title, start and end) with a single
+    window-function DELETE, keeping the lowest id of each group.
+    Returns the number of removed events.
+    """
+    table = connection.ops.quote_name(Event._meta.db_table)
+    with connection.cursor() as cursor:
+        cursor.execute(DELETE_DUPLICATE_EVENTS_SQL.format(table=table))
+        removed_count = cursor.rowcount
+    # Raw SQL bypasses post_delete signals, so invalidate the planner cache here
+    if removed_count:
+        bump_planner_version()
+    return removed_count
+
+
+DUPLICATE_EVENT_CONSTRAINT = 'unique_event_title_time'
+
+
+def is_duplicate_event_error(error):
+    """True when an IntegrityError comes from the unique (title, start, end) event constraint"""
+    diag = getattr(error.__cause__, 'diag', None)
+    if diag is not None:
+        # psycopg2 reports the violated constraint by name
+        return diag.constraint_name == DUPLICATE_EVENT_CONSTRAINT
+    # SQLite only lists the columns: "UNIQUE constraint failed: table.title, ..."
+    constraint = next(c for c in Event._meta.constraints if c.name == DUPLICATE_EVENT_CONSTRAINT)
+    columns = ', '.join(
+        f'{Event._meta.db_table}.{Event._meta.get_field(name).column}' for name in constraint.fields
+    )
+    return str(error) == f'UNIQUE constraint failed: {columns}'
+
+
+def get_week_start(week_offset=0, today=None):
+    """Return the Monday (date) of the week at the given offset from today"""
+    today = today or timezone.localdate()
+    return today - timedelta(days=today.weekday()) + timedelta(weeks=week_offset)
+
+
+def local_day_start(day):
+    """Return an aware datetime for local midnight of the given date"""
+    return timezone.make_aware(datetime.combine(day, dt_time.min))
+
+
+def serialize_day_off(day_off):
+    """Serialize an approved day off for the planner"""
+    return {
+        'id': day_off.id,
+        'employee_name': day_off.employee.full_name,
+        'type': day_off.get_day_off_type_display(),
+        'reason': day_off.reason or '',
+        'color': get_day_off_color(day_off.day_off_type),
+        'is_all_day': True
+    }
+
+
+def serialize_event(event, start_local, end_local):
+    """Serialize an event for the planner using already localized datetimes"""
+    return {
+        'id': event.id,
+        'title': event.title,
+        'event_type': event.event_type,
+        'type': event.get_event_type_display(),
+        'start_date': start_local.strftime('%Y-%m-%d'),
+        'start_time': start_local.strftime('%H:%M'),
+        'end_time': end_local.strftime('%H:%M'),
+        'is_all_day': event.is_all_day,
+        'color': get_event_color(event.event_type),
+        'customer': event.customer.customer_name if event.customer else None,
+        'employee': event.employee.full_name if event.employee else None,
+        'employee_id': event.employee_id,
+        'description': event.description or ''
+    }
+
+
+class IntervalIndex:
+    """
+    Static index over closed intervals [start, end] sorted by start.
+    A running maximum of the ends lets overlap queries skip every interval
+    that finished before the query window, so a lookup costs two bisects
+    plus the number of candidates that start inside the window.
+    """
+
+    def __init__(self, intervals):
+        self.intervals = sorted(intervals, key=lambda interval: interval[0])
+        self.starts = [interval[0] for interval in self.intervals]
+        self.max_ends = []
+        running_max = None
+        for interval in self.intervals:
+            if running_max is None or interval[1] > running_max:
+                running_max = interval[1]
+            self.max_ends.append(running_max)
+
+    def __len__(self):
+        return len(self.intervals)
+
+    def overlapping(self, start, end):
+        """Return (start, end, value) tuples intersecting the closed range [start, end]"""
+        lo = bisect_left(self.max_ends, start)
+        hi = bisect_right(self.starts, end)
+        return [interval for interval in self.intervals[lo:hi] if interval[1] >= start]
+
+    def sweep_days(self, start_date, end_date):
+        """
+        Yield (day, values) for every date in [start_date, end_date] in one
+        ordered pass, adding intervals as they open and dropping them once
+        they end.
+        """
+        position = bisect_left(self.max_ends, start_date)
+        active = []
+        day = start_date
+        while day <= end_date:
+            while position < len(self.intervals) and self.starts[position] <= day:
+                if self.intervals[position][1] >= day:
+                    active.append(self.intervals[position])
+                position += 1
+            active = [interval for interval in active if interval[1] >= day]
+            yield day, [interval[2] for interval in active]
+            day += timedelta(days=1)
+
+
+def bucket_days_off(start_date, end_date):
+    """
+    Group approved days off by date for the inclusive range [start_date, end_date].
+    Days off are loaded once and swept through an interval index, so long
+    leaves never expand beyond the visible days.
+    """
+    days_off = DaysOff.objects.filter(
+        start_date__lte=end_date,
+        end_date__gte=start_date,
+        is_approved=True
+    ).select_related('employee')
+
+    index = IntervalIndex(
+        (day_off.start_date, day_off.end_date, serialize_day_off(day_off))
+        for day_off in days_off
+    )
+
+    days_off_by_date = {}
+    for day, entries in index.sweep_days(start_date, end_date):
+        if entries:
+            days_off_by_date[day.strftime('%Y-%m-%d')] = entries
+    return days_off_by_date
+
+
+def bucket_events(start_date, end_date):
+    """
+    Group events starting in the inclusive date range by their local start date.
+    Uses half-open datetime bounds so the (start_datetime, end_datetime) index applies.
+    """
+    range_start = local_day_start(start_date)
+    range_end = local_day_start(end_date + timedelta(days=1))
+    events = Event.objects.filter(
+        start_datetime__gte=range_start,
+        start_datetime__lt=range_end
+    ).select_related('customer', 'employee').order_by('start_datetime')
+
+    events_by_date = {}
+    for event in events:
+        start_local = timezone.localtime(event.start_datetime)
+        end_local = timezone.localtime(event.end_datetime)
+        events_by_date.setdefault(start_local.strftime('%Y-%m-%d'), []).append(
+            serialize_event(event, start_local, end_local)
+        )
+    return events_by_date
+
+
+def build_days(start_date, end_date, today):
+    """Build the day headers for the inclusive range"""
+    days = []
+    day = start_date
+    while day <= end_date:
+        days.append({
+            'date': day.strftime('%Y-%m-%d'),
+            'day_name': BULGARIAN_DAYS[day.weekday()],
+            'day_number': day.day,
+            'is_today': day == today
+        })
+        day += timedelta(days=1)
+    return days
+
+
+def build_week_payload(week_offset=0, today=None):
+    """Build the weekly planner payload for the week at the given offset"""
+    today = today or timezone.localdate()
+    start_of_week = get_week_start(week_offset, today)
+    end_of_week = start_of_week + timedelta(days=6)
+
+    return {
+        'week_days': build_days(start_of_week, end_of_week, today),
+        'current_week': week_offset == 0,
+        'days_off': bucket_days_off(start_of_week, end_of_week),
+        'events': bucket_events(start_of_week, end_of_week)
+    }
+
+
+def build_range_payload(start_date, end_date, today=None):
+    """
+    Build the planner payload for an arbitrary date range.
+    Days are also grouped into Monday-Sunday rows so a month or print view
+    can render the grid directly.
+    """
+    today = today or timezone.localdate()
+    days = build_days(start_date, end_date, today)
+
+    weeks = []
+    for day in days:
+        if not weeks or day['day_name'] == BULGARIAN_DAYS[0]:
+            weeks.append([])
+        weeks[-1].append(day['date'])
+
+    return {
+        'from': start_date.strftime('%Y-%m-%d'),
+        'to': end_date.strftime('%Y-%m-%d'),
+        'days': days,
+        'weeks': weeks,
+        'days_off': bucket_days_off(start_date, end_date),
+        'events': bucket_events(start_date, end_date)
+    }
+
+
+def parse_planner_range(date_from, date_to):
+    """
+    Parse and validate the from/to parameters of the range endpoint.
+    Returns (start_date, end_date) or raises ValueError with a user-facing message.
+    """
+    try:
+        start_date = datetime.strptime(date_from, '%Y-%m-%d').date()
+        end_date = datetime.strptime(date_to, '%Y-%m-%d').date()
+    except (TypeError, ValueError):
+        raise ValueError('Невалиден период. Използвайте формат ГГГГ-ММ-ДД.')
+
+    if end_date < start_date:
+        raise ValueError('Крайната дата трябва да е след началната.')
+    if (end_date - start_date).days + 1 > PLANNER_MAX_RANGE_DAYS:
+        raise ValueError(f'Периодът не може да е по-дълъг от {PLANNER_MAX_RANGE_DAYS} дни.')
+    return start_date, end_date
+
+
+def get_week_cache_key(week_offset=0, today=None):
+    """Cache key for a week payload; includes today since is_today depends on it"""
+    today = today or timezone.localdate()
+    start_of_week = get_week_start(week_offset, today)
+    return f'planner:week:{get_planner_version()}:{start_of_week.isoformat()}:{today.isoformat()}'
+
+
+def get_week_etag(week_offset=0, today=None):
+    """ETag for a week payload, derived from the cache key without touching the database"""
+    return hashlib.md5(get_week_cache_key(week_offset, today).encode()).hexdigest()
+
+
+def get_week_json(week_offset=0, today=None):
+    """Return the serialized week payload, building and caching it on a miss"""
+    today = today or timezone.localdate()
+    cache_key = get_week_cache_key(week_offset, today)
+    payload = cache.get(cache_key)
+    if payload is None:
+        payload = json.dumps(build_week_payload(week_offset, today))
+        cache.set(cache_key, payload, PLANNER_CACHE_TIMEOUT)
+    return payload
+
+
+def get_range_cache_key(start_date, end_date, today=None):
+    """Cache key for a range payload"""
+    today = today or timezone.localdate()
+    return f'planner:range:{get_planner_version()}:{start_date.isoformat()}:{end_date.isoformat()}:{today.isoformat()}'
+
+
+def get_range_etag(start_date, end_date, today=None):
+    """ETag for a range payload"""
+    return hashlib.md5(get_range_cache_key(start_date, end_date, today).encode()).hexdigest()
+
+
+def get_range_json(start_date, end_date, today=None):
+    """Return the serialized range payload, building and caching it on a miss"""
+    today = today or timezone.localdate()
+    cache_key = get_range_cache_key(start_date, end_date, today)
+    payload = cache.get(cache_key)
+    if payload is None:
+        payload = json.dumps(build_range_payload(start_date, end_date, today))
+        cache.set(cache_key, payload, PLANNER_CACHE_TIMEOUT)
+    return payload
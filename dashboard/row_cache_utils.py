@@ -0,0 +1,79 @@
+"""
+Row cache utilities
+Per-row fragment caching for the list tables, keyed by id and a version
+derived from updated_at (see templatetags/row_cache.py)
+"""
+
+import hashlib
+
+from django.core.cache import cache
+from django.utils import timezone
+
+
+# Bump when the markup of a cached row in a *_table.html template changes
+ROW_CACHE_VERSION = 1
+ROW_CACHE_TIMEOUT = 60 * 60 * 24 * 7
+
+
+def _stamp(value):
+    return value.isoformat() if value else ''
+
+
+def customer_row_version(customer):
+    """Customer fields plus the active car count and the previewed cars"""
+    parts = [_stamp(customer.updated_at), getattr(customer, 'cars_count', '')]
+    for car in getattr(customer, 'preview_cars', []):
+        parts.append(f'{car.pk}@{_stamp(car.updated_at)}')
+    return parts
+
+
+def order_row_version(order):
+    """Order fields plus its items, from the prefetched order_items (archived orders keep their timestamps)"""
+    items = order.order_items.all()
+    return [
+        _stamp(order.updated_at),
+        len(items),
+        _stamp(max((item.updated_at for item in items), default=None)),
+        'archived' if order.is_archived else '',
+    ]
+
+
+def invoice_row_version(invoice):
+    """Invoice fields plus today's date, which drives the overdue and due soon labels"""
+    return [_stamp(invoice.updated_at), timezone.localdate().isoformat()]
+
+
+def sklad_row_version(item):
+    return [_stamp(item.updated_at)]
+
+
+ROW_VERSIONS = {
+    'customer': customer_row_version,
+    'order': order_row_version,
+    'invoice': invoice_row_version,
+    'sklad': sklad_row_version,
+}
+
+
+def row_cache_key(prefix, obj):
+    """Cache key for one table row, changes whenever the row version changes"""
+    version = ':'.join(str(part) for part in ROW_VERSIONS[prefix](obj))
+    digest = hashlib.md5(version.encode()).hexdigest()
+    return f'row:{ROW_CACHE_VERSION}:{prefix}:{obj.pk}:{digest}'
+
+
+class RowCache:
+    """Rows of one table page fetched from the cache with a single get_many"""
+
+    def __init__(self, objects, prefix):
+        self.prefix = prefix
+        self.keys = {obj.pk: row_cache_key(prefix, obj) for obj in objects}
+        self.rows = cache.get_many(list(self.keys.values())) if self.keys else {}
+
+    def get(self, obj):
+        key = self.keys.get(obj.pk) or row_cache_key(self.prefix, obj)
+        return key, self.rows.get(key)
+
+    def set(self, key, html):
+        self.rows[key] = html
+        cache.set(key, html, ROW_CACHE_TIMEOUT)
@@ -0,0 +1,199 @@
+"""
+Sales rollup utilities
+Daily sales totals per order status and per employee, kept in DailySales /
+DailyEmployeeSales so reports never scan Order/OrderItem. Only days touched
+since the last refresh (the watermark) are rebuilt.
+"""
+
+from datetime import timedelta
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Case, Count, DecimalField, ExpressionWrapper, F, Sum, Value, When
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .models import (
+    ArchivedOrder, ArchivedOrderItem, DailyEmployeeSales, DailySales, Order, OrderItem, RollupWatermark
+)
+
+
+WATERMARK_NAME = 'daily_sales'
+
+# Statuses that count as sales in reports (offers are only quoted)
+SALES_STATUSES = ('invoice', 'order')
+
+# Days rebuilt per transaction
+REBUILD_CHUNK_DAYS = 200
+
+# Changes committed by transactions that started before a refresh are picked up by the next one
+WATERMARK_OVERLAP = timedelta(minutes=5)
+
+MONEY = DecimalField(max_digits=14, decimal_places=4)
+ZERO = Value(Decimal('0'), output_field=MONEY)
+
+
+def line_totals(prefix=''):
+    """
+    Money expressions of an OrderItem, with the same arithmetic as OrderItem.total_price /
+    total_vat / total_price_with_vat. prefix reaches the items from another model,
+    e.g. 'order_items__' from Order.
+    """
+    def field(name):
+        return F(prefix + name)
+
+    def include_vat(then):
+        return When(**{prefix + 'include_vat': True}, then=then)
+
+    net = ExpressionWrapper(field('purchase_price') * field('quantity'), output_field=MONEY)
+    vat = Case(
+        include_vat(ExpressionWrapper(net * Decimal('0.20'), output_field=MONEY)),
+        default=ZERO,
+        output_field=MONEY,
+    )
+    gross = ExpressionWrapper(
+        Coalesce(
+            field('price_with_vat'),
+            Case(include_vat(field('purchase_price') * Decimal('1.20')), default=field('purchase_price')),
+            output_field=MONEY,
+        ) * field('quantity'),
+        output_field=MONEY,
+    )
+    labor = Case(When(**{prefix + 'is_labor': True}, then=net), default=ZERO, output_field=MONEY)
+    parts = Case(When(**{prefix + 'is_labor': False}, then=net), default=ZERO, output_field=MONEY)
+    return net, vat, gross, parts, labor
+
+
+LINE_NET, LINE_VAT, LINE_GROSS, LINE_PARTS, LINE_LABOR = line_totals()
+
+
+def order_totals():
+    """Annotations with the totals of an Order (same as its total_without_vat / total_vat / total_with_vat)"""
+    net, vat, gross, _, _ = line_totals('order_items__')
+    return {
+        'sum_without_vat': Coalesce(Sum(net), ZERO),
+        'sum_vat': Coalesce(Sum(vat), ZERO),
+        'sum_with_vat': Coalesce(Sum(gross), ZERO),
+    }
+
+
+def money(value):
+    return Decimal(value or 0).quantize(Decimal('0.01'))
+
+
+def get_watermark():
+    return RollupWatermark.objects.filter(name=WATERMARK_NAME).values_list('value', flat=True).first()
+
+
+def mark_days_stale(days):
+    """Flag rollup days whose totals changed without a newer updated_at (deleted or moved orders)"""
+    days = {day for day in days if day}
+    if days:
+        DailySales.objects.filter(date__in=days).update(is_stale=True)
+
+
+def touched_days(since):
+    """Order dates with orders or items changed since the watermark, plus days flagged stale"""
+    days = set(Order.objects.filter(updated_at__gte=since).values_list('order_date', flat=True))
+    days.update(
+        OrderItem.objects.filter(updated_at__gte=since).values_list('order__order_date', flat=True)
+    )
+    days.update(DailySales.objects.filter(is_stale=True).values_list('date', flat=True))
+    return days
+
+
+def all_days():
+    days = set(Order.objects.values_list('order_date', flat=True).distinct())
+    days.update(ArchivedOrder.objects.values_list('order_date', flat=True).distinct())
+    days.update(DailySales.objects.values_list('date', flat=True).distinct())
+    return days
+
+
+def add_rollups(order_model, item_model, days, sales, employee_sales):
+    """Add the totals of one order table (live or archive) for the given days to the rollup rows"""
+    for row in order_model.objects.filter(order_date__in=days).values('order_date', 'status').annotate(
+        orders=Count('id')
+    ):
+        key = (row['order_date'], row['status'])
+        rollup = sales.setdefault(key, DailySales(date=key[0], status=key[1]))
+        rollup.orders_count += row['orders']
+
+    for row in item_model.objects.filter(order__order_date__in=days).values(
+        'order__order_date', 'order__status'
+    ).annotate(
+        net=Sum(LINE_NET), vat=Sum(LINE_VAT), gross=Sum(LINE_GROSS),
+        parts=Sum(LINE_PARTS), labor=Sum(LINE_LABOR),
+    ):
+        # An order committed after the order count query only has items here (READ COMMITTED)
+        key = (row['order__order_date'], row['order__status'])
+        rollup = sales.setdefault(key, DailySales(date=key[0], status=key[1]))
+        rollup.total_without_vat += money(row['net'])
+        rollup.total_vat += money(row['vat'])
+        rollup.total_with_vat += money(row['gross'])
+        rollup.parts_total += money(row['parts'])
+        rollup.labor_total += money(row['labor'])
+
+    # The through table's order column is named after the model (order / archivedorder)
+    order_field = order_model._meta.model_name
+    assignments = order_model.employees.through.objects.filter(**{f'{order_field}__order_date__in': days})
+    for row in assignments.values(f'{order_field}__order_date', f'{order_field}__status', 'employee_id').annotate(
+        orders=Count(f'{order_field}_id')
+    ):
+        key = (row[f'{order_field}__order_date'], row[f'{order_field}__status'], row['employee_id'])
+        rollup = employee_sales.setdefault(
+            key, DailyEmployeeSales(date=key[0], status=key[1], employee_id=key[2])
+        )
+        rollup.orders_count += row['orders']
+
+    for row in item_model.objects.filter(
+        order__order_date__in=days, order__employees__isnull=False
+    ).values('order__order_date', 'order__status', 'order__employees').annotate(
+        net=Sum(LINE_NET), gross=Sum(LINE_GROSS), labor=Sum(LINE_LABOR),
+    ):
+        key = (row['order__order_date'], row['order__status'], row['order__employees'])
+        rollup = employee_sales.setdefault(
+            key, DailyEmployeeSales(date=key[0], status=key[1], employee_id=key[2])
+        )
+        rollup.total_without_vat += money(row['net'])
+        rollup.total_with_vat += money(row['gross'])
+        rollup.labor_total += money(row['labor'])
+
+
+def build_rollups(days):
+    """
+    Aggregate the given days over the live and the archived orders (four grouped
+    queries each), returns (DailySales, DailyEmployeeSales) rows
+    """
+    sales = {}
+    employee_sales = {}
+    add_rollups(Order, OrderItem, days, sales, employee_sales)
+    add_rollups(ArchivedOrder, ArchivedOrderItem, days, sales, employee_sales)
+    return list(sales.values()), list(employee_sales.values())
+
+
+def rebuild_days(days):
+    """Replace the rollup rows of the given days, one transaction per chunk"""
+    days = sorted(days)
+    for start in range(0, len(days), REBUILD_CHUNK_DAYS):
+        chunk = days[start:start + REBUILD_CHUNK_DAYS]
+        with transaction.atomic():
+            sales, employee_sales = build_rollups(chunk)
+            DailySales.objects.filter(date__in=chunk).delete()
+            DailyEmployeeSales.objects.filter(date__in=chunk).delete()
+            DailySales.objects.bulk_create(sales)
+            DailyEmployeeSales.objects.bulk_create(employee_sales)
+
+
+def refresh_sales_rollups(full=False):
+    """
+    Rebuild the rollups of days touched since the watermark (every day with full
+    or on the first run), then move the watermark. Returns the number of days rebuilt.
+    """
+    started = timezone.now()
+    watermark = get_watermark()
+    days = all_days() if full or watermark is None else touched_days(watermark)
+    rebuild_days(days)
+    RollupWatermark.objects.update_or_create(
+        name=WATERMARK_NAME, defaults={'value': started - WATERMARK_OVERLAP}
+    )
+    return len(days)
@@ -0,0 +1,511 @@
+"""
+Synthetic data utilities for benchmarks and local scale testing
+Generates deterministic, production-sized data sets and loads them in chunks
+(Postgres COPY when available, bulk_create otherwise)
+"""
+
+import io
+import json
+import random
+import time
+from datetime import date, datetime, time as dt_time, timedelta
+from decimal import Decimal
+from itertools import islice
+
+from django.db import connection, models, transaction
+from django.db.models import DecimalField, ExpressionWrapper, F, Max, Sum
+from django.utils import timezone
+
+from .models import Customer, Car, Employee, DaysOff, Event, Sklad, Order, OrderItem, Invoice, ImportLog
+
+
+# Row counts at scale 1.0 (roughly a large production installation)
+SCALE_COUNTS = {
+    'customers': 100_000,
+    'cars': 250_000,
+    'orders': 500_000,
+    'order_items': 2_000_000,
+    'sklad': 20_000,
+    'employees': 40,
+    'import_logs': 2_000,
+    'event_days': 365,
+}
+
+CHUNK_SIZE = 5000
+
+FIRST_NAMES = [
+    'Иван', 'Георги', 'Димитър', 'Петър', 'Николай', 'Христо', 'Стоян', 'Тодор',
+    'Васил', 'Александър', 'Мария', 'Елена', 'Йорданка', 'Десислава', 'Цветелина',
+    'Гергана', 'Радослав', 'Емил', 'Калин', 'Борислав',
+]
+LAST_NAMES = [
+    'Иванов', 'Георгиев', 'Димитров', 'Петров', 'Николов', 'Христов', 'Стоянов',
+    'Тодоров', 'Ангелов', 'Атанасов', 'Колев', 'Маринов', 'Попов', 'Стефанов',
+    'Илиев', 'Русев', 'Костов', 'Кирилов', 'Митев', 'Танев',
+]
+COMPANY_SUFFIXES = ['ЕООД', 'ООД', 'ЕТ', 'АД']
+COMPANY_WORDS = ['Авто', 'Транс', 'Строй', 'Логистик', 'Мотор', 'Сервиз', 'Трейд', 'Агро']
+CITIES = ['София', 'Пловдив', 'Варна', 'Бургас', 'Русе', 'Стара Загора', 'Плевен', 'Сливен']
+STREETS = ['ул. Васил Левски', 'бул. България', 'ул. Христо Ботев', 'ул. Раковски', 'бул. Цар Освободител']
+
+CAR_MODELS = [
+    'VW GOLF 1.9 TDI', 'VW PASSAT 2.0 TDI', 'OPEL ASTRA 1.6', 'FORD FOCUS 1.8 TDCI',
+    'BMW 320D', 'AUDI A4 2.0 TDI', 'TOYOTA COROLLA 1.4 D-4D', 'RENAULT MEGANE 1.5 DCI',
+    'PEUGEOT 308 1.6 HDI', 'FIAT DUCATO (250) 120 Multijet 2,3 D', 'MERCEDES SPRINTER 313 CDI',
+    'SKODA OCTAVIA 1.9 TDI', 'DACIA LOGAN 1.4', 'CITROEN BERLINGO 1.6 HDI',
+]
+COLORS = ['Бял', 'Черен', 'Сребрист', 'Сив', 'Син', 'Червен', 'Зелен']
+
+# Bulgarian plate region codes and the Latin letters allowed on plates
+PLATE_REGIONS = ['CA', 'CB', 'C', 'PB', 'B', 'BT', 'A', 'PA', 'EH', 'CT', 'X', 'K']
+PLATE_LETTERS = 'ABEKMHOPCTYX'
+VIN_WMI = ['WVW', 'WBA', 'WAU', 'VF1', 'VF3', 'ZFA', 'TMB', 'WDB', 'JTD', 'UU1']
+VIN_CHARS = 'ABCDEFGHJKLMNPRSTUVWXYZ0123456789'
+
+SKLAD_PARTS = [
+    ('Маслен филтър', 'бр.'), ('Въздушен филтър', 'бр.'), ('Горивен филтър', 'бр.'),
+    ('Накладки преден мост', 'к-т'), ('Спирачен диск', 'бр.'), ('Ангренажен ремък', 'бр.'),
+    ('Моторно масло 5W30', 'л'), ('Антифриз', 'л'), ('Свещ запалителна', 'бр.'),
+    ('Амортисьор', 'бр.'), ('Акумулатор 74Ah', 'бр.'), ('Крушка H7', 'бр.'),
+]
+LABOR_ITEMS = ['Труд', 'Диагностика', 'Смяна на масло', 'Ремонт ходова част', 'Реглаж']
+DAY_OFF_REASONS = ['Годишен отпуск', 'Семейни причини', 'Грип', 'Празници', None]
+
+
+def scaled_counts(scale=1.0):
+    """Row counts for the given fraction of SCALE_COUNTS (at least one of each)"""
+    return {name: max(1, int(count * scale)) for name, count in SCALE_COUNTS.items()}
+
+
+def copy_value(field, obj):
+    """Format one field of an unsaved instance for COPY ... FROM STDIN (text format)"""
+    # pre_save fills auto_now/auto_now_add just like bulk_create does
+    value = field.pre_save(obj, True)
+    if value is None:
+        return r'\N'
+    if isinstance(field, models.JSONField):
+        value = json.dumps(value, ensure_ascii=False)
+    elif isinstance(field, models.BooleanField):
+        value = 't' if value else 'f'
+    elif isinstance(value, (date, datetime)):
+        value = value.isoformat()
+    else:
+        value = str(value)
+    return value.replace('\\', '\\\\').replace('\t', '\\t').replace('\n', '\\n').replace('\r', '\\r')
+
+
+def copy_chunk(model, chunk):
+    """Load a chunk of unsaved instances with a single COPY"""
+    fields = [field for field in model._meta.concrete_fields if not field.primary_key]
+    buffer = io.StringIO()
+    for obj in chunk:
+        buffer.write('\t'.join(copy_value(field, obj) for field in fields))
+        buffer.write('\n')
+    buffer.seek(0)
+
+    columns = ', '.join(connection.ops.quote_name(field.column) for field in fields)
+    table = connection.ops.quote_name(model._meta.db_table)
+    with connection.cursor() as cursor:
+        cursor.copy_expert(f'COPY {table} ({columns}) FROM STDIN', buffer)
+
+
+def bulk_insert(model, rows, chunk_size=CHUNK_SIZE, use_copy=None):
+    """
+    Insert an iterable of unsaved instances in chunks, committing each chunk,
+    so memory stays bounded by one chunk. Uses COPY on Postgres unless
+    use_copy is False. Returns the number of inserted rows.
+    """
+    if use_copy is None:
+        use_copy = connection.vendor == 'postgresql'
+    rows = iter(rows)
+    inserted = 0
+    while True:
+        chunk = list(islice(rows, chunk_size))
+        if not chunk:
+            return inserted
+        with transaction.atomic():
+            if use_copy:
+                copy_chunk(model, chunk)
+            else:
+                model.objects.bulk_create(chunk, batch_size=chunk_size)
+        inserted += len(chunk)
+
+
+def max_id(model):
+    """Highest primary key of a model (0 for an empty table)"""
+    return model.objects.aggregate(Max('id'))['id__max'] or 0
+
+
+def random_person_name(rng):
+    return f'{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}'
+
+
+def random_company_name(rng):
+    return f'{rng.choice(COMPANY_WORDS)} {rng.choice(COMPANY_WORDS)}{rng.choice(["", " 2000", " Груп"])} {rng.choice(COMPANY_SUFFIXES)}'
+
+
+def random_address(rng):
+    return f'гр. {rng.choice(CITIES)}, {rng.choice(STREETS)} {rng.randint(1, 180)}'
+
+
+def random_phone(rng):
+    return f'08{rng.choice("789")}{rng.randint(0, 9999999):07d}'
+
+
+def random_plate(rng):
+    letters = ''.join(rng.choice(PLATE_LETTERS) for _ in range(2))
+    return f'{rng.choice(PLATE_REGIONS)}{rng.randint(1000, 9999)}{letters}'
+
+
+def random_vin(rng):
+    return rng.choice(VIN_WMI) + ''.join(rng.choice(VIN_CHARS) for _ in range(14))
+
+
+def random_price(rng, low=2, high=800):
+    """Log-uniform price: many cheap consumables, few expensive parts"""
+    value = low * (high / low) ** rng.random()
+    return Decimal(str(round(value, 2)))
+
+
+def generate_customers(rng, count, start_number):
+    for i in range(count):
+        is_company = rng.random() < 0.3
+        yield Customer(
+            number=start_number + i,
+            customer_name=random_company_name(rng) if is_company else random_person_name(rng),
+            customer_address_1=random_address(rng),
+            customer_mol=random_person_name(rng) if is_company else None,
+            customer_bulstat=f'{rng.randint(100000000, 999999999)}' if is_company else None,
+            customer_taxno=f'BG{rng.randint(100000000, 999999999)}' if is_company and rng.random() < 0.7 else None,
+            telno=random_phone(rng),
+            active=rng.random() < 0.95,
+            # bulk inserts skip Customer.save(), so the stored flag is set here
+            is_company=is_company,
+        )
+
+
+def generate_cars(rng, count, customer_ids):
+    for _ in range(count):
+        yield Car(
+            customer_id=rng.choice(customer_ids),
+            brand_model=rng.choice(CAR_MODELS),
+            vin=random_vin(rng),
+            plate_number=random_plate(rng),
+            year=rng.randint(1998, 2024),
+            color=rng.choice(COLORS),
+            current_mileage=rng.randint(5_000, 450_000),
+            is_active=rng.random() < 0.97,
+        )
+
+
+def generate_sklad(rng, count, start_index):
+    for i in range(count):
+        name, unit = rng.choice(SKLAD_PARTS)
+        yield Sklad(
+            article_number=f'SC{start_index + i:07d}',
+            name=f'{name} {rng.choice(CAR_MODELS).split()[0]}',
+            unit=unit,
+            quantity=Decimal(rng.randint(-2, 60)),
+            purchase_price=random_price(rng),
+            is_active=rng.random() < 0.9,
+        )
+
+
+def generate_employees(rng, count):
+    today = timezone.localdate()
+    for _ in range(count):
+        yield Employee(
+            first_name=rng.choice(FIRST_NAMES),
+            last_name=rng.choice(LAST_NAMES),
+            hourly_rate=Decimal(rng.randint(8, 25)),
+            hire_date=today - timedelta(days=rng.randint(30, 15 * 365)),
+            is_active=rng.random() < 0.9,
+            annual_leave_days=rng.choice([20, 20, 22, 25]),
+        )
+
+
+def generate_days_off(rng, employee_ids, days):
+    """A few leave periods per employee over the covered period"""
+    first_day = timezone.localdate() - timedelta(days=days // 2)
+    day_off_types = [code for code, _ in DaysOff.DAY_OFF_TYPES]
+    periods = max(1, days // 90)
+    for employee_id in employee_ids:
+        for _ in range(periods):
+            start_date = first_day + timedelta(days=rng.randint(0, days))
+            is_approved = rng.random() < 0.8
+            yield DaysOff(
+                employee_id=employee_id,
+                start_date=start_date,
+                end_date=start_date + timedelta(days=rng.choice([0, 0, 1, 2, 4, 9])),
+                day_off_type=rng.choices(day_off_types, weights=[6, 2, 1, 1, 1])[0],
+                reason=rng.choice(DAY_OFF_REASONS),
+                is_approved=is_approved,
+                approved_by='Управител' if is_approved else None,
+            )
+
+
+def generate_orders(rng, count, start_number, cars, customers, employee_ids, days=3 * 365):
+    """
+    Yield (order, employee_ids) pairs. cars is a list of
+    (car_id, customer_id, brand_model, vin, plate) tuples and customers maps
+    ids to (name, address, phone).
+    """
+    today = timezone.localdate()
+    statuses = ['offer', 'order', 'invoice']
+    for i in range(count):
+        car_id, customer_id, brand_model, vin, plate = rng.choice(cars)
+        name, address, phone = customers[customer_id]
+        order = Order(
+            order_number=str(start_number + i),
+            order_date=today - timedelta(days=rng.randint(0, days)),
+            car_id=car_id,
+            car_brand_model=brand_model,
+            car_vin=vin,
+            car_plate_number=plate,
+            car_mileage=rng.randint(5_000, 450_000),
+            client_id=customer_id,
+            client_name=name,
+            client_address=address,
+            client_phone=phone,
+            status=rng.choices(statuses, weights=[2, 3, 5])[0],
+        )
+        worked = rng.sample(employee_ids, min(len(employee_ids), rng.choice([0, 1, 1, 2])))
+        yield order, worked
+
+
+def generate_order_items(rng, count, order_ids, sklad_items):
+    """
+    Spread about count items over the orders (at least one per order).
+    sklad_items is a list of (sklad_id, article_number, name, unit, price) tuples.
+    """
+    average = max(1, round(count / len(order_ids)))
+    for order_id in order_ids:
+        for _ in range(rng.randint(1, 2 * average - 1)):
+            include_vat = rng.random() < 0.9
+            if rng.random() < 0.25 or not sklad_items:
+                price = random_price(rng, 20, 300)
+                sklad_id, article_number, name, unit = None, None, rng.choice(LABOR_ITEMS), 'час'
+                is_labor = True
+            else:
+                sklad_id, article_number, name, unit, price = rng.choice(sklad_items)
+                is_labor = False
+            yield OrderItem(
+                order_id=order_id,
+                sklad_item_id=sklad_id,
+                article_number=article_number,
+                name=name,
+                unit=unit,
+                purchase_price=price,
+                price_with_vat=(price * Decimal('1.20')).quantize(Decimal('0.01')) if include_vat else price,
+                quantity=Decimal(rng.choice([1, 1, 1, 2, 4, 5])),
+                is_labor=is_labor,
+                include_vat=include_vat,
+            )
+
+
+def generate_invoices(rng, orders):
+    """
+    Yield invoices for orders annotated with subtotal and total_with_vat,
+    numbered YYYY-XXXXXX per year after the existing numbers.
+    """
+    today = timezone.localdate()
+    next_numbers = {}
+    for order in orders:
+        year = order['order_date'].year
+        if year not in next_numbers:
+            last_invoice = Invoice.objects.filter(
+                invoice_number__startswith=f'{year}-'
+            ).order_by('-invoice_number').first()
+            try:
+                next_numbers[year] = int(last_invoice.invoice_number.split('-')[1]) + 1
+            except (AttributeError, ValueError, IndexError):
+                next_numbers[year] = 1
+        invoice_number = f'{year}-{next_numbers[year]:06d}'
+        next_numbers[year] += 1
+
+        due_date = order['order_date'] + timedelta(days=30)
+        if due_date >= today:
+            status = 'sent'
+        else:
+            status = rng.choices(['paid', 'overdue', 'cancelled'], weights=[90, 8, 2])[0]
+        subtotal = order['subtotal'] or Decimal('0')
+        total = order['total_with_vat'] or Decimal('0')
+        yield Invoice(
+            invoice_number=invoice_number,
+            order_id=order['id'],
+            invoice_date=order['order_date'],
+            due_date=due_date,
+            client_name=order['client_name'] or '',
+            client_address=order['client_address'] or '',
+            client_phone=order['client_phone'] or '',
+            car_brand_model=order['car_brand_model'] or '',
+            car_plate_number=order['car_plate_number'] or '',
+            car_vin=order['car_vin'] or '',
+            subtotal=subtotal.quantize(Decimal('0.01')),
+            vat_amount=(total - subtotal).quantize(Decimal('0.01')),
+            total_amount=total.quantize(Decimal('0.01')),
+            status=status,
+        )
+
+
+def generate_import_logs(rng, count, start_index, sklad_items, days=3 * 365):
+    today = timezone.localdate()
+    providers = [code for code, _ in ImportLog.PROVIDER_CHOICES]
+    for i in range(count):
+        provider = rng.choice(providers)
+        invoice_number = f'{rng.randint(1000000000, 9999999999)}'
+        items = rng.sample(sklad_items, min(len(sklad_items), rng.randint(1, 15)))
+        created = rng.randint(0, len(items))
+        yield ImportLog(
+            provider=provider,
+            invoice_date=today - timedelta(days=rng.randint(0, days)),
+            invoice_number=invoice_number,
+            import_identifier=f'{provider}_{invoice_number}_{start_index + i}',
+            file_name=f'{provider}_{invoice_number}.pdf',
+            items_created=created,
+            items_updated=len(items) - created,
+            total_processed=len(items),
+            affected_items=[
+                {'article_number': article_number, 'name': name, 'action': 'created' if n < created else 'updated'}
+                for n, (_, article_number, name, _, _) in enumerate(items)
+            ],
+        )
+
+
+def generate_events(rng, days, customer_ids, employee_ids, per_day=8):
+    """A year of workshop events, spread over working hours around today"""
+    first_day = timezone.localdate() - timedelta(days=days // 2)
+    event_types = [code for code, _ in Event.EVENT_TYPES]
+    # (title, start, end) is unique and COPY cannot skip conflicts, so skip
+    # duplicates up front (including events from an earlier run)
+    seen = set(Event.objects.filter(
+        start_datetime__gte=timezone.make_aware(datetime.combine(first_day, dt_time.min)),
+        start_datetime__lt=timezone.make_aware(datetime.combine(first_day + timedelta(days=days), dt_time.min))
+    ).values_list('title', 'start_datetime', 'end_datetime'))
+    for offset in range(days):
+        day = first_day + timedelta(days=offset)
+        if day.weekday() == 6:
+            continue
+        for slot in range(per_day):
+            start = timezone.make_aware(datetime.combine(day, dt_time(8 + slot, rng.choice([0, 15, 30]))))
+            end = start + timedelta(minutes=rng.choice([30, 45, 60, 90]))
+            title = f'{rng.choice(LABOR_ITEMS)} {random_plate(rng)}'
+            if (title, start, end) in seen:
+                continue
+            seen.add((title, start, end))
+            yield Event(
+                title=title,
+                event_type=rng.choice(event_types),
+                start_datetime=start,
+                end_datetime=end,
+                customer_id=rng.choice(customer_ids) if customer_ids and rng.random() < 0.7 else None,
+                employee_id=rng.choice(employee_ids) if employee_ids else None,
+            )
+
+
+def next_customer_number():
+    """Next free Customer.number"""
+    return (Customer.objects.aggregate(Max('number'))['number__max'] or 0) + 1
+
+
+def next_order_number():
+    """Next free numeric Order.order_number"""
+    numbers = Order.objects.values_list('order_number', flat=True).iterator()
+    return max((int(number) for number in numbers if number.isdigit()), default=0) + 1
+
+
+def seed_scale_data(scale=1.0, seed=42, chunk_size=CHUNK_SIZE, log=None, use_copy=None):
+    """
+    Add a deterministic data set of the given scale to the database.
+    Only id lists and small lookup tuples are kept in memory; every table is
+    streamed from a generator in chunks. Returns the number of rows inserted per model.
+    """
+    from .planner_utils import bump_planner_version
+    from .unit_utils import bump_units_version
+
+    log = log or (lambda message: None)
+    counts = scaled_counts(scale)
+    rng = random.Random(seed)
+    inserted = {}
+
+    def load(name, model, rows):
+        started = time.perf_counter()
+        inserted[name] = bulk_insert(model, rows, chunk_size, use_copy)
+        elapsed = time.perf_counter() - started
+        log(f"{name}: {inserted[name]} rows in {elapsed:.1f} s ({inserted[name] / max(elapsed, 1e-6):.0f} rows/s)")
+
+    first_id = max_id(Customer)
+    load('customers', Customer, generate_customers(rng, counts['customers'], next_customer_number()))
+    customers = {
+        customer_id: (name, address, phone)
+        for customer_id, name, address, phone in Customer.objects.filter(id__gt=first_id).values_list(
+            'id', 'customer_name', 'customer_address_1', 'telno'
+        ).iterator()
+    }
+    customer_ids = list(customers)
+
+    first_id = max_id(Car)
+    load('cars', Car, generate_cars(rng, counts['cars'], customer_ids))
+    cars = list(Car.objects.filter(id__gt=first_id).values_list(
+        'id', 'customer_id', 'brand_model', 'vin', 'plate_number'
+    ).iterator())
+
+    first_id = max_id(Sklad)
+    load('sklad', Sklad, generate_sklad(rng, counts['sklad'], first_id + 1))
+    sklad_items = list(Sklad.objects.filter(id__gt=first_id).values_list(
+        'id', 'article_number', 'name', 'unit', 'purchase_price'
+    ).iterator())
+
+    first_id = max_id(Employee)
+    load('employees', Employee, generate_employees(rng, counts['employees']))
+    employee_ids = list(Employee.objects.filter(id__gt=first_id).values_list('id', flat=True))
+    load('days_off', DaysOff, generate_days_off(rng, employee_ids, counts['event_days']))
+    for employee in Employee.objects.filter(id__gt=first_id):
+        employee.update_leave_usage()
+
+    # Orders and their employee links are generated together; the links are
+    # kept by position and resolved to ids once the orders are loaded
+    first_id = max_id(Order)
+    order_employees = []
+
+    def orders():
+        for order, worked in generate_orders(
+            rng, counts['orders'], next_order_number(), cars, customers, employee_ids
+        ):
+            order_employees.append(worked)
+            yield order
+
+    load('orders', Order, orders())
+    order_ids = list(Order.objects.filter(id__gt=first_id).order_by('id').values_list('id', flat=True))
+    Through = Order.employees.through
+    load('order_employees', Through, (
+        Through(order_id=order_id, employee_id=employee_id)
+        for order_id, worked in zip(order_ids, order_employees)
+        for employee_id in worked
+    ))
+    del order_employees
+
+    load('order_items', OrderItem, generate_order_items(rng, counts['order_items'], order_ids, sklad_items))
+
+    line_total = ExpressionWrapper(
+        F('order_items__purchase_price') * F('order_items__quantity'),
+        output_field=DecimalField(max_digits=14, decimal_places=4)
+    )
+    line_total_with_vat = ExpressionWrapper(
+        F('order_items__price_with_vat') * F('order_items__quantity'),
+        output_field=DecimalField(max_digits=14, decimal_places=4)
+    )
+    invoiced_orders = Order.objects.filter(id__gt=first_id, status='invoice').order_by('id').values(
+        'id', 'order_date', 'client_name', 'client_address', 'client_phone',
+        'car_brand_model', 'car_plate_number', 'car_vin'
+    ).annotate(subtotal=Sum(line_total), total_with_vat=Sum(line_total_with_vat))
+    load('invoices', Invoice, generate_invoices(rng, invoiced_orders.iterator(chunk_size=chunk_size)))
+
+    load('import_logs', ImportLog, generate_import_logs(rng, counts['import_logs'], max_id(ImportLog) + 1, sklad_items))
+
+    load('events', Event, generate_events(rng, counts['event_days'], customer_ids, employee_ids))
+
+    # Bulk loads send no signals, so invalidate the cached payloads here
+    bump_planner_version()
+    bump_units_version()
+    return inserted
@@ -0,0 +1,134 @@
+"""
+Search filter utilities
+Filters shared by the list pages, their AJAX search endpoints and the
+exports, so an export contains exactly the rows the page shows
+"""
+
+from datetime import datetime
+
+from django.db.models import Q
+
+
+# Searching VINs only from this many characters avoids matching most cars on short terms
+MIN_VIN_SEARCH_LENGTH = 5
+
+
+def get_param(params, name):
+    return (params.get(name) or '').strip()
+
+
+def parse_date_param(value):
+    """YYYY-MM-DD from a date input, None when empty or invalid"""
+    try:
+        return datetime.strptime(value, '%Y-%m-%d').date()
+    except ValueError:
+        return None
+
+
+def filter_customers(customers, params):
+    """search (name, plate, VIN from 5 characters), customer_type (company/individual) and active_only"""
+    search_query = get_param(params, 'search')
+    customer_type = get_param(params, 'customer_type')
+
+    if get_param(params, 'active_only'):
+        customers = customers.filter(active=True)
+
+    if customer_type == 'company':
+        customers = customers.filter(is_company=True)
+    elif customer_type == 'individual':
+        customers = customers.filter(is_company=False)
+
+    if search_query:
+        search_conditions = Q(customer_name__icontains=search_query)
+        search_conditions |= Q(cars__plate_number__icontains=search_query)
+        if len(search_query) >= MIN_VIN_SEARCH_LENGTH:
+            search_conditions |= Q(cars__vin__icontains=search_query)
+        customers = customers.filter(search_conditions).distinct()
+
+    return customers
+
+
+def filter_orders(orders, params):
+    """search (number, client, car, notes, VIN from 5 characters), status, date_from and date_to"""
+    search_query = get_param(params, 'search')
+    status_filter = get_param(params, 'status')
+
+    if search_query:
+        search_conditions = (
+            Q(order_number__icontains=search_query) |
+            Q(client_name__icontains=search_query) |
+            Q(client__customer_name__icontains=search_query) |
+            Q(car_brand_model__icontains=search_query) |
+            Q(car__brand_model__icontains=search_query) |
+            Q(car_plate_number__icontains=search_query) |
+            Q(notes__icontains=search_query)
+        )
+        if len(search_query) >= MIN_VIN_SEARCH_LENGTH:
+            search_conditions |= Q(car_vin__icontains=search_query)
+        orders = orders.filter(search_conditions)
+
+    if status_filter:
+        orders = orders.filter(status=status_filter)
+
+    date_from = parse_date_param(get_param(params, 'date_from'))
+    if date_from:
+        orders = orders.filter(order_date__gte=date_from)
+
+    date_to = parse_date_param(get_param(params, 'date_to'))
+    if date_to:
+        orders = orders.filter(order_date__lte=date_to)
+
+    return orders
+
+
+def filter_invoices(invoices, params):
+    """search (number, client, car, notes, VIN from 5 characters), status, date_from and date_to"""
+    search_query = get_param(params, 'search')
+    status_filter = get_param(params, 'status')
+
+    if search_query:
+        search_conditions = (
+            Q(invoice_number__icontains=search_query) |
+            Q(client_name__icontains=search_query) |
+            Q(car_brand_model__icontains=search_query) |
+            Q(car_plate_number__icontains=search_query) |
+            Q(notes__icontains=search_query)
+        )
+        if len(search_query) >= MIN_VIN_SEARCH_LENGTH:
+            search_conditions |= Q(car_vin__icontains=search_query)
+        invoices = invoices.filter(search_conditions)
+
+    if status_filter:
+        invoices = invoices.filter(status=status_filter)
+
+    date_from = parse_date_param(get_param(params, 'date_from'))
+    if date_from:
+        invoices = invoices.filter(invoice_date__gte=date_from)
+
+    date_to = parse_date_param(get_param(params, 'date_to'))
+    if date_to:
+        invoices = invoices.filter(invoice_date__lte=date_to)
+
+    return invoices
+
+
+def filter_sklad(items, search_form):
+    """search (article number, name), active_only and unit_filter from a bound SkladSearchForm"""
+    if not search_form.is_valid():
+        return items
+
+    search_query = search_form.cleaned_data.get('search')
+    if search_query:
+        items = items.filter(
+            Q(article_number__icontains=search_query) |
+            Q(name__icontains=search_query)
+        ).distinct()
+
+    if search_form.cleaned_data.get('active_only'):
+        items = items.filter(is_active=True)
+
+    unit_filter = search_form.cleaned_data.get('unit_filter')
+    if unit_filter:
+        items = items.filter(unit=unit_filter)
+
+    return items
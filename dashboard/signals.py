@@ -1,17 +1,163 @@
-from django.db.models.signals import post_save, post_delete
+from datetime import date
+
+from django.db.models import F
+from django.db.models.signals import m2m_changed, pre_save, post_save, post_delete
 from django.dispatch import receiver
-from .models import DaysOff
+from .models import Car, Customer, DaysOff, Employee, Event, ExchangeRate, Invoice, Order, OrderItem, Sklad
+from .conditional_utils import bump_model_version
+from .currency_utils import bump_exchange_rates_version
+from .planner_utils import bump_planner_version
+from .sales_rollup_utils import mark_days_stale
+from .unit_utils import bump_units_version
+
+
+def counted_leave_days(employee_id, day_off_type, is_approved, start_date, end_date):
+    """Days a leave period contributes to the employee's current year leave usage"""
+    if not employee_id or not is_approved or day_off_type != 'vacation':
+        return 0
+    if start_date.year != date.today().year:
+        return 0
+    return (end_date - start_date).days + 1
+
+
+def apply_leave_deltas(deltas):
+    """
+    Apply per-employee leave usage changes with in-place UPDATEs.
+    A counter from another year (the first change after 1 January) is recounted
+    for the current year instead, the saved day off is already part of that count.
+    """
+    year = date.today().year
+    for employee_id, delta in deltas.items():
+        if not delta:
+            continue
+        updated = Employee.objects.filter(pk=employee_id, leave_usage_year=year).update(
+            current_year_leave_used=F('current_year_leave_used') + delta
+        )
+        if not updated:
+            employee = Employee.objects.filter(pk=employee_id).first()
+            if employee:
+                Employee.objects.filter(pk=employee_id).update(
+                    current_year_leave_used=employee.calculate_leave_usage(year),
+                    leave_usage_year=year
+                )
+
+
+@receiver(pre_save, sender=DaysOff)
+def remember_previous_leave(sender, instance, **kwargs):
+    """Keep the stored state of an edited day off so post_save can apply a delta"""
+    instance._previous_leave = None
+    if instance.pk:
+        instance._previous_leave = DaysOff.objects.filter(pk=instance.pk).values(
+            'employee_id', 'day_off_type', 'is_approved', 'start_date', 'end_date'
+        ).first()
 
 
 @receiver(post_save, sender=DaysOff)
 def update_employee_leave_usage(sender, instance, created, **kwargs):
-    """Update employee leave usage when days off are saved"""
-    if instance.is_approved and instance.day_off_type == 'vacation':
-        instance.employee.update_leave_usage()
+    """Update employee leave usage incrementally when days off are saved"""
+    deltas = {}
+    previous = getattr(instance, '_previous_leave', None)
+    if previous:
+        deltas[previous['employee_id']] = -counted_leave_days(**previous)
+    deltas[instance.employee_id] = deltas.get(instance.employee_id, 0) + counted_leave_days(
+        instance.employee_id, instance.day_off_type, instance.is_approved,
+        instance.start_date, instance.end_date
+    )
+    apply_leave_deltas(deltas)
 
 
 @receiver(post_delete, sender=DaysOff)
 def update_employee_leave_usage_on_delete(sender, instance, **kwargs):
-    """Update employee leave usage when days off are deleted"""
-    if instance.is_approved and instance.day_off_type == 'vacation':
-        instance.employee.update_leave_usage()
+    """Update employee leave usage incrementally when days off are deleted"""
+    apply_leave_deltas({
+        instance.employee_id: -counted_leave_days(
+            instance.employee_id, instance.day_off_type, instance.is_approved,
+            instance.start_date, instance.end_date
+        )
+    })
+
+
+@receiver(post_save, sender=Event)
+@receiver(post_save, sender=Employee)
+@receiver(post_delete, sender=Event)
+@receiver(post_save, sender=DaysOff)
+@receiver(post_delete, sender=DaysOff)
+@receiver(post_save, sender=Customer)
+@receiver(post_delete, sender=Customer)
+def invalidate_planner_cache(sender, **kwargs):
+    """
+    Bump the planner version so cached week payloads are rebuilt
+    (they include the customer name; deleting a customer clears Event.customer
+    with SET_NULL, which sends no Event signals)
+    """
+    bump_planner_version()
+
+
+@receiver(post_save, sender=Sklad)
+@receiver(post_delete, sender=Sklad)
+def invalidate_unit_vocabulary(sender, **kwargs):
+    """Bump the units version so every process reloads the unit vocabulary"""
+    bump_units_version()
+
+
+@receiver(post_save, sender=Customer)
+@receiver(post_delete, sender=Customer)
+@receiver(post_save, sender=Car)
+@receiver(post_delete, sender=Car)
+@receiver(post_save, sender=Order)
+@receiver(post_delete, sender=Order)
+@receiver(post_save, sender=OrderItem)
+@receiver(post_delete, sender=OrderItem)
+@receiver(post_save, sender=Invoice)
+@receiver(post_delete, sender=Invoice)
+@receiver(post_save, sender=Sklad)
+@receiver(post_delete, sender=Sklad)
+def invalidate_conditional_get(sender, **kwargs):
+    """Bump the model change counter so ETags of endpoints reading it change"""
+    bump_model_version(sender)
+
+
+@receiver(post_save, sender=ExchangeRate)
+@receiver(post_delete, sender=ExchangeRate)
+def invalidate_exchange_rates(sender, **kwargs):
+    """Bump the rates version so every process reloads the rate table"""
+    bump_exchange_rates_version()
+
+
+@receiver(pre_save, sender=Order)
+def remember_previous_order_date(sender, instance, **kwargs):
+    """Keep the stored order date of an edited order so post_save can detect a move"""
+    instance._previous_order_date = None
+    if instance.pk:
+        instance._previous_order_date = Order.objects.filter(pk=instance.pk).values_list(
+            'order_date', flat=True
+        ).first()
+
+
+@receiver(post_save, sender=Order)
+def mark_sales_day_of_moved_order(sender, instance, **kwargs):
+    """The day an order moved away from has to be rebuilt, its remaining rows are unchanged"""
+    previous = getattr(instance, '_previous_order_date', None)
+    if previous and previous != instance.order_date:
+        mark_days_stale([previous])
+
+
+@receiver(post_delete, sender=Order)
+def mark_sales_day_of_deleted_order(sender, instance, **kwargs):
+    mark_days_stale([instance.order_date])
+
+
+@receiver(post_delete, sender=OrderItem)
+def mark_sales_day_of_deleted_item(sender, instance, **kwargs):
+    mark_days_stale(Order.objects.filter(pk=instance.order_id).values_list('order_date', flat=True))
+
+
+@receiver(m2m_changed, sender=Order.employees.through)
+def mark_sales_days_of_employee_changes(sender, instance, action, reverse, pk_set, **kwargs):
+    """Employee assignments do not touch Order.updated_at"""
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    if not reverse:
+        mark_days_stale([instance.order_date])
+    elif pk_set:
+        mark_days_stale(Order.objects.filter(pk__in=pk_set).values_list('order_date', flat=True))
@@ -0,0 +1,89 @@
+/**
+ * Compact table rendering for the AJAX search endpoints (format=json)
+ * The endpoints return {columns, rows, page, stats}; each page supplies a
+ * renderRow(record, index) function that mirrors its *_table.html template.
+ * Usage: CompactTable.render(data, tbody, renderRow, emptyHtml)
+ */
+const CompactTable = {
+    escape(value) {
+        if (value === null || value === undefined) {
+            return '';
+        }
+        return String(value)
+            .replace(/&/g, '&amp;')
+            .replace(/</g, '&lt;')
+            .replace(/>/g, '&gt;')
+            .replace(/"/g, '&quot;')
+            .replace(/'/g, '&#x27;');
+    },
+
+    truncate(value, length) {
+        // Same as the |truncatechars filter
+        value = value || '';
+        return value.length > length ? value.slice(0, length - 1) + '…' : value;
+    },
+
+    zip(columns, row) {
+        const record = {};
+        columns.forEach((column, i) => {
+            record[column] = row[i];
+        });
+        return record;
+    },
+
+    records(data) {
+        return data.rows.map(row => this.zip(data.columns, row));
+    },
+
+    render(data, tbody, renderRow, emptyHtml) {
+        const records = this.records(data);
+        tbody.innerHTML = records.length
+            ? records.map((record, i) => renderRow(record, data.page.start_index + i)).join('')
+            : emptyHtml;
+    },
+
+    /**
+     * Pagination markup matching the *_pagination.html templates.
+     * options: params (URLSearchParams of the active filters), labels ({first, previous, next, last}),
+     * pageOf (single "Страница N от M" item instead of page numbers), listClass and ariaLabel
+     * (wrap the items in <nav><ul>, omitted when listClass is not given)
+     */
+    pagination(page, options = {}) {
+        if (page.num_pages <= 1) {
+            return '';
+        }
+        const labels = options.labels || {
+            first: '<i class="fas fa-angle-double-left"></i>',
+            previous: '<i class="fas fa-angle-left"></i>',
+            next: '<i class="fas fa-angle-right"></i>',
+            last: '<i class="fas fa-angle-double-right"></i>'
+        };
+        const query = options.params && options.params.toString();
+        const link = (number, content) =>
+            `<li class="page-item"><a class="page-link" href="?page=${number}${query ? '&' + this.escape(query) : ''}">${content}</a></li>`;
+
+        let items = '';
+        if (page.number > 1) {
+            items += link(1, labels.first) + link(page.number - 1, labels.previous);
+        }
+        if (options.pageOf) {
+            items += `<li class="page-item active"><span class="page-link">Страница ${page.number} от ${page.num_pages}</span></li>`;
+        } else {
+            const first = Math.max(1, page.number - 2);
+            const last = Math.min(page.num_pages, page.number + 2);
+            for (let number = first; number <= last; number++) {
+                items += number === page.number
+                    ? `<li class="page-item active"><span class="page-link">${number}</span></li>`
+                    : link(number, number);
+            }
+        }
+        if (page.number < page.num_pages) {
+            items += link(page.number + 1, labels.next) + link(page.num_pages, labels.last);
+        }
+
+        if (!options.listClass) {
+            return items;
+        }
+        return `<nav aria-label="${options.ariaLabel || 'Page navigation'}"><ul class="${options.listClass}">${items}</ul></nav>`;
+    }
+};
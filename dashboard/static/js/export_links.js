@@ -0,0 +1,15 @@
+/**
+ * Export links that follow the current search filters
+ * Markup: <a data-export-url="/klienti/export/" data-export-format="xlsx">
+ * Usage: ExportLinks.update(params) with the URLSearchParams sent to the search endpoint
+ */
+const ExportLinks = {
+    update(params) {
+        document.querySelectorAll('[data-export-url]').forEach(link => {
+            const query = new URLSearchParams(params);
+            query.delete('page');
+            query.set('format', link.dataset.exportFormat || 'csv');
+            link.href = `${link.dataset.exportUrl}?${query.toString()}`;
+        });
+    }
+};
@@ -0,0 +1,131 @@
+"""
+Table JSON utilities
+Compact rows (column list plus row tuples) for the AJAX search endpoints,
+requested with format=json and rendered client-side by static/js/compact_table.js
+"""
+
+from django.http import JsonResponse
+from django.template.defaultfilters import floatformat
+from django.utils.text import Truncator
+
+from .templatetags.sklad_filters import smart_quantity
+
+
+CUSTOMER_COLUMNS = [
+    'id', 'customer_name', 'address', 'telno', 'is_company', 'supplier', 'cars_count', 'preview_cars'
+]
+# Columns of the nested preview_cars tuples
+CUSTOMER_CAR_COLUMNS = ['id', 'plate_number', 'brand_model', 'year', 'color', 'vin', 'is_active']
+
+ORDER_COLUMNS = [
+    'id', 'order_number', 'order_date', 'client_name', 'client_phone',
+    'car_brand_model', 'car_plate_number', 'status', 'status_display', 'total_with_vat', 'is_archived'
+]
+
+INVOICE_COLUMNS = [
+    'id', 'order_id', 'invoice_number', 'invoice_date', 'due_date', 'client_name', 'client_phone',
+    'car_brand_model', 'car_plate_number', 'status', 'status_display', 'due_flag', 'total_amount'
+]
+
+SKLAD_COLUMNS = [
+    'id', 'article_number', 'name', 'unit', 'quantity', 'purchase_price', 'total_value', 'is_active'
+]
+
+
+def wants_compact_json(request):
+    """Whether the client asked for compact rows instead of rendered HTML"""
+    return request.GET.get('format') == 'json'
+
+
+def format_date(value):
+    """Same output as the |date:"d.m.Y" filter used by the table templates"""
+    return value.strftime('%d.%m.%Y') if value else ''
+
+
+def customer_row(customer):
+    """Row for a customer annotated by customer_utils.with_car_preview"""
+    return [
+        customer.id,
+        customer.customer_name,
+        Truncator(customer.full_address).chars(30),
+        customer.telno or '',
+        customer.is_company,
+        customer.supplier,
+        customer.cars_count,
+        [
+            [car.id, car.plate_number or '', car.brand_model or '', car.year, car.color or '', car.vin or '', car.is_active]
+            for car in customer.preview_cars
+        ],
+    ]
+
+
+def order_row(order):
+    """Row for an order with prefetched order_items"""
+    return [
+        order.id,
+        order.order_number,
+        format_date(order.order_date),
+        order.client_name or '',
+        order.client_phone or '',
+        order.car_brand_model or '',
+        order.car_plate_number or '',
+        order.status,
+        order.get_status_display(),
+        floatformat(order.total_with_vat, 2),
+        order.is_archived,
+    ]
+
+
+def invoice_row(invoice):
+    """Row for an invoice, due_flag is 'overdue', 'soon' or ''"""
+    due_flag = ''
+    if invoice.status != 'paid':
+        if invoice.is_overdue:
+            due_flag = 'overdue'
+        elif 0 < invoice.days_until_due <= 7:
+            due_flag = 'soon'
+    return [
+        invoice.id,
+        invoice.order_id,
+        invoice.invoice_number,
+        format_date(invoice.invoice_date),
+        format_date(invoice.due_date),
+        invoice.client_name or '',
+        invoice.client_phone or '',
+        invoice.car_brand_model or '',
+        invoice.car_plate_number or '',
+        invoice.status,
+        invoice.get_status_display(),
+        due_flag,
+        floatformat(invoice.total_amount, 2),
+    ]
+
+
+def sklad_row(item):
+    """Row for a warehouse item"""
+    return [
+        item.id,
+        item.article_number,
+        item.name,
+        item.unit,
+        smart_quantity(item.quantity),
+        floatformat(item.purchase_price, 2),
+        floatformat(item.total_value, 2),
+        item.is_active,
+    ]
+
+
+def compact_table_response(page_obj, columns, row_func, stats, **extra):
+    """JSON response with the page rows as tuples plus the pagination state"""
+    payload = {
+        'columns': columns,
+        'rows': [row_func(obj) for obj in page_obj],
+        'page': {
+            'number': page_obj.number,
+            'num_pages': page_obj.paginator.num_pages,
+            'start_index': page_obj.start_index(),
+        },
+        'stats': stats,
+    }
+    payload.update(extra)
+    return JsonResponse(payload)
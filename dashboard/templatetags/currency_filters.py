@@ -4,7 +4,7 @@ Template filters for currency formatting
 
 from django import template
 from django.utils.safestring import mark_safe
-from ..currency_utils import format_dual_currency, format_currency_table, get_currency_info
+from ..currency_utils import format_dual_currency, format_currency_table, get_currency_info, get_currency_context
 
 register = template.Library()
 
@@ -20,6 +20,17 @@ def dual_currency(value, show_eur=True):
     return format_dual_currency(value, show_eur)
 
 
+@register.filter
+def dual_currency_on(value, day):
+    """
+    Format value in both BGN and EUR with the rate valid on a date
+    Usage: {{ value|dual_currency_on:invoice_date }}
+    """
+    if value is None:
+        return "0.00 лв."
+    return format_dual_currency(value, True, day)
+
+
 @register.filter
 def currency_bgn(value):
     """
@@ -39,8 +50,7 @@ def currency_eur(value):
     """
     if value is None:
         return "0.00 €"
-    from ..currency_utils import bgn_to_eur
-    eur_value = bgn_to_eur(value)
+    eur_value = get_currency_context().to_eur(value)
     return f"{eur_value:.2f} €"
 
 
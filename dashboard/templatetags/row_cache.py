@@ -0,0 +1,49 @@
+"""
+Template tags for per-row fragment caching in the list tables
+Usage:
+    {% load row_cache %}
+    {% row_cache_lookup orders 'order' as cached_rows %}
+    {% for order in orders %}
+        {% cached_row cached_rows order %}...{% endcached_row %}
+    {% endfor %}
+"""
+
+from django import template
+from django.utils.safestring import mark_safe
+
+from ..row_cache_utils import RowCache
+
+register = template.Library()
+
+
+@register.simple_tag
+def row_cache_lookup(objects, prefix):
+    """Fetch the cached rows of a table page in one get_many"""
+    return RowCache(list(objects), prefix)
+
+
+class CachedRowNode(template.Node):
+    def __init__(self, nodelist, row_cache, obj):
+        self.nodelist = nodelist
+        self.row_cache = row_cache
+        self.obj = obj
+
+    def render(self, context):
+        row_cache = self.row_cache.resolve(context)
+        obj = self.obj.resolve(context)
+        key, html = row_cache.get(obj)
+        if html is None:
+            html = self.nodelist.render(context)
+            row_cache.set(key, html)
+        return mark_safe(html)
+
+
+@register.tag
+def cached_row(parser, token):
+    """Render the enclosed row markup from the cache, or render and cache it on a miss"""
+    bits = token.split_contents()
+    if len(bits) != 3:
+        raise template.TemplateSyntaxError(f"'{bits[0]}' takes a row cache and an object")
+    nodelist = parser.parse(('endcached_row',))
+    parser.delete_first_token()
+    return CachedRowNode(nodelist, parser.compile_filter(bits[1]), parser.compile_filter(bits[2]))
@@ -0,0 +1,147 @@
+import csv
+import json
+import os
+import tempfile
+from datetime import timedelta
+from io import StringIO
+
+import pandas as pd
+from django.conf import settings
+from django.core.management import call_command
+from django.db import connection
+from django.test import SimpleTestCase, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from .conditional_utils import version_snapshot
+from .customer_import_utils import (
+    IMPORT_FIELDS, customer_frame, customer_values, detect_encoding, frame_rows, too_long_field
+)
+from .forms import OrderItemForm
+from .models import Customer, Event, Sklad
+from .planner_utils import get_week_json
+
+
+# Stands in for `mdb-export inv97_be.mdb Customer`: companies by BULSTAT, MOL or
+# ДДС номер only, an individual with BULSTAT 0, NULLs, a row without a Number,
+# a too long BULSTAT and a repeated Number 2 (the later row wins)
+MDB_FIXTURE = os.path.join('dashboard', 'fixtures', 'mdb_customer_export.csv')
+
+
+class MigrateClientsFromMdbTests(TestCase):
+
+    def migrate(self):
+        out = StringIO()
+        call_command('migrate_clients_from_mdb', csv_file=MDB_FIXTURE, stdout=out)
+        return out.getvalue()
+
+    def test_import_counts(self):
+        output = self.migrate()
+        self.assertIn('Created: 6', output)
+        self.assertIn('Updated: 0', output)
+        self.assertIn('Skipped: 3 (invalid rows: 2, repeated numbers: 1)', output)
+        self.assertEqual(Customer.objects.count(), 6)
+
+        output = self.migrate()
+        self.assertIn('Created: 0', output)
+        self.assertIn('Unchanged: 6', output)
+
+        Customer.objects.filter(number=7).update(customer_name='Друго име')
+        output = self.migrate()
+        self.assertIn('Updated: 1', output)
+        self.assertIn('Unchanged: 5', output)
+        self.assertEqual(Customer.objects.get(number=7).customer_name, 'Стефан Николов')
+
+    def test_classification_and_values(self):
+        self.migrate()
+        customers = {customer.number: customer for customer in Customer.objects.all()}
+        self.assertEqual(sorted(customers), [1, 2, 3, 4, 5, 7])
+
+        companies = {number for number, customer in customers.items() if customer.is_company}
+        self.assertEqual(companies, {1, 3, 5})
+        for customer in customers.values():
+            self.assertEqual(customer.is_company, customer.has_company_data)
+
+        # BULSTAT 0 and NULL do not make a company, and are stored empty
+        self.assertEqual(customers[2].customer_bulstat, '')
+        self.assertEqual(customers[4].customer_mol, '')
+        # The repeated Number 2 keeps the later row
+        self.assertEqual(customers[2].customer_address_1, 'гр. Пловдив, ж.к. Тракия')
+        self.assertEqual(customers[1].customer_address_1, 'гр. София, ул. "Витоша" 10')
+        # '0' / '1' flags
+        self.assertTrue(customers[3].supplier)
+        self.assertFalse(customers[1].supplier)
+        self.assertFalse(customers[4].active)
+        self.assertTrue(customers[7].active)
+        # New customers get temp_id = number
+        self.assertEqual(customers[5].temp_id, 5)
+
+
+class CustomerFrameTests(SimpleTestCase):
+
+    def row_wise(self, path):
+        """customer_values over csv.DictReader, as import_customers_from_csv reads the file"""
+        rows = []
+        with open(path, encoding='utf-8', newline='') as f:
+            for record in csv.DictReader(f):
+                values = customer_values(record)
+                if values is not None and too_long_field(values) is None:
+                    rows.append(values)
+        return rows
+
+    def test_frame_matches_customer_values(self):
+        path = os.path.join(settings.BASE_DIR, MDB_FIXTURE)
+        frame, skipped = customer_frame(pd.read_csv(path, dtype=str, keep_default_na=False))
+
+        self.assertEqual(list(frame.columns), list(IMPORT_FIELDS))
+        self.assertEqual(list(frame_rows(frame)), self.row_wise(path))
+        self.assertEqual(skipped, 2)
+
+    def test_detect_encoding_checks_the_whole_file(self):
+        header = 'Number,Customer-Name\r\n'
+        ascii_rows = ''.join(f'{i},Client {i}\r\n' for i in range(10000))
+        with tempfile.NamedTemporaryFile(suffix='.csv', delete=False) as f:
+            f.write((header + ascii_rows + '10001,Иван Петров\r\n').encode('windows-1251'))
+        self.addCleanup(os.remove, f.name)
+        self.assertGreater(os.path.getsize(f.name), 64 * 1024)
+        self.assertEqual(detect_encoding(f.name), 'windows-1251')
+
+        with open(f.name, 'wb') as utf8:
+            utf8.write((header + ascii_rows + '10001,Иван Петров\r\n').encode('utf-8'))
+        self.assertEqual(detect_encoding(f.name), 'utf-8-sig')
+
+
+class VersionSnapshotTests(TestCase):
+
+    def version_queries(self, queries):
+        return [query for query in queries if 'dashboard_version_cache' in query['sql']]
+
+    def test_formset_reads_the_units_version_once(self):
+        OrderItemForm()  # load the unit vocabulary
+        with version_snapshot(), CaptureQueriesContext(connection) as queries:
+            for _ in range(20):
+                OrderItemForm()
+        self.assertEqual(len(self.version_queries(queries.captured_queries)), 1)
+
+    def test_bump_inside_the_request_is_seen(self):
+        with version_snapshot():
+            self.assertEqual(OrderItemForm().fields['unit'].choices, [('', 'Избери мерна единица')])
+            Sklad.objects.create(name='Масло', unit='л.', quantity=1, purchase_price=10)
+            self.assertIn(('л.', 'л.'), OrderItemForm().fields['unit'].choices)
+
+
+class PlannerCustomerTests(TestCase):
+
+    def test_customer_changes_rebuild_the_week(self):
+        customer = Customer.objects.create(number=1, customer_name='Иван Петров')
+        start = timezone.now()
+        Event.objects.create(title='Смяна на масло', start_datetime=start,
+                             end_datetime=start + timedelta(hours=1), customer=customer)
+        self.assertIn(json.dumps('Иван Петров'), get_week_json())
+
+        customer.customer_name = 'Иван Георгиев'
+        customer.save()
+        self.assertIn(json.dumps('Иван Георгиев'), get_week_json())
+
+        customer.delete()
+        self.assertNotIn(json.dumps('Иван Георгиев'), get_week_json())
@@ -0,0 +1,54 @@
+"""
+Unit vocabulary for sklad and order items
+Keeps the distinct units in a per-process copy that is reloaded when the units
+version in the shared version cache changes (bumped on Sklad changes)
+"""
+
+from .conditional_utils import bump_version, get_version
+from .models import Sklad
+
+
+UNITS_VERSION_KEY = 'sklad_units_version'
+
+# Per-process copy of the vocabulary: {'version': ..., 'all': [...], 'active': [...]}
+_units = {}
+
+
+def get_units_version():
+    """Get the current units version"""
+    return get_version(UNITS_VERSION_KEY)
+
+
+def bump_units_version():
+    """Invalidate the unit vocabulary in every process (called on Sklad changes)"""
+    bump_version(UNITS_VERSION_KEY)
+
+
+def _load_units():
+    """Load all and active units with a single DISTINCT query"""
+    all_units = set()
+    active_units = set()
+    for unit, is_active in Sklad.objects.values_list('unit', 'is_active').distinct():
+        if not unit:
+            continue
+        all_units.add(unit)
+        if is_active:
+            active_units.add(unit)
+    return sorted(all_units), sorted(active_units)
+
+
+def get_units(active_only=False):
+    """
+    Return the sorted distinct sklad units.
+    The database is only queried when the vocabulary changed since the last call.
+    """
+    version = get_units_version()
+    if _units.get('version') != version:
+        all_units, active_units = _load_units()
+        _units.update({'version': version, 'all': all_units, 'active': active_units})
+    return list(_units['active'] if active_only else _units['all'])
+
+
+def get_unit_choices(empty_label):
+    """Unit choices for a select, starting with an empty option"""
+    return [('', empty_label)] + [(unit, unit) for unit in get_units()]
@@ -8,11 +8,15 @@ urlpatterns = [
     path('klienti/', views.klienti, name='klienti'),
     path('klienti/nov/', views.customer_create, name='customer_create'),
     path('klienti/get-next-number/', views.get_next_customer_number, name='get_next_customer_number'),
+    path('klienti/export/', views.customer_export, name='customer_export'),
     path('klienti/search-ajax/', views.customer_search_ajax, name='customer_search_ajax'),
     path('pregled-poruchki/search-ajax/', views.order_search_ajax, name='order_search_ajax'),
+    path('pregled-poruchki/export/', views.order_export, name='order_export'),
+    path('fakturi/export/', views.invoice_export, name='invoice_export'),
     path('fakturi/search-ajax/', views.invoice_search_ajax, name='invoice_search_ajax'),
     path('fakturi/<int:pk>/', views.invoice_detail, name='invoice_detail'),
     path('klienti/<int:pk>/', views.customer_detail, name='customer_detail'),
+    path('klienti/<int:pk>/cars-summary/', views.customer_cars_summary, name='customer_cars_summary'),
     path('klienti/<int:pk>/edit/', views.customer_edit, name='customer_edit'),
     path('klienti/<int:pk>/delete/', views.customer_delete, name='customer_delete'),
     path('koli/<int:car_id>/poruchki/', views.car_orders, name='car_orders'),
@@ -71,13 +75,17 @@ urlpatterns = [
     path('sklad/<int:pk>/', views.sklad_detail, name='sklad_detail'),
     path('sklad/<int:pk>/edit/', views.sklad_edit, name='sklad_edit'),
     path('sklad/<int:pk>/delete/', views.sklad_delete, name='sklad_delete'),
+    path('sklad/export/', views.sklad_export, name='sklad_export'),
     path('sklad/autocomplete/', views.sklad_autocomplete, name='sklad_autocomplete'),
     path('sklad/import/', views.sklad_import, name='sklad_import'),
     path('sklad/import-stats/', views.sklad_import_stats, name='sklad_import_stats'),
     path('sklad/import-detail/<int:import_id>/', views.sklad_import_detail, name='sklad_import_detail'),
     path('sklad/import-delete/<int:import_id>/', views.sklad_import_delete, name='sklad_import_delete'),
     path('sklad/import-bulk-delete/', views.sklad_import_bulk_delete, name='sklad_import_bulk_delete'),
+    path('otcheti/', views.reports, name='reports'),
     path('get-weekly-planner/', views.get_weekly_planner, name='get_weekly_planner'),
+    path('get-planner-range/', views.get_planner_range, name='get_planner_range'),
+    path('get-planner-conflicts/', views.get_planner_conflicts, name='get_planner_conflicts'),
     path('create-event/', views.create_event, name='create_event'),
     path('update-event/', views.update_event, name='update_event'),
     path('delete-event/', views.delete_event, name='delete_event'),
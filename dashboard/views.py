@@ -1,25 +1,34 @@
 from django.shortcuts import render, get_object_or_404, redirect
-from django.http import JsonResponse
+from django.http import JsonResponse, HttpResponse
 from django.contrib import messages
 from django.core.paginator import Paginator
 from django.db.models import Q
-from django.db import models
+from django.db import models, transaction, IntegrityError
 from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import condition
+from django.utils.cache import patch_cache_control
 from django.template.loader import render_to_string
 from django.utils import timezone
 from datetime import datetime, timedelta
 import json
-from .models import Customer, Car, Employee, DaysOff, Event, Sklad, ImportLog, Order, OrderItem
+from .models import Customer, Car, Employee, DaysOff, Event, Sklad, ImportLog, Order, OrderItem, Invoice, ArchivedOrder
+from .planner_utils import delete_duplicate_events, is_duplicate_event_error, get_week_start, get_planner_version, get_week_json, get_range_etag, get_range_json, parse_planner_range
+from .conditional_utils import conditional_get
+from .unit_utils import get_units_version
+from .conflict_utils import find_event_conflicts, find_range_conflicts
 from .forms import CustomerForm, IndividualCustomerForm, CompanyCustomerForm, CustomerSearchForm, CarFormSet, EmployeeForm, EmployeeSearchForm, DaysOffForm, SkladForm, SkladSearchForm, OrderForm, OrderItemForm, OrderSearchForm, OrderItemFormSet
 
 def dashboard(request):
     """Main dashboard view with 6 clickable boxes and weekly planner"""
-    return render(request, 'dashboard/dashboard.html')
+    # Employees for the planner event forms (conflicts are checked per employee)
+    employees = Employee.objects.filter(is_active=True).only('id', 'first_name', 'last_name')
+    return render(request, 'dashboard/dashboard.html', {'employees': employees})
 
 def klienti(request):
     """Clients page with list, search, and CRUD operations"""
+    from .customer_utils import with_car_preview
     search_form = CustomerSearchForm(request.GET)
-    customers = Customer.objects.prefetch_related('cars').all()
+    customers = with_car_preview(Customer.objects.all())
     
     # Apply search filters
     if search_form.is_valid():
@@ -148,77 +157,47 @@ def get_next_customer_number(request):
             'error': str(e)
         })
 
+@conditional_get(Customer, Car)
 def customer_search_ajax(request):
     """AJAX endpoint for customer search with smart VIN logic"""
     from django.template.loader import render_to_string
     from django.core.paginator import Paginator
     
-    search_query = request.GET.get('search', '').strip()
-    customer_type = request.GET.get('customer_type', '')
-    active_only = request.GET.get('active_only', '')
     page = int(request.GET.get('page', 1))
     
-    # Start with all customers and prefetch cars for better performance
-    customers = Customer.objects.prefetch_related('cars').all()
-    
-    # Apply filters
-    if active_only:
-        customers = customers.filter(active=True)
-    
-    if customer_type:
-        if customer_type == 'company':
-            customers = customers.filter(
-                models.Q(customer_bulstat__isnull=False) | 
-                models.Q(customer_mol__isnull=False) | 
-                models.Q(customer_taxno__isnull=False)
-            ).exclude(
-                customer_bulstat='',
-                customer_mol='',
-                customer_taxno=''
-            )
-        elif customer_type == 'individual':
-            # Individuals are customers who are NOT companies
-            # Exclude customers that have any business registration data
-            customers = customers.exclude(
-                models.Q(customer_bulstat__isnull=False) & ~models.Q(customer_bulstat='') |
-                models.Q(customer_mol__isnull=False) & ~models.Q(customer_mol='') |
-                models.Q(customer_taxno__isnull=False) & ~models.Q(customer_taxno='')
-            )
+    from .search_utils import filter_customers
+    customers = filter_customers(Customer.objects.all(), request.GET)
     
-    # Apply search
-    if search_query:
-        # Always search by name
-        search_conditions = models.Q(customer_name__icontains=search_query)
-        
-        # Always search by plate number (through cars)
-        search_conditions |= models.Q(cars__plate_number__icontains=search_query)
-        
-        # Only search by VIN if search term is 5+ characters
-        if len(search_query) >= 5:
-            search_conditions |= models.Q(cars__vin__icontains=search_query)
-        
-        customers = customers.filter(search_conditions).distinct()
+    # Calculate statistics in one query from the stored is_company flag
+    stats = customers.aggregate(
+        total=models.Count('id'),
+        active=models.Count('id', filter=models.Q(active=True)),
+        companies=models.Count('id', filter=models.Q(is_company=True)),
+    )
+    total_customers = stats['total']
+    active_customers = stats['active']
+    company_customers = stats['companies']
+    individual_customers = total_customers - company_customers
     
-    # Order by name
-    customers = customers.order_by('customer_name')
+    # Active car count and the first few active cars per customer
+    from .customer_utils import with_car_preview
+    customers = with_car_preview(customers).order_by('customer_name')
     
     # Pagination
     paginator = Paginator(customers, 10)  # 10 customers per page
     page_obj = paginator.get_page(page)
     
-    # Calculate statistics
-    total_customers = customers.count()
-    active_customers = customers.filter(active=True).count()
-    company_customers = customers.filter(
-        models.Q(customer_bulstat__isnull=False) | 
-        models.Q(customer_mol__isnull=False) | 
-        models.Q(customer_taxno__isnull=False)
-    ).exclude(
-        customer_bulstat='',
-        customer_mol='',
-        customer_taxno=''
-    ).count()
-    individual_customers = total_customers - company_customers
+    stats = {
+        'total_customers': total_customers,
+        'active_customers': active_customers,
+        'company_customers': company_customers,
+        'individual_customers': individual_customers,
+        'total_pages': paginator.num_pages,
+    }
+    
+    from .table_json_utils import wants_compact_json, compact_table_response, customer_row, CUSTOMER_COLUMNS, CUSTOMER_CAR_COLUMNS
+    if wants_compact_json(request):
+        return compact_table_response(page_obj, CUSTOMER_COLUMNS, customer_row, stats, car_columns=CUSTOMER_CAR_COLUMNS)
     
     # Render table and pagination
     table_html = render_to_string('dashboard/customer_table.html', {
@@ -233,13 +212,7 @@ def customer_search_ajax(request):
     return JsonResponse({
         'table_html': table_html,
         'pagination_html': pagination_html,
-        'stats': {
-            'total_customers': total_customers,
-            'active_customers': active_customers,
-            'company_customers': company_customers,
-            'individual_customers': individual_customers,
-            'total_pages': paginator.num_pages,
-        }
+        'stats': stats,
     })
 
 def customer_edit(request, pk):
@@ -247,7 +220,7 @@ def customer_edit(request, pk):
     customer = get_object_or_404(Customer, pk=pk)
     
     # Determine customer type and use appropriate form
-    if customer.customer_type == 'Фирма':
+    if customer.is_company:
         FormClass = CompanyCustomerForm
         customer_type = 'company'
     else:
@@ -326,22 +299,33 @@ def car_orders(request, car_id):
 
 def customer_detail(request, pk):
     """View customer details with cars"""
+    from .customer_utils import annotate_car_summary
     customer = get_object_or_404(Customer, pk=pk)
-    cars = customer.cars.filter(is_active=True)
     
-    # Add order counts for each car
-    cars_with_orders = []
-    for car in cars:
-        order_count = Order.objects.filter(car=car).count()
-        cars_with_orders.append({
-            'car': car,
-            'order_count': order_count
-        })
+    # Order count, last service date and lifetime spend for all cars in one query
+    cars = list(annotate_car_summary(customer.cars.filter(is_active=True)))
     
     return render(request, 'dashboard/customer_detail.html', {
         'customer': customer,
-        'cars': cars,
-        'cars_with_orders': cars_with_orders
+        'cars': cars
+    })
+
+
+def customer_cars_summary(request, pk):
+    """JSON summary of a customer's cars (order count, last service, lifetime spend)"""
+    from .customer_utils import annotate_car_summary, serialize_car_summary
+    customer = Customer.objects.filter(pk=pk).first()
+    if not customer:
+        return JsonResponse({'success': False, 'error': 'Клиентът не е намерен!'})
+    
+    cars = annotate_car_summary(customer.cars.filter(is_active=True))
+    return JsonResponse({
+        'success': True,
+        'customer': {
+            'id': customer.id,
+            'name': customer.customer_name
+        },
+        'cars': [serialize_car_summary(car) for car in cars]
     })
 
 def fakturi(request):
@@ -404,56 +388,17 @@ def pregled_poruchki(request):
     # Use select_related for FK lookups and prefetch_related for order_items
     orders = Order.objects.select_related('client', 'car').prefetch_related('order_items').order_by('-order_date', '-created_at')
     
-    # Search functionality with smart VIN logic
+    # Search, status and date range filters (same as order_search_ajax)
+    from .search_utils import filter_orders
+    orders = filter_orders(orders, request.GET)
     search_query = request.GET.get('search', '').strip()
-    if search_query:
-        # Always search by order number, client name, car details, and notes
-        # Also search in related client table
-        search_conditions = (
-            Q(order_number__icontains=search_query) |
-            Q(client_name__icontains=search_query) |
-            Q(client__customer_name__icontains=search_query) |
-            Q(car_brand_model__icontains=search_query) |
-            Q(car__brand_model__icontains=search_query) |
-            Q(car_plate_number__icontains=search_query) |
-            Q(notes__icontains=search_query)
-        )
-        
-        # Only search by VIN if search term is 5+ characters (smart VIN search)
-        if len(search_query) >= 5:
-            search_conditions |= Q(car_vin__icontains=search_query)
-        
-        orders = orders.filter(search_conditions)
-    
-    # Status filter
     status_filter = request.GET.get('status', '').strip()
-    if status_filter:
-        orders = orders.filter(status=status_filter)
-    
-    # Date range filter
     date_from = request.GET.get('date_from', '').strip()
     date_to = request.GET.get('date_to', '').strip()
     
-    if date_from:
-        try:
-            from datetime import datetime
-            date_from_obj = datetime.strptime(date_from, '%Y-%m-%d').date()
-            orders = orders.filter(order_date__gte=date_from_obj)
-        except ValueError:
-            pass  # Invalid date format, ignore filter
-    
-    if date_to:
-        try:
-            from datetime import datetime
-            date_to_obj = datetime.strptime(date_to, '%Y-%m-%d').date()
-            orders = orders.filter(order_date__lte=date_to_obj)
-        except ValueError:
-            pass  # Invalid date format, ignore filter
-    
-    # Pagination
-    paginator = Paginator(orders, 20)  # Show 20 orders per page
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    # Pagination (live orders, plus the archive with include_archive)
+    from .archive_utils import paginate_orders, wants_archive
+    paginator, page_obj = paginate_orders(orders, request.GET, 20)  # Show 20 orders per page
     
     # Get statistics (optimized with single query per stat)
     total_orders = Order.objects.count()
@@ -476,6 +421,7 @@ def pregled_poruchki(request):
         'status_filter': status_filter,
         'date_from': date_from,
         'date_to': date_to,
+        'include_archive': wants_archive(request.GET),
         'status_choices': Order.ORDER_STATUS_CHOICES,
         'total_orders': total_orders,
         'pending_orders': pending_orders,
@@ -487,64 +433,21 @@ def pregled_poruchki(request):
     return render(request, 'dashboard/pregled_poruchki.html', context)
 
 @csrf_exempt
+@conditional_get(Order, OrderItem, Customer, Car)
 def order_search_ajax(request):
     """AJAX endpoint for order search with smart VIN logic"""
     from django.template.loader import render_to_string
-    from django.core.paginator import Paginator
-    
-    search_query = request.GET.get('search', '').strip()
-    status_filter = request.GET.get('status', '').strip()
-    date_from = request.GET.get('date_from', '').strip()
-    date_to = request.GET.get('date_to', '').strip()
-    page = int(request.GET.get('page', 1))
     
     # Start with all orders with optimized queries (PERFORMANCE FIX!)
     orders = Order.objects.select_related('client', 'car').prefetch_related('order_items').order_by('-order_date', '-created_at')
     
-    # Apply search with smart VIN logic
-    if search_query:
-        # Always search by order number, client name, car details, and notes
-        # Also search in related client table
-        search_conditions = (
-            Q(order_number__icontains=search_query) |
-            Q(client_name__icontains=search_query) |
-            Q(client__customer_name__icontains=search_query) |
-            Q(car_brand_model__icontains=search_query) |
-            Q(car__brand_model__icontains=search_query) |
-            Q(car_plate_number__icontains=search_query) |
-            Q(notes__icontains=search_query)
-        )
-        
-        # Only search by VIN if search term is 5+ characters (smart VIN search)
-        if len(search_query) >= 5:
-            search_conditions |= Q(car_vin__icontains=search_query)
-        
-        orders = orders.filter(search_conditions)
-    
-    # Apply status filter
-    if status_filter:
-        orders = orders.filter(status=status_filter)
+    # Apply search, status and date range filters
+    from .search_utils import filter_orders
+    orders = filter_orders(orders, request.GET)
     
-    # Apply date range filters
-    if date_from:
-        try:
-            from datetime import datetime
-            date_from_obj = datetime.strptime(date_from, '%Y-%m-%d').date()
-            orders = orders.filter(order_date__gte=date_from_obj)
-        except ValueError:
-            pass  # Invalid date format, ignore filter
-    
-    if date_to:
-        try:
-            from datetime import datetime
-            date_to_obj = datetime.strptime(date_to, '%Y-%m-%d').date()
-            orders = orders.filter(order_date__lte=date_to_obj)
-        except ValueError:
-            pass  # Invalid date format, ignore filter
-    
-    # Pagination
-    paginator = Paginator(orders, 20)  # 20 orders per page
-    page_obj = paginator.get_page(page)
+    # Pagination (live orders, plus the archive with include_archive)
+    from .archive_utils import paginate_orders
+    paginator, page_obj = paginate_orders(orders, request.GET, 20)  # 20 orders per page
     
     # Calculate statistics
     total_orders = Order.objects.count()
@@ -559,6 +462,18 @@ def order_search_ajax(request):
     )
     total_revenue = float(revenue_data['total'])
     
+    stats = {
+        'total_orders': total_orders,
+        'pending_orders': pending_orders,
+        'completed_orders': completed_orders,
+        'total_revenue': total_revenue,
+        'total_pages': paginator.num_pages,
+    }
+    
+    from .table_json_utils import wants_compact_json, compact_table_response, order_row, ORDER_COLUMNS
+    if wants_compact_json(request):
+        return compact_table_response(page_obj, ORDER_COLUMNS, order_row, stats)
+    
     # Render table and pagination
     table_html = render_to_string('dashboard/order_table.html', {
         'orders': page_obj,
@@ -572,13 +487,7 @@ def order_search_ajax(request):
     return JsonResponse({
         'table_html': table_html,
         'pagination_html': pagination_html,
-        'stats': {
-            'total_orders': total_orders,
-            'pending_orders': pending_orders,
-            'completed_orders': completed_orders,
-            'total_revenue': total_revenue,
-            'total_pages': paginator.num_pages,
-        }
+        'stats': stats,
     })
 
 # This function is already defined above, removing duplicate
@@ -587,128 +496,66 @@ def sklad(request):
     """Warehouse page"""
     return render(request, 'dashboard/sklad.html')
 
+@conditional_get(get_planner_version, timezone.localdate)
 def get_weekly_planner(request):
     """API endpoint for weekly planner data"""
-    from django.db.models import Q
-    
     # Get the week from request parameters
     week_offset = int(request.GET.get('week', 0))
     
-    # Calculate the start of the week (Monday)
-    today = datetime.now()
-    start_of_week = today - timedelta(days=today.weekday()) + timedelta(weeks=week_offset)
-    end_of_week = start_of_week + timedelta(days=6)
-    
-    # Bulgarian day names
-    bulgarian_days = ['ПОН', 'ВТО', 'СРЯ', 'ЧЕТ', 'ПЕТ', 'СЪБ', 'НЕД']
-    
-    # Generate week days
-    week_days = []
-    for i in range(7):
-        day = start_of_week + timedelta(days=i)
-        week_days.append({
-            'date': day.strftime('%Y-%m-%d'),
-            'day_name': bulgarian_days[i],
-            'day_number': day.day,
-            'is_today': day.date() == today.date()
+    # Week payloads are cached as JSON under a version key bumped on Event/DaysOff changes
+    return HttpResponse(get_week_json(week_offset), content_type='application/json')
+
+
+def _planner_range_etag(request):
+    """ETag for the planner range endpoint; invalid ranges are not cached"""
+    try:
+        start_date, end_date = parse_planner_range(request.GET.get('from'), request.GET.get('to'))
+    except ValueError:
+        return None
+    return get_range_etag(start_date, end_date)
+
+
+@condition(etag_func=_planner_range_etag)
+def get_planner_range(request):
+    """API endpoint for planner data over a date range (month and print views)"""
+    try:
+        start_date, end_date = parse_planner_range(request.GET.get('from'), request.GET.get('to'))
+    except ValueError as e:
+        return JsonResponse({
+            'success': False,
+            'error': str(e)
         })
     
-    # Get employee days off for this week
-    days_off = DaysOff.objects.filter(
-        Q(start_date__lte=end_of_week.date()) & Q(end_date__gte=start_of_week.date()),
-        is_approved=True
-    ).select_related('employee')
-    
-    # Get events for this week
-    from .models import Event
-    events = Event.objects.filter(
-        Q(start_datetime__date__lte=end_of_week.date()) & Q(end_datetime__date__gte=start_of_week.date())
-    ).select_related('customer', 'employee')
-    
-    # Organize days off by date
-    days_off_by_date = {}
-    for day_off in days_off:
-        current_date = day_off.start_date
-        while current_date <= day_off.end_date:
-            if start_of_week.date() <= current_date <= end_of_week.date():
-                date_str = current_date.strftime('%Y-%m-%d')
-                if date_str not in days_off_by_date:
-                    days_off_by_date[date_str] = []
-                
-                days_off_by_date[date_str].append({
-                    'id': day_off.id,
-                    'employee_name': day_off.employee.full_name,
-                    'type': day_off.get_day_off_type_display(),
-                    'reason': day_off.reason or '',
-                    'color': get_day_off_color(day_off.day_off_type),
-                    'is_all_day': True
-                })
-            current_date += timedelta(days=1)
-    
-    # Organize events by date and time
-    import pytz
-    sofia_tz = pytz.timezone('Europe/Sofia')
-    
-    events_by_date = {}
-    for event in events:
-        # Convert to Sofia timezone for display
-        start_local = event.start_datetime.astimezone(sofia_tz)
-        end_local = event.end_datetime.astimezone(sofia_tz)
-        event_date = start_local.date()
-        
-        if start_of_week.date() <= event_date <= end_of_week.date():
-            date_str = event_date.strftime('%Y-%m-%d')
-            if date_str not in events_by_date:
-                events_by_date[date_str] = []
-            
-            events_by_date[date_str].append({
-                'id': event.id,
-                'title': event.title,
-                'event_type': event.event_type,
-                'type': event.get_event_type_display(),
-                'start_date': event_date.strftime('%Y-%m-%d'),
-                'start_time': start_local.strftime('%H:%M'),
-                'end_time': end_local.strftime('%H:%M'),
-                'is_all_day': event.is_all_day,
-                'color': get_event_color(event.event_type),
-                'customer': event.customer.customer_name if event.customer else None,
-                'employee': event.employee.full_name if event.employee else None,
-                'description': event.description or ''
+    # Events and days off are loaded once for the whole range and bucketed per day
+    response = HttpResponse(get_range_json(start_date, end_date), content_type='application/json')
+    patch_cache_control(response, private=True, no_cache=True)
+    return response
+
+
+def get_planner_conflicts(request):
+    """API endpoint listing scheduling conflicts for all employees in a week or range"""
+    if request.GET.get('from') or request.GET.get('to'):
+        try:
+            start_date, end_date = parse_planner_range(request.GET.get('from'), request.GET.get('to'))
+        except ValueError as e:
+            return JsonResponse({
+                'success': False,
+                'error': str(e)
             })
+    else:
+        start_date = get_week_start(int(request.GET.get('week', 0)))
+        end_date = start_date + timedelta(days=6)
     
+    conflicts = find_range_conflicts(start_date, end_date)
     return JsonResponse({
-        'week_days': week_days,
-        'current_week': week_offset == 0,
-        'days_off': days_off_by_date,
-        'events': events_by_date
+        'success': True,
+        'from': start_date.strftime('%Y-%m-%d'),
+        'to': end_date.strftime('%Y-%m-%d'),
+        'conflicts': conflicts,
+        'total': len(conflicts)
     })
 
 
-def get_day_off_color(day_off_type):
-    """Get color for day off type"""
-    colors = {
-        'vacation': '#28a745',      # Green for vacation
-        'sick': '#dc3545',          # Red for sick leave
-        'personal': '#ffc107',      # Yellow for personal
-        'holiday': '#6f42c1',      # Purple for holiday
-        'other': '#17a2b8'          # Blue for other
-    }
-    return colors.get(day_off_type, '#6c757d')  # Default gray
-
-
-def get_event_color(event_type):
-    """Get color for event type"""
-    colors = {
-        'meeting': '#007bff',       # Blue for meetings
-        'appointment': '#28a745',   # Green for appointments
-        'maintenance': '#ffc107',   # Yellow for maintenance
-        'inspection': '#fd7e14',    # Orange for inspections
-        'delivery': '#6f42c1',      # Purple for deliveries
-        'other': '#6c757d'          # Gray for other
-    }
-    return colors.get(event_type, '#6c757d')  # Default gray
-
-
 @csrf_exempt
 def create_event(request):
     """Create a new calendar event"""
@@ -732,28 +579,36 @@ def create_event(request):
                 '%Y-%m-%d %H:%M'
             ))
             
-            # Check for duplicate events (same title, date, and time)
-            existing_event = Event.objects.filter(
+            event = Event(
                 title=data['title'],
+                event_type=data['event_type'],
                 start_datetime=start_datetime,
-                end_datetime=end_datetime
-            ).first()
+                end_datetime=end_datetime,
+                description=data.get('description', ''),
+                is_all_day=data.get('is_all_day', False),
+                employee_id=data.get('employee_id') or None
+            )
             
-            if existing_event:
+            # Reject double-booking the employee unless explicitly allowed
+            conflicts = find_event_conflicts(event)
+            if conflicts and not data.get('allow_conflicts'):
                 return JsonResponse({
                     'success': False,
-                    'error': 'Събитие с това заглавие и време вече съществува!'
+                    'error': 'Служителят има конфликт в графика за този период!',
+                    'conflicts': conflicts
                 })
             
-            # Create event
-            event = Event.objects.create(
-                title=data['title'],
-                event_type=data['event_type'],
-                start_datetime=start_datetime,
-                end_datetime=end_datetime,
-                description=data.get('description', ''),
-                is_all_day=data.get('is_all_day', False)
-            )
+            # Create event; the unique (title, start, end) constraint rejects duplicates
+            try:
+                with transaction.atomic():
+                    event.save()
+            except IntegrityError as e:
+                if not is_duplicate_event_error(e):
+                    raise
+                return JsonResponse({
+                    'success': False,
+                    'error': 'Събитие с това заглавие и време вече съществува!'
+                })
             
             return JsonResponse({
                 'success': True,
@@ -827,8 +682,29 @@ def update_event(request):
                     event.customer = None
             else:
                 event.customer = None
-                
-            event.save()
+            
+            if 'employee_id' in data:
+                event.employee_id = data['employee_id'] or None
+            
+            # Reject double-booking the employee unless explicitly allowed
+            conflicts = find_event_conflicts(event)
+            if conflicts and not data.get('allow_conflicts'):
+                return JsonResponse({
+                    'success': False,
+                    'error': 'Служителят има конфликт в графика за този период!',
+                    'conflicts': conflicts
+                })
+            
+            try:
+                with transaction.atomic():
+                    event.save()
+            except IntegrityError as e:
+                if not is_duplicate_event_error(e):
+                    raise
+                return JsonResponse({
+                    'success': False,
+                    'error': 'Събитие с това заглавие и време вече съществува!'
+                })
             
             return JsonResponse({
                 'success': True,
@@ -974,6 +850,7 @@ def employee_detail(request, pk):
     from datetime import date
     
     employee = get_object_or_404(Employee, pk=pk)
+    employee.refresh_leave_usage()
     days_off = employee.days_off.all().order_by('-start_date')
     current_year = date.today().year
     
@@ -1043,28 +920,8 @@ def cleanup_duplicate_events(request):
     """Clean up duplicate events from the database"""
     if request.method == 'POST':
         try:
-            # Find duplicate events (same title, start_datetime, end_datetime)
-            from django.db.models import Count
-            
-            duplicates = Event.objects.values('title', 'start_datetime', 'end_datetime').annotate(
-                count=Count('id')
-            ).filter(count__gt=1)
-            
-            removed_count = 0
-            
-            for duplicate in duplicates:
-                # Get all events with this combination
-                events = Event.objects.filter(
-                    title=duplicate['title'],
-                    start_datetime=duplicate['start_datetime'],
-                    end_datetime=duplicate['end_datetime']
-                ).order_by('id')
-                
-                # Keep the first one, delete the rest
-                events_to_delete = events[1:]
-                for event in events_to_delete:
-                    event.delete()
-                    removed_count += 1
+            # Delete duplicates in one statement, keeping the lowest id per (title, start, end)
+            removed_count = delete_duplicate_events()
             
             return JsonResponse({
                 'success': True,
@@ -1079,28 +936,14 @@ def cleanup_duplicate_events(request):
             })
     
     return JsonResponse({'success': False, 'error': 'Invalid method'})
+
+
+@conditional_get(Sklad, ajax_only=True)
 def sklad(request):
     """Warehouse/Inventory page with list, search, and CRUD operations"""
+    from .search_utils import filter_sklad
     search_form = SkladSearchForm(request.GET)
-    items = Sklad.objects.all()
-    
-    # Apply search filters
-    if search_form.is_valid():
-        search_query = search_form.cleaned_data.get('search')
-        active_only = search_form.cleaned_data.get('active_only')
-        unit_filter = search_form.cleaned_data.get('unit_filter')
-        
-        if search_query:
-            items = items.filter(
-                Q(article_number__icontains=search_query) |
-                Q(name__icontains=search_query)
-            ).distinct()
-        
-        if active_only:
-            items = items.filter(is_active=True)
-        
-        if unit_filter:
-            items = items.filter(unit=unit_filter)
+    items = filter_sklad(Sklad.objects.all(), search_form)
     
     # Pagination
     paginator = Paginator(items, 20)  # 20 items per page
@@ -1112,6 +955,17 @@ def sklad(request):
     
     # Check if this is an AJAX request
     if request.headers.get('X-Requested-With') == 'XMLHttpRequest' or request.GET.get('ajax'):
+        stats = {
+            'total_items': items.count(),
+            'active_items': items.filter(is_active=True).count(),
+            'total_value': float(total_value),
+            'total_pages': paginator.num_pages,
+        }
+        
+        from .table_json_utils import wants_compact_json, compact_table_response, sklad_row, SKLAD_COLUMNS
+        if wants_compact_json(request):
+            return compact_table_response(page_obj, SKLAD_COLUMNS, sklad_row, stats)
+        
         # Return JSON response for AJAX requests
         table_html = render_to_string('dashboard/sklad_table.html', {
             'page_obj': page_obj,
@@ -1125,12 +979,7 @@ def sklad(request):
         return JsonResponse({
             'table_html': table_html,
             'pagination_html': pagination_html,
-            'stats': {
-                'total_items': items.count(),
-                'active_items': items.filter(is_active=True).count(),
-                'total_value': float(total_value),
-                'total_pages': paginator.num_pages,
-            }
+            'stats': stats,
         })
     
     context = {
@@ -2468,6 +2317,7 @@ def order_get_car_info(request):
 
 
 @csrf_exempt
+@conditional_get(Car, Customer)
 def order_car_modal_data(request):
     """Get paginated car data for car selection modal"""
     search_query = request.GET.get('search', '').strip()
@@ -2548,6 +2398,7 @@ def order_get_client_info(request):
 
 
 @csrf_exempt
+@conditional_get(Sklad)
 def order_sklad_modal_data(request):
     """Get sklad data for the modal with pagination and filtering"""
     search_query = request.GET.get('search', '').strip()
@@ -2605,11 +2456,11 @@ def order_sklad_modal_data(request):
 
 
 @csrf_exempt
+@conditional_get(get_units_version)
 def order_sklad_units(request):
     """Get available units for the sklad modal filter"""
-    units = Sklad.objects.filter(is_active=True).values_list('unit', flat=True).distinct().order_by('unit')
-    units_list = [unit for unit in units if unit]
-    return JsonResponse({'units': units_list})
+    from .unit_utils import get_units
+    return JsonResponse({'units': get_units(active_only=True)})
 
 
 @csrf_exempt
@@ -2632,13 +2483,16 @@ def order_preview_invoice(request, pk):
     """Preview invoice in modal"""
     order = get_object_or_404(Order, pk=pk)
     return render(request, 'dashboard/order_preview_invoice.html', {
-        'order': order
+        'order': order,
+        # EUR amounts use the rate valid on the invoice date
+        'rate_date': order.invoice_rate_date,
     })
 
 
 def order_preview_order(request, pk):
-    """Preview order in modal"""
-    order = get_object_or_404(Order, pk=pk)
+    """Preview order in modal (archived orders too)"""
+    from .archive_utils import get_order_or_archived
+    order = get_order_or_archived(pk)
     return render(request, 'dashboard/order_preview_order.html', {
         'order': order
     })
@@ -2726,49 +2580,14 @@ def fakturi(request):
     # Get all invoices ordered by most recent first
     invoices = Invoice.objects.all().order_by('-invoice_date', '-created_at')
     
-    # Search functionality with smart VIN logic
+    # Search, status and date range filters (same as invoice_search_ajax)
+    from .search_utils import filter_invoices
+    invoices = filter_invoices(invoices, request.GET)
     search_query = request.GET.get('search', '').strip()
-    if search_query:
-        # Always search by invoice number, client name, car details
-        search_conditions = (
-            Q(invoice_number__icontains=search_query) |
-            Q(client_name__icontains=search_query) |
-            Q(car_brand_model__icontains=search_query) |
-            Q(car_plate_number__icontains=search_query) |
-            Q(notes__icontains=search_query)
-        )
-        
-        # Only search by VIN if search term is 5+ characters (smart VIN search)
-        if len(search_query) >= 5:
-            search_conditions |= Q(car_vin__icontains=search_query)
-        
-        invoices = invoices.filter(search_conditions)
-    
-    # Status filter
     status_filter = request.GET.get('status', '').strip()
-    if status_filter:
-        invoices = invoices.filter(status=status_filter)
-    
-    # Date range filter
     date_from = request.GET.get('date_from', '').strip()
     date_to = request.GET.get('date_to', '').strip()
     
-    if date_from:
-        try:
-            from datetime import datetime
-            date_from_obj = datetime.strptime(date_from, '%Y-%m-%d').date()
-            invoices = invoices.filter(invoice_date__gte=date_from_obj)
-        except ValueError:
-            pass  # Invalid date format, ignore filter
-    
-    if date_to:
-        try:
-            from datetime import datetime
-            date_to_obj = datetime.strptime(date_to, '%Y-%m-%d').date()
-            invoices = invoices.filter(invoice_date__lte=date_to_obj)
-        except ValueError:
-            pass  # Invalid date format, ignore filter
-    
     # Pagination
     paginator = Paginator(invoices, 20)  # Show 20 invoices per page
     page_number = request.GET.get('page')
@@ -2816,58 +2635,21 @@ def invoice_detail(request, pk):
     return render(request, 'dashboard/invoice_detail.html', context)
 
 
+@conditional_get(Invoice, timezone.localdate)
 def invoice_search_ajax(request):
     """AJAX endpoint for invoice search with smart VIN logic"""
     from django.template.loader import render_to_string
     from django.core.paginator import Paginator
     from .models import Invoice
     
-    search_query = request.GET.get('search', '').strip()
-    status_filter = request.GET.get('status', '').strip()
-    date_from = request.GET.get('date_from', '').strip()
-    date_to = request.GET.get('date_to', '').strip()
     page = int(request.GET.get('page', 1))
     
     # Start with all invoices ordered by most recent first
     invoices = Invoice.objects.all().order_by('-invoice_date', '-created_at')
     
-    # Apply search with smart VIN logic
-    if search_query:
-        # Always search by invoice number, client name, car details
-        search_conditions = (
-            Q(invoice_number__icontains=search_query) |
-            Q(client_name__icontains=search_query) |
-            Q(car_brand_model__icontains=search_query) |
-            Q(car_plate_number__icontains=search_query) |
-            Q(notes__icontains=search_query)
-        )
-        
-        # Only search by VIN if search term is 5+ characters (smart VIN search)
-        if len(search_query) >= 5:
-            search_conditions |= Q(car_vin__icontains=search_query)
-        
-        invoices = invoices.filter(search_conditions)
-    
-    # Apply status filter
-    if status_filter:
-        invoices = invoices.filter(status=status_filter)
-    
-    # Apply date range filters
-    if date_from:
-        try:
-            from datetime import datetime
-            date_from_obj = datetime.strptime(date_from, '%Y-%m-%d').date()
-            invoices = invoices.filter(invoice_date__gte=date_from_obj)
-        except ValueError:
-            pass  # Invalid date format, ignore filter
-    
-    if date_to:
-        try:
-            from datetime import datetime
-            date_to_obj = datetime.strptime(date_to, '%Y-%m-%d').date()
-            invoices = invoices.filter(invoice_date__lte=date_to_obj)
-        except ValueError:
-            pass  # Invalid date format, ignore filter
+    # Apply search, status and date range filters
+    from .search_utils import filter_invoices
+    invoices = filter_invoices(invoices, request.GET)
     
     # Pagination
     paginator = Paginator(invoices, 20)  # 20 invoices per page
@@ -2884,6 +2666,21 @@ def invoice_search_ajax(request):
     total_revenue = sum(float(invoice.total_amount) for invoice in Invoice.objects.filter(status='paid'))
     pending_revenue = sum(float(invoice.total_amount) for invoice in Invoice.objects.exclude(status__in=['paid', 'cancelled']))
     
+    stats = {
+        'total_invoices': total_invoices,
+        'draft_invoices': draft_invoices,
+        'sent_invoices': sent_invoices,
+        'paid_invoices': paid_invoices,
+        'overdue_invoices': overdue_invoices,
+        'total_revenue': total_revenue,
+        'pending_revenue': pending_revenue,
+        'total_pages': paginator.num_pages,
+    }
+    
+    from .table_json_utils import wants_compact_json, compact_table_response, invoice_row, INVOICE_COLUMNS
+    if wants_compact_json(request):
+        return compact_table_response(page_obj, INVOICE_COLUMNS, invoice_row, stats)
+    
     # Render table and pagination
     table_html = render_to_string('dashboard/invoice_table.html', {
         'invoices': page_obj,
@@ -2897,14 +2694,143 @@ def invoice_search_ajax(request):
     return JsonResponse({
         'table_html': table_html,
         'pagination_html': pagination_html,
-        'stats': {
-            'total_invoices': total_invoices,
-            'draft_invoices': draft_invoices,
-            'sent_invoices': sent_invoices,
-            'paid_invoices': paid_invoices,
-            'overdue_invoices': overdue_invoices,
-            'total_revenue': total_revenue,
-            'pending_revenue': pending_revenue,
-            'total_pages': paginator.num_pages,
-        }
+        'stats': stats,
     })
+
+
+def reports(request):
+    """Sales reports read from the daily rollups (refreshed by the refresh_sales_rollups command)"""
+    from django.db.models import Sum
+    from django.db.models.functions import ExtractMonth, ExtractYear
+    from .models import DailySales, DailyEmployeeSales
+    from .sales_rollup_utils import SALES_STATUSES, get_watermark
+
+    years = [day.year for day in DailySales.objects.dates('date', 'year', order='DESC')]
+    try:
+        year = int(request.GET.get('year', ''))
+    except ValueError:
+        year = years[0] if years else timezone.localdate().year
+
+    sales = DailySales.objects.filter(status__in=SALES_STATUSES)
+    totals = {
+        'orders': Sum('orders_count'),
+        'total_with_vat': Sum('total_with_vat'),
+        'total_without_vat': Sum('total_without_vat'),
+        'parts_total': Sum('parts_total'),
+        'labor_total': Sum('labor_total'),
+    }
+
+    # Month by month against the previous year
+    by_month = {
+        (row['year'], row['month']): row
+        for row in sales.filter(date__year__in=[year, year - 1]).annotate(
+            year=ExtractYear('date'), month=ExtractMonth('date')
+        ).values('year', 'month').annotate(**totals)
+    }
+    month_names = ['Яну', 'Фев', 'Мар', 'Апр', 'Май', 'Юни', 'Юли', 'Авг', 'Сеп', 'Окт', 'Ное', 'Дек']
+    months = []
+    for month in range(1, 13):
+        current = by_month.get((year, month), {})
+        previous = by_month.get((year - 1, month), {})
+        current_total = current.get('total_with_vat') or 0
+        previous_total = previous.get('total_with_vat') or 0
+        months.append({
+            'month': month,
+            'name': month_names[month - 1],
+            'current': current,
+            'previous_total': previous_total,
+            'change': round((current_total - previous_total) / previous_total * 100, 1) if previous_total else None,
+        })
+
+    yearly = list(
+        sales.annotate(year=ExtractYear('date')).values('year').annotate(**totals).order_by('year')
+    )
+
+    status_names = dict(Order.ORDER_STATUS_CHOICES)
+    by_status = [
+        dict(row, name=status_names.get(row['status'], row['status']))
+        for row in DailySales.objects.filter(date__year=year).values('status').annotate(
+            orders=Sum('orders_count'), total_with_vat=Sum('total_with_vat')
+        ).order_by('status')
+    ]
+
+    by_employee = list(
+        DailyEmployeeSales.objects.filter(date__year=year, status__in=SALES_STATUSES).values(
+            'employee_id', 'employee__first_name', 'employee__last_name'
+        ).annotate(
+            orders=Sum('orders_count'),
+            total_with_vat=Sum('total_with_vat'),
+            labor_total=Sum('labor_total'),
+        ).order_by('-total_with_vat')
+    )
+
+    year_total = {
+        name: sum((row['current'].get(name) or 0) for row in months)
+        for name in ('orders', 'total_with_vat', 'parts_total', 'labor_total')
+    }
+
+    chart_data = {
+        'labels': month_names,
+        'current': [float(row['current'].get('total_with_vat') or 0) for row in months],
+        'previous': [float(row['previous_total']) for row in months],
+        'years': [row['year'] for row in yearly],
+        'yearly': [float(row['total_with_vat'] or 0) for row in yearly],
+    }
+
+    return render(request, 'dashboard/reports.html', {
+        'year': year,
+        'years': years or [year],
+        'months': months,
+        'yearly': yearly,
+        'by_status': by_status,
+        'by_employee': by_employee,
+        'year_total': year_total,
+        'chart_data': chart_data,
+        'refreshed_at': get_watermark(),
+    })
+
+
+def customer_export(request):
+    """Export the customers matching the klienti filters as CSV or XLSX"""
+    from .export_utils import export_response, customer_export_row, CUSTOMER_EXPORT_HEADERS
+    from .search_utils import filter_customers
+    customers = filter_customers(Customer.objects.all(), request.GET).order_by('customer_name')
+    return export_response(request, customers, CUSTOMER_EXPORT_HEADERS, customer_export_row, 'klienti', 'Клиенти')
+
+
+def order_export(request):
+    """Export the orders matching the pregled_poruchki filters as CSV or XLSX"""
+    from .export_utils import export_response, order_export_row, ORDER_EXPORT_HEADERS
+    from .sales_rollup_utils import order_totals
+    from .search_utils import filter_orders
+    orders = Order.objects.select_related('client').only(
+        'order_number', 'order_date', 'status', 'client_name', 'client_phone', 'car_brand_model',
+        'car_plate_number', 'car_vin', 'car_mileage', 'client__customer_name'
+    ).order_by('-order_date', '-created_at')
+    # Totals summed in the query instead of loading every order item
+    orders = filter_orders(orders, request.GET).annotate(**order_totals())
+    from .archive_utils import wants_archive
+    if wants_archive(request.GET):
+        # Live orders first, then the archive
+        archived_orders = ArchivedOrder.objects.select_related('client').only(
+            'order_number', 'order_date', 'status', 'client_name', 'client_phone', 'car_brand_model',
+            'car_plate_number', 'car_vin', 'car_mileage', 'client__customer_name'
+        ).order_by('-order_date', '-created_at')
+        orders = [orders, filter_orders(archived_orders, request.GET).annotate(**order_totals())]
+    return export_response(request, orders, ORDER_EXPORT_HEADERS, order_export_row, 'poruchki', 'Поръчки')
+
+
+def invoice_export(request):
+    """Export the invoices matching the fakturi filters as CSV or XLSX"""
+    from .export_utils import export_response, invoice_export_row, INVOICE_EXPORT_HEADERS
+    from .search_utils import filter_invoices
+    invoices = filter_invoices(Invoice.objects.order_by('-invoice_date', '-created_at'), request.GET)
+    return export_response(request, invoices, INVOICE_EXPORT_HEADERS, invoice_export_row, 'fakturi', 'Фактури')
+
+
+def sklad_export(request):
+    """Export the warehouse items matching the sklad filters as CSV or XLSX"""
+    from .export_utils import export_response, sklad_export_row, SKLAD_EXPORT_HEADERS
+    from .search_utils import filter_sklad
+    items = filter_sklad(Sklad.objects.all(), SkladSearchForm(request.GET))
+    return export_response(request, items, SKLAD_EXPORT_HEADERS, sklad_export_row, 'sklad', 'Склад')
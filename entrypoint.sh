@@ -3,6 +3,9 @@
 # Run migrations
 python manage.py migrate
 
+# Bring the sales report rollups up to date (cron refreshes them in production)
+python manage.py refresh_sales_rollups
+
 # Collect static files
 python manage.py collectstatic --noinput
 